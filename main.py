@@ -1,10 +1,29 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from modules.database import DatabaseManager
+from modules.executor import BackgroundExecutor
+from modules.feed_view import VirtualPostList
+from modules.images import ImageLoader
+from modules.notifications import NotificationPoller
+from modules.tree_loader import TreeviewLoader
 from modules.ui_components import UIComponents
 from modules.windows import Windows
 
 class ModernRedSocialApp:
+    FEED_PAGE_SIZE = 20  # Publicaciones por página del feed
+    FEED_PREFETCH_THRESHOLD = 0.9  # Fracción de scroll a partir de la que se pide otra página
+    FEED_ROW_HEIGHT = 200  # Alto fijo (px) de cada tarjeta del feed virtualizado
+    USER_PICKER_LIMIT = 50  # Coincidencias que muestra la búsqueda de usuarios por pulsación
+    VIEWER_BATCH_SIZE = 500  # Filas por fetchmany en el explorador de tablas
+    QUERY_REPORT_TOP_N = 15  # Sentencias en el informe de rendimiento
+    # Botón principal en el que se muestra cada tipo de notificación
+    NOTIFICATION_BUTTONS = {
+        'mensajes': "💬 MENSAJES",
+        'solicitudes': "🤝 AMISTADES",
+        'likes': "📝 PUBLICACIONES",
+        'comentarios': "📝 PUBLICACIONES",
+    }
+    
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("NIILO")
@@ -14,9 +33,20 @@ class ModernRedSocialApp:
         
         # Inicializar módulos
         self.db = DatabaseManager()
+        self.db.health.start()  # Diagnóstico periódico fuera de las acciones del usuario
+        self.executor = BackgroundExecutor(self.root)  # Consultas fuera del hilo de Tk
+        # Decodificación de imágenes en hilos propios, para no retrasar las consultas
+        self.image_executor = BackgroundExecutor(self.root, max_workers=2, name='niilo-images')
+        self.images = ImageLoader(self.image_executor)
+        self.executor.submit(self.db.load_friend_graph)  # Índice de amistades en memoria
+        self.executor.submit(self.db.ensure_search_index)  # Índice de búsqueda (sólo si está vacío)
+        self.executor.submit(self.db.load_user_directory)  # Búsqueda de usuarios mientras se escribe
         self.windows = Windows(self)
+        self.notifications = NotificationPoller(self.db)  # Novedades del usuario conectado
+        self._notification_job = None
         
         self.current_user_id = None
+        self.liked_posts = set()  # Publicaciones con like en esta sesión (botón desactivado)
         self.open_windows = []  # Track open windows
         self.query_history = []  # Historial de consultas SQL (solo BD)
         
@@ -62,6 +92,22 @@ class ModernRedSocialApp:
                                   bg='#2d2d44', fg='#ff6b6b')
         self.user_label.pack(side=tk.LEFT, padx=20, pady=15)
         
+        # Caja de búsqueda (publicaciones, comentarios y usuarios)
+        search_frame = tk.Frame(user_panel, bg='#2d2d44')
+        search_frame.pack(side=tk.LEFT, padx=10, pady=10)
+        
+        self.search_entry = tk.Entry(search_frame, font=('Segoe UI', 12), width=24,
+                                     bg='#16213e', fg='white', insertbackground='white',
+                                     border=0, relief='flat')
+        self.search_entry.pack(side=tk.LEFT, ipady=6)
+        self.search_entry.bind('<Return>', lambda e: self.show_search_results(self.search_entry.get()))
+        
+        search_btn = tk.Button(search_frame, text="🔍", 
+                               command=lambda: self.show_search_results(self.search_entry.get()),
+                               bg='#45b7d1', fg='white', font=('Segoe UI', 11, 'bold'),
+                               border=0, cursor='hand2', padx=10, pady=4)
+        search_btn.pack(side=tk.LEFT, padx=(5, 0))
+        
         # BOTONES DE AUTENTICACIÓN
         auth_frame = tk.Frame(user_panel, bg='#2d2d44')
         auth_frame.pack(side=tk.RIGHT, padx=20, pady=10)
@@ -139,6 +185,7 @@ class ModernRedSocialApp:
         ]
         
         # Colocar botones en grid
+        self.main_buttons = {}
         for i, (text, command, bg_color, hover_color) in enumerate(buttons_config):
             row = i // 3
             col = i % 3
@@ -154,6 +201,7 @@ class ModernRedSocialApp:
                              activeforeground='white', relief='flat',
                              pady=20)
             button.pack(fill='both', expand=True)
+            self.main_buttons[text] = button
             
             # Hover effects
             def make_hover(btn, normal_color, hover_color):
@@ -179,6 +227,8 @@ class ModernRedSocialApp:
     def logout(self):
         """Cerrar sesión del usuario"""
         self.current_user_id = None
+        self.liked_posts.clear()
+        self.stop_notifications()
         self.user_label.config(text="👤 Usuario no conectado", fg='#ff6b6b')
         
         # Ocultar botón logout y mostrar botones de login/register
@@ -188,25 +238,148 @@ class ModernRedSocialApp:
         
         messagebox.showinfo("Sesión cerrada", "Has cerrado sesión correctamente")
     
+    def show_search_results(self, query):
+        """Mostrar los resultados de una búsqueda ordenados por relevancia"""
+        query = query.strip()
+        if not query:
+            return
+        
+        results_win = UIComponents.create_modern_window(self.root, "🔍 Búsqueda", "900x500")
+        
+        main_frame = tk.Frame(results_win, bg='#1a1a2e')
+        main_frame.pack(expand=True, fill='both', padx=20, pady=20)
+        
+        title_label = tk.Label(main_frame, text=f"Resultados para «{query}»", 
+                              font=('Segoe UI', 16, 'bold'), 
+                              bg='#1a1a2e', fg='white')
+        title_label.pack(pady=(0, 20))
+        
+        results_tree = ttk.Treeview(main_frame, 
+                                   columns=('Tipo', 'Autor', 'Texto', 'Fecha'),
+                                   show='headings', style="Modern.Treeview")
+        
+        for col in ['Tipo', 'Autor', 'Texto', 'Fecha']:
+            results_tree.heading(col, text=col)
+            results_tree.column(col, width=150)
+        
+        results_tree.column('Texto', width=400)
+        
+        results_tree.pack(fill='both', expand=True)
+        loading_label = UIComponents.create_loading_label(main_frame)
+        
+        labels = {'publicacion': "Publicación", 'comentario': "Comentario", 'usuario': "Usuario"}
+        
+        def on_results_loaded(results):
+            loading_label.destroy()
+            if not results:
+                results_tree.insert('', 'end', values=('', '', "Sin resultados", ''))
+                return
+            for tipo, _, texto, autor, fecha, _, _ in results:
+                texto, fecha = self.format_message(texto, fecha)
+                results_tree.insert('', 'end', values=(labels.get(tipo, tipo), autor, texto, fecha))
+        
+        self.executor.submit(self.db.search, query, callback=on_results_loaded, widget=results_tree)
+    
+    # --- Notificaciones ---
+    
+    def start_notifications(self):
+        """Empezar el sondeo de novedades del usuario recién conectado"""
+        self.stop_notifications()
+        self.notifications.start_session(self.current_user_id)
+        self.poll_notifications()
+    
+    def stop_notifications(self):
+        if self._notification_job is not None:
+            self.root.after_cancel(self._notification_job)
+            self._notification_job = None
+        self.notifications.stop_session()
+        self.update_badges({})
+    
+    def poll_notifications(self):
+        """Sondear en segundo plano y programar el siguiente sondeo según la actividad"""
+        self._notification_job = None
+        user_id = self.current_user_id
+        
+        def on_polled(counts):
+            if self.current_user_id != user_id or counts is None:
+                return
+            self.update_badges(counts)
+            self.schedule_notifications()
+        
+        def on_error(error):
+            print(f"Error consultando notificaciones: {error}")
+            if self.current_user_id == user_id:
+                self.schedule_notifications()
+        
+        self.executor.submit(self.notifications.poll, callback=on_polled, errback=on_error)
+    
+    def schedule_notifications(self):
+        if self._notification_job is None:
+            self._notification_job = self.root.after(int(self.notifications.interval * 1000),
+                                                     self.poll_notifications)
+    
+    def poke_notifications(self):
+        """Volver al intervalo mínimo tras una acción que suele tener respuesta (p. ej. un mensaje)"""
+        self.notifications.poke()
+        # Si hay un sondeo en marcha, él mismo programará el siguiente con el nuevo intervalo
+        if self._notification_job is not None:
+            self.root.after_cancel(self._notification_job)
+            self._notification_job = None
+            self.schedule_notifications()
+    
+    def update_badges(self, counts):
+        """Mostrar en cada botón principal el número de novedades pendientes"""
+        totals = dict.fromkeys(self.NOTIFICATION_BUTTONS.values(), 0)
+        for kind, count in counts.items():
+            totals[self.NOTIFICATION_BUTTONS[kind]] += count
+        for text, total in totals.items():
+            button = self.main_buttons.get(text)
+            if button is not None:
+                button.config(text=f"{text}  🔴 {total}" if total else text)
+    
+    def mark_notifications_seen(self, *kinds):
+        self.update_badges(self.notifications.mark_seen(*kinds))
+    
     def show_users(self):
         """Mostrar ventana de usuarios"""
         if not self.current_user_id:
             messagebox.showwarning("Acceso denegado", "Debes iniciar sesión para ver usuarios")
             return
         
-        users_win = UIComponents.create_modern_window(self.root, "👥 Usuarios", "800x600")
+        users_win = UIComponents.create_modern_window(self.root, "👥 Usuarios", "800x700")
         
         # Frame principal
         main_frame = tk.Frame(users_win, bg='#1a1a2e')
         main_frame.pack(expand=True, fill='both', padx=20, pady=20)
         
+        # Personas que quizá conozcas (amigos de amigos)
+        suggestions_label = tk.Label(main_frame, text="Personas que quizá conozcas", 
+                                    font=('Segoe UI', 16, 'bold'), 
+                                    bg='#1a1a2e', fg='white')
+        suggestions_label.pack(pady=(0, 10))
+        
+        suggestions_tree = ttk.Treeview(main_frame, 
+                                       columns=('ID', 'Nombre', 'Email', 'En común', 'Ubicación'),
+                                       show='headings', style="Modern.Treeview", height=5)
+        for col in ['ID', 'Nombre', 'Email', 'En común', 'Ubicación']:
+            suggestions_tree.heading(col, text=col)
+            suggestions_tree.column(col, width=120)
+        suggestions_tree.pack(fill='x', padx=20)
+        
+        def on_suggestions_loaded(suggestions):
+            for suggestion in suggestions or []:
+                suggestions_tree.insert('', 'end', values=tuple('' if v is None else v for v in suggestion))
+        
+        self.executor.submit(self.db.get_friend_suggestions, self.current_user_id,
+                             callback=on_suggestions_loaded, widget=suggestions_tree)
+        
         # Título
         title_label = tk.Label(main_frame, text="Usuarios registrados", 
                               font=('Segoe UI', 16, 'bold'), 
                               bg='#1a1a2e', fg='white')
-        title_label.pack(pady=(0, 20))
+        title_label.pack(pady=(20, 0))
         
-        # Treeview para usuarios
+        # Treeview para usuarios, filtrado por la búsqueda
         users_tree = ttk.Treeview(main_frame, 
                                  columns=('ID', 'Nombre', 'Email'),
                                  show='headings', style="Modern.Treeview")
@@ -215,27 +388,31 @@ class ModernRedSocialApp:
             users_tree.heading(col, text=col)
             users_tree.column(col, width=150)
         
-        # Cargar usuarios
-        users = self.db.get_all_users()
-        if users:
-            for user in users:
-                if user[0] != self.current_user_id:  # No mostrar al usuario actual
-                    users_tree.insert('', 'end', values=tuple(user))
-        
+        self.create_user_typeahead(main_frame, users_tree)
         users_tree.pack(fill='both', expand=True, padx=20, pady=20)
         
+        # Las acciones se aplican a la sugerencia seleccionada o, si no hay, al usuario de la lista
+        def selected_tree():
+            return suggestions_tree if suggestions_tree.selection() else users_tree
+        
+        # Sólo puede haber selección en una de las dos listas
+        suggestions_tree.bind('<<TreeviewSelect>>', lambda e: suggestions_tree.selection()
+                              and users_tree.selection_remove(users_tree.selection()))
+        users_tree.bind('<<TreeviewSelect>>', lambda e: users_tree.selection()
+                        and suggestions_tree.selection_remove(suggestions_tree.selection()))
+        
         # Botones de acción
         buttons_frame = tk.Frame(main_frame, bg='#1a1a2e')
         buttons_frame.pack(fill='x', pady=(20, 0))
         
         send_msg_btn = tk.Button(buttons_frame, text="💬 ENVIAR MENSAJE", 
-                                command=lambda: self.send_message_to_selected_user(users_tree),
+                                command=lambda: self.send_message_to_selected_user(selected_tree()),
                                 bg='#4ecdc4', fg='white', font=('Segoe UI', 12, 'bold'),
                                 border=0, cursor='hand2', padx=20, pady=10)
         send_msg_btn.pack(side='left', padx=10)
         
         friend_btn = tk.Button(buttons_frame, text="🤝 SOLICITUD AMISTAD", 
-                              command=lambda: self.send_friend_request_to_selected_user(users_tree),
+                              command=lambda: self.send_friend_request_to_selected_user(selected_tree()),
                               bg='#45b7d1', fg='white', font=('Segoe UI', 12, 'bold'),
                               border=0, cursor='hand2', padx=20, pady=10)
         friend_btn.pack(side='left', padx=10)
@@ -256,26 +433,27 @@ class ModernRedSocialApp:
         if selected:
             user_id = tree.item(selected[0])['values'][0]
             user_name = tree.item(selected[0])['values'][1]
+            current_user_id = self.current_user_id
             
-            # Verificar si ya existe una solicitud
-            existing, _ = self.db.execute_query("""
-                SELECT estado FROM amistades 
-                WHERE (usuario1_id = ? AND usuario2_id = ?) 
-                   OR (usuario1_id = ? AND usuario2_id = ?)
-            """, (self.current_user_id, user_id, user_id, self.current_user_id))
+            def request_friendship():
+                # La inserción sólo ocurre si no hay relación previa; si no, decir cuál hay
+                if self.db.send_friend_request(current_user_id, user_id):
+                    return 'enviada'
+                return self.db.get_friendship_status(current_user_id, user_id)
             
-            if existing:
-                if existing[0][0] == 'aceptada':
+            def on_done(estado):
+                if estado == 'aceptada':
                     messagebox.showinfo("Info", "Ya son amigos")
-                elif existing[0][0] == 'pendiente':
+                elif estado == 'pendiente':
                     messagebox.showinfo("Info", "Ya existe una solicitud pendiente")
-                else:
+                elif estado == 'rechazada':
                     messagebox.showinfo("Info", "Solicitud rechazada anteriormente")
-            else:
-                if self.db.send_friend_request(self.current_user_id, user_id):
+                elif estado == 'enviada':
                     messagebox.showinfo("¡Enviado!", f"Solicitud de amistad enviada a {user_name} 🤝")
                 else:
                     messagebox.showerror("Error", "No se pudo enviar la solicitud")
+            
+            self.executor.submit(request_friendship, callback=on_done)
         else:
             messagebox.showwarning("Selección requerida", "Debes seleccionar un usuario")
     
@@ -302,11 +480,18 @@ class ModernRedSocialApp:
         def send_message():
             contenido = message_entry.get("1.0", tk.END).strip()
             if contenido:
-                if self.db.send_message(self.current_user_id, recipient_id, contenido):
-                    messagebox.showinfo("¡Enviado!", "Mensaje enviado correctamente")
-                    msg_win.destroy()
-                else:
-                    messagebox.showerror("Error", "No se pudo enviar el mensaje")
+                def on_sent(ok):
+                    send_btn.config(state='normal')
+                    if ok:
+                        self.poke_notifications()
+                        messagebox.showinfo("¡Enviado!", "Mensaje enviado correctamente")
+                        msg_win.destroy()
+                    else:
+                        messagebox.showerror("Error", "No se pudo enviar el mensaje")
+                
+                send_btn.config(state='disabled')
+                self.executor.submit(self.db.send_message, self.current_user_id, recipient_id, contenido,
+                                     callback=on_sent, widget=msg_win)
             else:
                 messagebox.showwarning("Campo vacío", "Debes escribir un mensaje")
         
@@ -343,11 +528,17 @@ class ModernRedSocialApp:
         def publish_post():
             contenido = content_entry.get("1.0", tk.END).strip()
             if contenido:
-                if self.db.create_post(self.current_user_id, contenido):
-                    messagebox.showinfo("¡Publicado!", "Publicación creada exitosamente")
-                    post_win.destroy()
-                else:
-                    messagebox.showerror("Error", "No se pudo crear la publicación")
+                def on_published(ok):
+                    publish_btn.config(state='normal')
+                    if ok:
+                        messagebox.showinfo("¡Publicado!", "Publicación creada exitosamente")
+                        post_win.destroy()
+                    else:
+                        messagebox.showerror("Error", "No se pudo crear la publicación")
+                
+                publish_btn.config(state='disabled')
+                self.executor.submit(self.db.create_post, self.current_user_id, contenido,
+                                     callback=on_published, widget=post_win)
             else:
                 messagebox.showwarning("Campo vacío", "Debes escribir algo para publicar")
         
@@ -358,84 +549,106 @@ class ModernRedSocialApp:
         publish_btn.pack(pady=20)
     
     def show_posts(self):
-        """Mostrar ventana de publicaciones"""
+        """Mostrar ventana de publicaciones (carga páginas al acercarse al final)"""
         print("Iniciando show_posts...")
-        
-        # Debugging del estado de la base de datos
-        self.db.debug_database_state()
+        if self.current_user_id:
+            self.mark_notifications_seen('likes', 'comentarios')
         
         posts_win = UIComponents.create_modern_window(self.root, "📝 Publicaciones", "900x700")
         
-        # Frame principal con scroll
-        canvas = tk.Canvas(posts_win, bg='#1a1a2e')
-        scrollbar = ttk.Scrollbar(posts_win, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg='#1a1a2e')
-        
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
         # Título
-        title_label = tk.Label(scrollable_frame, text="Publicaciones recientes", 
+        title_label = tk.Label(posts_win,
+                              text="Tu timeline" if self.current_user_id else "Publicaciones recientes", 
                               font=('Segoe UI', 16, 'bold'), 
                               bg='#1a1a2e', fg='white')
         title_label.pack(pady=20)
         
-        # Cargar publicaciones
-        print("Llamando a get_all_posts...")
-        posts = self.db.get_all_posts()
-        print(f"Posts obtenidos: {posts}")
-        if posts:
-            print(f"Procesando {len(posts)} publicaciones...")
-            for i, post in enumerate(posts):
-                print(f"Procesando post {i+1}: {post}")
-                card = UIComponents.create_post_card(scrollable_frame, post)
-                
-                # Agregar botones de interacción si el usuario está conectado
-                if self.current_user_id:
-                    interaction_frame = tk.Frame(card, bg='#2d2d44')
-                    interaction_frame.pack(fill='x', padx=15, pady=(0, 10))
-                    
-                    like_btn = tk.Button(interaction_frame, text=f"❤️ {post[7]}", 
-                                       command=lambda p=post[0], w=posts_win: self.like_post_and_refresh(p, w),
-                                       bg='#ff6b6b', fg='white', font=('Segoe UI', 10),
-                                       border=0, cursor='hand2', padx=15, pady=5)
-                    like_btn.pack(side='left', padx=5)
-                    
-                    comment_btn = tk.Button(interaction_frame, text=f"💬 {post[8]}", 
-                                          command=lambda p=post[0], a=post[1], c=post[3]: self.show_post_comments_window(p, a, c),
-                                          bg='#45b7d1', fg='white', font=('Segoe UI', 10),
-                                          border=0, cursor='hand2', padx=15, pady=5)
-                    comment_btn.pack(side='left', padx=5)
-
-                    view_comments_btn = tk.Button(interaction_frame, text="VER COMENTARIOS",
-                                                command=lambda p=post[0], a=post[1], c=post[3]: self.show_post_comments_window(p, a, c),
-                                                bg='#feca57', fg='white', font=('Segoe UI', 10),
-                                                border=0, cursor='hand2', padx=15, pady=5)
-                    view_comments_btn.pack(side='left', padx=5)
-        else:
-            print("No se encontraron publicaciones")
-            no_posts_label = tk.Label(scrollable_frame, text="No hay publicaciones disponibles", 
-                                     font=('Segoe UI', 14), 
-                                     bg='#1a1a2e', fg='#a0a0a0')
-            no_posts_label.pack(pady=50)
-        
-        # Configurar scroll
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-    
-    def like_post_and_refresh(self, post_id, window):
-        """Da like a un post y refresca la ventana de posts"""
-        if self.db.like_post(self.current_user_id, post_id):
-            messagebox.showinfo("¡Me gusta!", "Te gustó esta publicación ❤️")
-            window.destroy()
-            self.show_posts()
-        else:
+        # Estado de la paginación por clave
+        feed_state = {'cursor': None, 'loading': True, 'done': False}
+        
+        def load_page(cursor):
+            print(f"Cargando página del feed tras {cursor}...")
+            if self.current_user_id:
+                return self.db.get_timeline_page(self.current_user_id, after=cursor, limit=self.FEED_PAGE_SIZE)
+            return self.db.get_posts_page(after=cursor, limit=self.FEED_PAGE_SIZE)
+        
+        def on_page_loaded(posts):
+            feed_state['loading'] = False
+            feed.set_status('')
+            posts = posts or []
+            if len(posts) < self.FEED_PAGE_SIZE:
+                feed_state['done'] = True
+            if posts:
+                print(f"Añadiendo {len(posts)} publicaciones al feed")
+                feed_state['cursor'] = (posts[-1][4], posts[-1][0])
+                feed.append(posts)
+            elif not feed.posts:
+                print("No se encontraron publicaciones")
+                feed.set_status("No hay publicaciones disponibles")
+        
+        def load_next_page():
+            if feed_state['loading'] or feed_state['done']:
+                return
+            feed_state['loading'] = True
+            feed.set_status("⏳ Cargando...")  # Queda al final de las tarjetas
+            self.executor.submit(load_page, feed_state['cursor'],
+                                 callback=on_page_loaded, widget=posts_win)
+        
+        def on_scroll(first, last):
+            # Pedir la siguiente página al acercarse al final
+            if float(last) >= self.FEED_PREFETCH_THRESHOLD:
+                load_next_page()
+        
+        # Sólo las tarjetas visibles existen como widgets; se reutilizan al desplazarse
+        feed = VirtualPostList(posts_win, row_height=self.FEED_ROW_HEIGHT,
+                               actions=lambda post: self.post_actions(post, feed),
+                               on_scroll=on_scroll)
+        feed.frame.pack(fill='both', expand=True)
+        feed.set_status("⏳ Cargando...")
+        
+        # Cargar la primera página en segundo plano
+        self.executor.submit(load_page, None, callback=on_page_loaded, widget=posts_win)
+    
+    def post_actions(self, post, feed):
+        """Botones de interacción de una tarjeta del feed (sólo con sesión iniciada)"""
+        if not self.current_user_id:
+            return []
+        liked = post[0] in self.liked_posts
+        return [
+            (f"❤️ {post[7]}", '#ff6b6b', lambda: self.like_post_in_feed(post[0], feed), not liked),
+            (f"💬 {post[8]}", '#45b7d1', lambda: self.show_post_comments_window(post[0], post[1], post[3]), True),
+            ("VER COMENTARIOS", '#feca57', lambda: self.show_post_comments_window(post[0], post[1], post[3]), True),
+        ]
+    
+    def like_post_in_feed(self, post_id, feed):
+        """Dar like a una publicación del feed actualizando sólo su tarjeta.
+
+        El contador sube y el botón se desactiva al momento; el like se
+        guarda en segundo plano y, si falla (p. ej. ya le habías dado like),
+        se deshace el cambio en la tarjeta.
+        """
+        if post_id in self.liked_posts or feed.get_post(post_id) is None:
+            return
+        
+        def add_likes(delta):
+            post = tuple(feed.get_post(post_id))
+            feed.update_post(post[:7] + (post[7] + delta,) + post[8:])
+        
+        def on_liked(ok):
+            if not ok:
+                rollback()
+        
+        def rollback(error=None):
+            self.liked_posts.discard(post_id)
+            if not feed.frame.winfo_exists():  # El feed ya se cerró: sólo queda olvidar el like
+                return
+            add_likes(-1)
             messagebox.showerror("Error", "No se pudo dar like a la publicación o ya le diste like.")
+        
+        self.liked_posts.add(post_id)
+        add_likes(1)
+        self.executor.submit(self.db.like_post, self.current_user_id, post_id,
+                             callback=on_liked, errback=rollback)
     
     def show_post_comments_window(self, post_id, autor, contenido):
         """Muestra los comentarios de una publicación y permite añadir uno nuevo"""
@@ -459,15 +672,18 @@ class ModernRedSocialApp:
         comments_tree.column('Comentario', width=350)
         comments_tree.column('Fecha', width=150)
         
-        def load_comments():
+        def on_comments_loaded(comments_data):
             for item in comments_tree.get_children():
                 comments_tree.delete(item)
             
-            comments_data = self.db.get_post_comments(post_id)
             if comments_data:
                 for comment in comments_data:
                     fecha = comment[2].strftime('%d/%m/%Y %H:%M') if hasattr(comment[2], 'strftime') else str(comment[2])
                     comments_tree.insert('', 'end', values=(comment[3], comment[1], fecha))
+        
+        def load_comments():
+            self.executor.submit(self.db.get_post_comments, post_id,
+                                 callback=on_comments_loaded, widget=comments_tree)
 
         comments_tree.pack(fill='both', expand=True)
         load_comments()
@@ -482,12 +698,18 @@ class ModernRedSocialApp:
         def submit_comment():
             comentario = comment_entry.get("1.0", tk.END).strip()
             if comentario:
-                if self.db.comment_post(self.current_user_id, post_id, comentario):
-                    messagebox.showinfo("¡Comentado!", "Comentario publicado exitosamente")
-                    comment_entry.delete("1.0", tk.END)
-                    load_comments() # Recargar comentarios
-                else:
-                    messagebox.showerror("Error", "No se pudo publicar el comentario")
+                def on_commented(ok):
+                    submit_btn.config(state='normal')
+                    if ok:
+                        messagebox.showinfo("¡Comentado!", "Comentario publicado exitosamente")
+                        comment_entry.delete("1.0", tk.END)
+                        load_comments() # Recargar comentarios
+                    else:
+                        messagebox.showerror("Error", "No se pudo publicar el comentario")
+                
+                submit_btn.config(state='disabled')
+                self.executor.submit(self.db.comment_post, self.current_user_id, post_id, comentario,
+                                     callback=on_commented, widget=comments_win)
             else:
                 messagebox.showwarning("Campo vacío", "Debes escribir un comentario")
         
@@ -499,6 +721,7 @@ class ModernRedSocialApp:
         if not self.current_user_id:
             messagebox.showwarning("Acceso denegado", "Debes iniciar sesión para ver mensajes")
             return
+        self.mark_notifications_seen('mensajes')
         
         messages_win = UIComponents.create_modern_window(self.root, "💬 Mensajes", "800x600")
         
@@ -512,26 +735,35 @@ class ModernRedSocialApp:
                               bg='#1a1a2e', fg='white')
         title_label.pack(pady=(0, 20))
         
-        # Treeview para mensajes
+        # Treeview de conversaciones; cada una se despliega en sus mensajes
         messages_tree = ttk.Treeview(main_frame, 
                                     columns=('Tipo', 'De/Para', 'Mensaje', 'Fecha'),
-                                    show='headings', style="Modern.Treeview")
+                                    show='tree headings', style="Modern.Treeview")
         
+        messages_tree.column('#0', width=30, stretch=False)
         for col in ['Tipo', 'De/Para', 'Mensaje', 'Fecha']:
             messages_tree.heading(col, text=col)
             messages_tree.column(col, width=150)
         
         messages_tree.column('Mensaje', width=300)
         
-        # Cargar mensajes
-        messages = self.db.get_user_messages(self.current_user_id)
-        if messages:
-            for msg in messages:
-                fecha = msg[2].strftime("%d/%m/%Y %H:%M") if hasattr(msg[2], 'strftime') else str(msg[2])
-                contenido = msg[1][:50] + "..." if len(msg[1]) > 50 else msg[1]
-                messages_tree.insert('', 'end', values=(msg[4], msg[3], contenido, fecha))
-        
         messages_tree.pack(fill='both', expand=True, padx=20, pady=20)
+        loading_label = UIComponents.create_loading_label(main_frame)
+        
+        # Último id de mensaje mostrado, conversaciones con los mensajes ya cargados
+        # y relleno por trozos del árbol
+        inbox = {'last_id': 0, 'loaded': set(), 'loader': TreeviewLoader(messages_tree, self.executor)}
+        
+        # Cargar conversaciones en segundo plano
+        def on_conversations_loaded(conversations):
+            loading_label.destroy()
+            self.fill_conversations_tree(messages_tree, inbox, conversations)
+        
+        self.executor.submit(self.db.get_conversations, self.current_user_id,
+                             callback=on_conversations_loaded, widget=messages_tree)
+        
+        messages_tree.bind('<<TreeviewOpen>>',
+                           lambda e: self.load_conversation(messages_tree, inbox, messages_tree.focus()))
         
         # Botones de acción
         buttons_frame = tk.Frame(main_frame, bg='#1a1a2e')
@@ -544,19 +776,13 @@ class ModernRedSocialApp:
         new_msg_btn.pack(side='left', padx=10)
         
         refresh_btn = tk.Button(buttons_frame, text="🔄 ACTUALIZAR", 
-                               command=lambda: self.refresh_messages(messages_tree),
+                               command=lambda: self.refresh_messages(messages_tree, inbox),
                                bg='#45b7d1', fg='white', font=('Segoe UI', 12, 'bold'),
                                border=0, cursor='hand2', padx=20, pady=10)
         refresh_btn.pack(side='left', padx=10)
     
     def show_new_message_dialog(self):
         """Mostrar diálogo para nuevo mensaje"""
-        # Obtener lista de usuarios para seleccionar destinatario
-        users = self.db.get_all_users()
-        if not users:
-            messagebox.showinfo("Info", "No hay usuarios disponibles")
-            return
-        
         # Crear ventana de selección
         select_win = UIComponents.create_modern_window(self.root, "✉️ Nuevo Mensaje", "600x500")
         
@@ -570,7 +796,7 @@ class ModernRedSocialApp:
                               bg='#1a1a2e', fg='white')
         title_label.pack(pady=(0, 20))
         
-        # Treeview para usuarios
+        # Treeview para usuarios, filtrado por la búsqueda
         users_tree = ttk.Treeview(main_frame, 
                                  columns=('ID', 'Nombre', 'Email'),
                                  show='headings', style="Modern.Treeview")
@@ -579,11 +805,12 @@ class ModernRedSocialApp:
             users_tree.heading(col, text=col)
             users_tree.column(col, width=150)
         
-        # Cargar usuarios (excluyendo al usuario actual)
-        for user in users:
-            if user[0] != self.current_user_id:
-                users_tree.insert('', 'end', values=tuple(user))
+        def on_first_results(users):
+            if not users:
+                messagebox.showinfo("Info", "No hay usuarios disponibles", parent=select_win)
+                select_win.destroy()
         
+        self.create_user_typeahead(main_frame, users_tree, on_first_results)
         users_tree.pack(fill='both', expand=True, padx=20, pady=20)
         
         def send_to_selected():
@@ -602,27 +829,110 @@ class ModernRedSocialApp:
                            border=0, cursor='hand2', padx=20, pady=10)
         send_btn.pack(pady=20)
     
-    def refresh_messages(self, tree):
-        """Actualizar lista de mensajes"""
-        # Limpiar árbol
-        for item in tree.get_children():
-            tree.delete(item)
+    def create_user_typeahead(self, parent, users_tree, on_first_results=None):
+        """Caja de búsqueda que rellena ``users_tree`` con las coincidencias de cada pulsación.
+        
+        Las búsquedas se resuelven en el directorio en memoria; van a un hilo
+        de trabajo sólo si aún no está cargado o toca leer las altas nuevas.
+        """
+        search_entry = tk.Entry(parent, font=('Segoe UI', 12), bg='#16213e', fg='white',
+                                insertbackground='white', border=0, relief='flat')
+        search_entry.pack(fill='x', ipady=6, padx=20, pady=(10, 0))
+        exclude = (self.current_user_id,)
+        
+        def show_users(users, first=False):
+            users_tree.delete(*users_tree.get_children())
+            for user in users or []:
+                users_tree.insert('', 'end', values=tuple(user))
+            if first and on_first_results is not None:
+                on_first_results(users)
         
-        # Recargar mensajes
-        messages = self.db.get_user_messages(self.current_user_id)
-        if messages:
-            for msg in messages:
-                fecha = msg[2].strftime("%d/%m/%Y %H:%M") if hasattr(msg[2], 'strftime') else str(msg[2])
-                contenido = msg[1][:50] + "..." if len(msg[1]) > 50 else msg[1]
-                tree.insert('', 'end', values=(msg[4], msg[3], contenido, fecha))
+        def on_key(event=None):
+            if self.db.user_directory_current():
+                show_users(self.db.search_users(search_entry.get(), self.USER_PICKER_LIMIT, exclude))
+            else:
+                self.executor.submit(self.db.search_users, search_entry.get(), self.USER_PICKER_LIMIT, exclude,
+                                     callback=show_users, widget=users_tree)
+        
+        search_entry.bind('<KeyRelease>', on_key)
+        self.executor.submit(self.db.search_users, '', self.USER_PICKER_LIMIT, exclude,
+                             callback=lambda users: show_users(users, first=True), widget=users_tree)
+        search_entry.focus_set()
+        return search_entry
+    
+    def format_message(self, contenido, fecha):
+        fecha = fecha.strftime("%d/%m/%Y %H:%M") if hasattr(fecha, 'strftime') else str(fecha)
+        contenido = contenido[:50] + "..." if len(contenido) > 50 else contenido
+        return contenido, fecha
+    
+    def fill_conversations_tree(self, tree, inbox, conversations):
+        """Una fila por conversación con su último mensaje; los mensajes se cargan al desplegarla"""
+        conversations = conversations or []
+        inbox['last_id'] = max([inbox['last_id'], *(conversation[2] for conversation in conversations)])
+        
+        def insert(row):
+            contact_id, contacto, _, contenido, fecha, tipo, _ = row
+            conversation = f"conv-{contact_id}"
+            if tree.exists(conversation):
+                return
+            tree.insert('', 'end', iid=conversation, values=(tipo, contacto, *self.format_message(contenido, fecha)))
+            tree.insert(conversation, 'end', iid=f"{conversation}-cargando", values=('', '', "Cargando...", ''))
+        
+        inbox['loader'].load(conversations, insert=insert, clear=False)
+    
+    def load_conversation(self, tree, inbox, conversation):
+        """Cargar los mensajes de una conversación la primera vez que se despliega"""
+        if not conversation.startswith('conv-') or conversation in inbox['loaded']:
+            return
+        inbox['loaded'].add(conversation)
+        contact_id = int(conversation[len('conv-'):])
+        
+        def on_messages_loaded(messages):
+            if tree.exists(f"{conversation}-cargando"):
+                tree.delete(f"{conversation}-cargando")
+            for msg_id, contenido, fecha, _, tipo in messages or []:
+                # El refresco puede haber añadido ya los más nuevos
+                if not tree.exists(f"msg-{msg_id}"):
+                    tree.insert(conversation, 'end', iid=f"msg-{msg_id}",
+                                values=(tipo, '', *self.format_message(contenido, fecha)))
+        
+        self.executor.submit(self.db.get_conversation_messages, self.current_user_id, contact_id,
+                             callback=on_messages_loaded, widget=tree)
+    
+    def refresh_messages(self, tree, inbox):
+        """Añadir sólo los mensajes posteriores al último mostrado"""
+        def on_messages_loaded(messages):
+            messages = messages or []
+            self.mark_notifications_seen('mensajes')
+            inbox['last_id'] = max([inbox['last_id'], *(message[0] for message in messages)])
+            
+            def insert(message):
+                msg_id, contenido, fecha, _, contacto, tipo, contact_id = message
+                conversation = f"conv-{contact_id}"
+                values = self.format_message(contenido, fecha)
+                if tree.exists(conversation):
+                    tree.item(conversation, values=(tipo, contacto, *values))
+                    tree.move(conversation, '', 0)
+                else:
+                    # Conversación nueva: todos sus mensajes llegan en este refresco
+                    tree.insert('', 0, iid=conversation, values=(tipo, contacto, *values))
+                    inbox['loaded'].add(conversation)
+                if conversation in inbox['loaded'] and not tree.exists(f"msg-{msg_id}"):
+                    tree.insert(conversation, 0, iid=f"msg-{msg_id}", values=(tipo, '', *values))
+            
+            # Detrás de lo que quede por insertar de la carga inicial
+            inbox['loader'].load(messages, insert=insert, clear=False)
+            messagebox.showinfo("Actualizado", f"{len(messages)} mensajes nuevos", parent=tree.winfo_toplevel())
         
-        messagebox.showinfo("Actualizado", "Lista de mensajes actualizada")
+        self.executor.submit(self.db.get_messages_since, self.current_user_id, inbox['last_id'],
+                             callback=on_messages_loaded, widget=tree)
     
     def manage_friendships(self):
         """Gestionar amistades"""
         if not self.current_user_id:
             messagebox.showwarning("Acceso denegado", "Debes iniciar sesión para gestionar amistades")
             return
+        self.mark_notifications_seen('solicitudes')
         
         friends_win = UIComponents.create_modern_window(self.root, "🤝 Gestión de Amistades", "1000x700")
         
@@ -642,14 +952,14 @@ class ModernRedSocialApp:
             friends_tree.heading(col, text=col)
             friends_tree.column(col, width=200)
         
+        friends_loader = TreeviewLoader(friends_tree, self.executor)
+        
+        def on_friends_loaded(friends):
+            friends_loader.load(friends)
+        
         def load_friends():
-            for item in friends_tree.get_children():
-                friends_tree.delete(item)
-            
-            friends = self.db.get_user_friends(self.current_user_id)
-            if friends:
-                for friend in friends:
-                    friends_tree.insert('', 'end', values=tuple(friend))
+            self.executor.submit(self.db.get_user_friends, self.current_user_id,
+                                 callback=on_friends_loaded, widget=friends_tree)
         
         def send_message_to_friend():
             selected = friends_tree.selection()
@@ -688,25 +998,34 @@ class ModernRedSocialApp:
             requests_tree.heading(col, text=col)
             requests_tree.column(col, width=150)
         
+        requests_loader = TreeviewLoader(requests_tree, self.executor)
+        
+        def insert_request(req):
+            fecha = req[3].strftime("%d/%m/%Y") if hasattr(req[3], 'strftime') else str(req[3])
+            requests_tree.insert('', 'end', values=(req[0], req[1], req[2], fecha))
+        
+        def on_requests_loaded(requests):
+            requests_loader.load(requests, insert=insert_request)
+        
         def load_pending_requests():
-            for item in requests_tree.get_children():
-                requests_tree.delete(item)
-            
-            requests = self.db.get_friend_requests(self.current_user_id)
-            if requests:
-                for req in requests:
-                    fecha = req[3].strftime("%d/%m/%Y") if hasattr(req[3], 'strftime') else str(req[3])
-                    requests_tree.insert('', 'end', values=(req[0], req[1], req[2], fecha))
+            self.executor.submit(self.db.get_friend_requests, self.current_user_id,
+                                 callback=on_requests_loaded, widget=requests_tree)
         
         def accept_request():
             selected = requests_tree.selection()
             if selected:
                 user_id = requests_tree.item(selected[0])['values'][0]
-                if self.db.accept_friend_request(user_id, self.current_user_id):
-                    messagebox.showinfo("¡Genial!", "Solicitud de amistad aceptada ✅")
-                    load_pending_requests()
-                else:
-                    messagebox.showerror("Error", "No se pudo aceptar la solicitud")
+                
+                def on_accepted(ok):
+                    if ok:
+                        messagebox.showinfo("¡Genial!", "Solicitud de amistad aceptada ✅")
+                        load_pending_requests()
+                        load_friends()
+                    else:
+                        messagebox.showerror("Error", "No se pudo aceptar la solicitud")
+                
+                self.executor.submit(self.db.accept_friend_request, user_id, self.current_user_id,
+                                     callback=on_accepted, widget=requests_tree)
             else:
                 messagebox.showwarning("Selección requerida", "Debes seleccionar una solicitud")
         
@@ -714,11 +1033,16 @@ class ModernRedSocialApp:
             selected = requests_tree.selection()
             if selected:
                 user_id = requests_tree.item(selected[0])['values'][0]
-                if self.db.execute_update("UPDATE amistades SET estado = 'rechazada' WHERE usuario1_id = ? AND usuario2_id = ?", (user_id, self.current_user_id)):
-                    messagebox.showinfo("Rechazada", "Solicitud rechazada ❌")
-                    load_pending_requests()
-                else:
-                    messagebox.showerror("Error", "No se pudo rechazar la solicitud")
+                
+                def on_rejected(ok):
+                    if ok:
+                        messagebox.showinfo("Rechazada", "Solicitud rechazada ❌")
+                        load_pending_requests()
+                    else:
+                        messagebox.showerror("Error", "No se pudo rechazar la solicitud")
+                
+                self.executor.submit(self.db.reject_friend_request, user_id, self.current_user_id,
+                                     callback=on_rejected, widget=requests_tree)
             else:
                 messagebox.showwarning("Selección requerida", "Debes seleccionar una solicitud")
         
@@ -781,7 +1105,9 @@ class ModernRedSocialApp:
         self.results_tree = ttk.Treeview(tree_frame, show='headings', style="Modern.Treeview")
         vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.results_tree.yview)
         hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.results_tree.xview)
-        self.results_tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.results_tree.configure(xscrollcommand=hsb.set)
+        # Relleno por trozos; las tablas se leen por lotes según se desplaza la vista
+        self.results_loader = TreeviewLoader(self.results_tree, self.executor, scrollbar=vsb)
         vsb.pack(side='right', fill='y')
         hsb.pack(side='bottom', fill='x')
         self.results_tree.pack(fill='both', expand=True)
@@ -820,23 +1146,53 @@ class ModernRedSocialApp:
             query_text.insert("1.0", query)
         queries_list.bind('<<ListboxSelect>>', load_query_from_list)
 
+        # Sólo se muestra el resultado de la última consulta lanzada
+        latest_request = [None]
+        
+        def load_results(query, make_title):
+            token = latest_request[0] = object()
+            self.results_loader.cancel()
+            
+            def on_loaded(res):
+                if token is not latest_request[0]:
+                    return
+                results, columns = res
+                self.update_results_tree(results, columns, make_title(results))
+            
+            self.executor.submit(self.db.execute_query, query, callback=on_loaded, widget=self.results_tree)
+
         def execute_custom_query():
             query = query_text.get("1.0", tk.END).strip()
             if not query:
                 messagebox.showwarning("Consulta vacía", "El editor de consultas está vacío.", parent=db_win)
                 return
-            results, columns = self.db.execute_query(query)
-            self.update_results_tree(results, columns, "Resultado de consulta personalizada")
+            self.results_title.config(text="⏳ Ejecutando consulta...")
             show_view(results_view) # Mostrar resultados tras ejecutar
+            load_results(query, lambda results: "Resultado de consulta personalizada")
 
         # --- Panel Izquierdo (Tablas y control de vistas) ---
         tk.Label(left_panel, text="☰ VISTAS", font=('Segoe UI', 14, 'bold'), bg='#16213e', fg='white').pack(pady=15)
         
         def show_table_data(table_name):
             show_view(results_view)
-            query = f"SELECT * FROM {table_name}"
-            results, columns = self.db.execute_query(query)
-            self.update_results_tree(results, columns, f"Tabla: {table_name.upper()} - {len(results) if results else 0} registros")
+            latest_request[0] = None
+            self.results_title.config(text=f"⏳ Cargando {table_name.upper()}...")
+            
+            def on_open(stream):
+                if stream is None:
+                    self.update_results_tree(None, None, f"Tabla: {table_name.upper()}")
+                    return
+                self.set_results_columns(stream.columns)
+            
+            def on_progress(loaded, complete):
+                more = "" if complete else " (más al desplazarse)"
+                self.results_title.config(text=f"Tabla: {table_name.upper()} - {loaded} registros{more}")
+            
+            # Lectura por páginas con clave: cada lote se pide al acercarse al final de la
+            # tabla y no retiene una conexión del pool mientras tanto
+            self.results_loader.load_stream(
+                lambda: self.db.execute_table_pages(table_name, batch_size=self.VIEWER_BATCH_SIZE),
+                on_open=on_open, on_progress=on_progress)
 
         tables = ['usuarios', 'publicaciones', 'me_gusta', 'comentarios', 'amistades', 'mensajes']
         for table in tables:
@@ -849,37 +1205,81 @@ class ModernRedSocialApp:
         editor_btn = tk.Button(left_panel, text=" ✏️ EDITOR SQL", font=('Segoe UI', 11, 'bold'), bg='#4ecdc4', fg='white', relief='flat', anchor='w', command=lambda: show_view(editor_view))
         editor_btn.pack(fill='x', padx=10, pady=4, ipady=5)
 
+        def show_query_stats():
+            # Métricas en memoria de este proceso: no requieren consultar la base de datos
+            latest_request[0] = None
+            show_view(results_view)
+            stats = self.db.get_query_stats()[:self.QUERY_REPORT_TOP_N]
+            prepared = self.db.get_prepare_stats()
+            columns = ['Sentencia', 'Llamadas', 'Total ms', 'p50 ms', 'p95 ms', 'p99 ms', 'Filas', 'Errores', 'Reuso']
+            rows = [(row['statement'], row['calls'], f"{row['total_ms']:.1f}", f"{row['p50_ms']:.1f}",
+                     f"{row['p95_ms']:.1f}", f"{row['p99_ms']:.1f}", row['rows'], row['errors'],
+                     f"{row['reuse_rate']:.0%}")
+                    for row in stats]
+            self.update_results_tree(rows, columns, f"Top {len(rows)} sentencias por tiempo total · "
+                                                    f"sentencias preparadas reutilizadas: {prepared['reuse_rate']:.0%}")
+
+        def show_health_status():
+            # Último diagnóstico en caché: se pide uno nuevo en segundo plano
+            latest_request[0] = None
+            show_view(results_view)
+            self.db.health.request_refresh()
+            status = self.db.get_health_status()
+            if status is None:
+                self.update_results_tree([], [], "Estado: aún no se ha comprobado")
+                return
+            rows = [(check, value) for check, value in status['counts'].items()]
+            rows.append(('latencia_ms', f"{status['latency_ms']:.1f}"))
+            pool = status['pool']
+            rows.append(('pool_en_uso', f"{pool['in_use']}/{pool['max_size']}"))
+            estado = "✓ OK" if status['ok'] else "✗ SIN CONEXIÓN"
+            self.update_results_tree(rows, ['Comprobación', 'Valor'],
+                                     f"Estado: {estado} · {status['checked_at'].strftime('%H:%M:%S')}")
+
+        health_btn = tk.Button(left_panel, text=" 🩺 ESTADO", font=('Segoe UI', 11, 'bold'), bg='#00b894', fg='white', relief='flat', anchor='w', command=show_health_status)
+        health_btn.pack(fill='x', padx=10, pady=4, ipady=5)
+
+        stats_btn = tk.Button(left_panel, text=" 📊 RENDIMIENTO", font=('Segoe UI', 11, 'bold'), bg='#6c5ce7', fg='white', relief='flat', anchor='w', command=show_query_stats)
+        stats_btn.pack(fill='x', padx=10, pady=4, ipady=5)
+
         # Mostrar vista inicial
         show_table_data('usuarios')
     
     def update_results_tree(self, results, columns, title):
         """Limpia y actualiza el Treeview con nuevos resultados y columnas"""
         self.results_title.config(text=title)
-        
-        for item in self.results_tree.get_children():
-            self.results_tree.delete(item)
+        self.results_loader.cancel()
+        self.results_tree.delete(*self.results_tree.get_children())
         self.results_tree['columns'] = ()
 
         if results and columns:
-            self.results_tree['columns'] = columns
-            for col in columns:
-                self.results_tree.heading(col, text=col)
-                self.results_tree.column(col, width=100, anchor='w')
-            
-            for row in results:
-                self.results_tree.insert('', 'end', values=tuple(row))
+            self.set_results_columns(columns)
+            self.results_loader.load(results)
         elif columns is not None:
              pass # No mostrar nada si no hay resultados, solo limpiar la tabla
         else:
             messagebox.showerror("Error", "No se pudo ejecutar la consulta", parent=self.results_tree.winfo_toplevel())
 
+    def set_results_columns(self, columns):
+        """Configurar las columnas del Treeview de resultados"""
+        self.results_tree['columns'] = columns
+        for col in columns:
+            self.results_tree.heading(col, text=col)
+            self.results_tree.column(col, width=100, anchor='w')
+
     def execute_selected_query(self, queries_list):
         """DEPRECATED"""
         pass
     
     def run(self):
         """Ejecutar la aplicación"""
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.executor.shutdown()
+            self.image_executor.shutdown()
+            self.db.dump_query_report(self.QUERY_REPORT_TOP_N)
+            self.db.close()
 
 # Punto de entrada
 if __name__ == "__main__":
@@ -890,6 +1290,9 @@ if __name__ == "__main__":
     1. pip install pyodbc tkcalendar
     2. ODBC Driver 17 for SQL Server
     3. SQL Server con base de datos 'red_social'
+       (o NIILO_DB_BACKEND=sqlite para usar el motor SQLite embebido,
+        ruta en NIILO_SQLITE_PATH; no requiere pyodbc ni servidor)
+    4. python manage.py migrate (índices del esquema)
     
     🎨 CARACTERÍSTICAS:
     - Diseño modular y organizado
@@ -900,11 +1303,14 @@ if __name__ == "__main__":
     📁 ESTRUCTURA:
     - main.py: Archivo principal
     - modules/database.py: Gestión de base de datos
+    - modules/backends.py: Motores de almacenamiento (SQL Server / SQLite)
+    - manage.py: Tareas de mantenimiento (migraciones, estadísticas, contadores, benchmark)
+    - modules/migrations.py: Migraciones versionadas del esquema
     - modules/ui_components.py: Componentes de interfaz
     - modules/windows.py: Ventanas específicas
     
     ⚙️ CONFIGURACIÓN:
-    Modifica la connection_string en database.py si es necesario
+    Modifica DEFAULT_CONNECTION_STRING en backends.py (o NIILO_CONNECTION_STRING) si es necesario
     """
     
     app = ModernRedSocialApp()
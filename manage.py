@@ -0,0 +1,194 @@
+"""
+🛠️ NIILO - Tareas de mantenimiento de la base de datos
+
+Uso:
+    python manage.py rebuild-stats [--user ID]
+    python manage.py reconcile-counters
+    python manage.py rebuild-timelines [--user ID]
+    python manage.py rebuild-search
+    python manage.py derive-photos
+    python manage.py gc-photos [--dry-run] [--grace SEGUNDOS]
+    python manage.py health
+    python manage.py migrate [--target N] [--list]
+    python manage.py rollback --target N
+    python manage.py benchmark [--compare] [--user ID] [--post ID] [--repeat N]
+
+Usa el mismo motor que la aplicación (NIILO_DB_BACKEND / NIILO_SQLITE_PATH).
+"""
+import argparse
+import os
+import sys
+
+from modules.benchmark import benchmark_read_methods, compare_report
+from modules.database import DatabaseManager
+from modules.migrations import MigrationRunner
+from modules.photos import collect_garbage, ingest_photo, is_photo_key
+
+
+def cmd_rebuild_stats(db, args):
+    """Recalcular usuario_estadisticas desde las tablas base"""
+    return 0 if db.rebuild_user_stats(args.user) else 1
+
+
+def cmd_reconcile_counters(db, args):
+    """Corregir desviaciones en publicacion_contadores"""
+    return 0 if db.reconcile_post_counters() is not None else 1
+
+
+def cmd_rebuild_timelines(db, args):
+    """Reconstruir timeline_entradas desde amistades y publicaciones"""
+    return 0 if db.rebuild_timeline(args.user) else 1
+
+
+def cmd_rebuild_search(db, args):
+    """Reconstruir el índice de búsqueda (busqueda_terminos)"""
+    return 0 if db.rebuild_search_index() is not None else 1
+
+
+def cmd_derive_photos(db, args):
+    """Pasar al almacén de fotos las guardadas con ruta antes de existir"""
+    photos = db.get_all_user_photos()
+    if photos is None:
+        return 1
+    converted = 0
+    for user_id, photo_path in photos:
+        if is_photo_key(photo_path) or not os.path.exists(photo_path):
+            continue
+        try:
+            photo_key = ingest_photo(photo_path)
+        except OSError as e:
+            print(f"✗ {photo_path}: {e}")
+            continue
+        if db.update_user_photo(user_id, photo_key):
+            converted += 1
+    print(f"Fotos convertidas: {converted}")
+    return 0
+
+
+def cmd_gc_photos(db, args):
+    """Borrar las fotos que ningún usuario tiene como foto de perfil"""
+    photos = db.get_all_user_photos()
+    if photos is None:
+        return 1
+    removed, freed = collect_garbage([photo_path for _, photo_path in photos],
+                                     grace_seconds=args.grace, dry_run=args.dry_run)
+    action = "Se borrarían" if args.dry_run else "Borrados"
+    print(f"{action} {removed} ficheros ({freed / 1024:.1f} KB)")
+    return 0
+
+
+def cmd_health(db, args):
+    """Comprobar la conexión y mostrar los conteos de diagnóstico"""
+    return 0 if db.debug_database_state()['ok'] else 1
+
+
+def cmd_migrate(db, args):
+    """Aplicar las migraciones de esquema pendientes"""
+    runner = MigrationRunner(db)
+    if args.list:
+        status = runner.status()
+        if status is None:
+            return 1
+        for version, description, applied in status:
+            print(f"{'✓' if applied else ' '} {version:>3}  {description}")
+        return 0
+    return 0 if runner.migrate(args.target) is not None else 1
+
+
+def cmd_rollback(db, args):
+    """Revertir las migraciones posteriores a --target"""
+    return 0 if MigrationRunner(db).rollback(args.target) is not None else 1
+
+
+def cmd_benchmark(db, args):
+    """Medir los métodos de lectura (con --compare: sin índices y con índices)"""
+    def measure():
+        return benchmark_read_methods(db, args.user, args.post, args.other, args.repeat)
+
+    if not args.compare:
+        for row in measure():
+            print(f"{row['method']:<34} p50={row['median_ms']:.2f}ms p95={row['p95_ms']:.2f}ms")
+        return 0
+    # Se eliminan índices de verdad: nunca contra el servidor de producción
+    if db.backend.name != 'sqlite':
+        print("✗ --compare revierte las migraciones: sólo se ejecuta sobre la base de datos SQLite embebida")
+        return 1
+    runner = MigrationRunner(db)
+    applied = runner.applied_versions()
+    if not applied:
+        print("✗ No hay migraciones aplicadas con las que comparar")
+        return 1
+    before = None
+    try:
+        if runner.rollback(0) is not None:
+            before = measure()
+    finally:
+        # Volver a dejar aplicadas exactamente las mismas migraciones, aunque la medición falle
+        failed = [version for version in sorted(applied) if not runner.apply(version)]
+        if failed:
+            print(f"✗ No se pudieron restaurar las migraciones {', '.join(map(str, failed))}")
+    if before is None or failed:
+        return 1
+    after = measure()
+    print(compare_report(before, after))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mantenimiento de la base de datos de NIILO")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    rebuild = subparsers.add_parser('rebuild-stats', help=cmd_rebuild_stats.__doc__)
+    rebuild.add_argument('--user', type=int, default=None, help="Sólo este usuario")
+    rebuild.set_defaults(func=cmd_rebuild_stats)
+
+    reconcile = subparsers.add_parser('reconcile-counters', help=cmd_reconcile_counters.__doc__)
+    reconcile.set_defaults(func=cmd_reconcile_counters)
+
+    timelines = subparsers.add_parser('rebuild-timelines', help=cmd_rebuild_timelines.__doc__)
+    timelines.add_argument('--user', type=int, default=None, help="Sólo este usuario")
+    timelines.set_defaults(func=cmd_rebuild_timelines)
+
+    search = subparsers.add_parser('rebuild-search', help=cmd_rebuild_search.__doc__)
+    search.set_defaults(func=cmd_rebuild_search)
+
+    photos = subparsers.add_parser('derive-photos', help=cmd_derive_photos.__doc__)
+    photos.set_defaults(func=cmd_derive_photos)
+
+    gc_photos = subparsers.add_parser('gc-photos', help=cmd_gc_photos.__doc__)
+    gc_photos.add_argument('--dry-run', action='store_true', help="Sólo contar, sin borrar")
+    gc_photos.add_argument('--grace', type=int, default=3600,
+                           help="Respetar ficheros modificados hace menos de estos segundos")
+    gc_photos.set_defaults(func=cmd_gc_photos)
+
+    health = subparsers.add_parser('health', help=cmd_health.__doc__)
+    health.set_defaults(func=cmd_health)
+
+    migrate = subparsers.add_parser('migrate', help=cmd_migrate.__doc__)
+    migrate.add_argument('--target', type=int, default=None, help="Aplicar hasta esta versión")
+    migrate.add_argument('--list', action='store_true', help="Mostrar las migraciones y su estado")
+    migrate.set_defaults(func=cmd_migrate)
+
+    rollback = subparsers.add_parser('rollback', help=cmd_rollback.__doc__)
+    rollback.add_argument('--target', type=int, required=True, help="Versión que se conserva (0 = ninguna)")
+    rollback.set_defaults(func=cmd_rollback)
+
+    benchmark = subparsers.add_parser('benchmark', help=cmd_benchmark.__doc__)
+    benchmark.add_argument('--compare', action='store_true',
+                           help="Sólo SQLite: revertir los índices, medir, restaurarlos y volver a medir")
+    benchmark.add_argument('--user', type=int, default=1)
+    benchmark.add_argument('--post', type=int, default=1)
+    benchmark.add_argument('--other', type=int, default=2, help="Segundo usuario (estado de amistad)")
+    benchmark.add_argument('--repeat', type=int, default=20)
+    benchmark.set_defaults(func=cmd_benchmark)
+
+    args = parser.parse_args(argv)
+    db = DatabaseManager()
+    try:
+        return args.func(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,8 @@
 # Este archivo hace que el directorio 'modules' sea un paquete Python
 
 from .database import DatabaseManager
+from .backends import SQLServerBackend, SQLiteBackend
 from .ui_components import UIComponents
 from .windows import Windows
 
-__all__ = ['DatabaseManager', 'UIComponents', 'Windows'] 
\ No newline at end of file
+__all__ = ['DatabaseManager', 'SQLServerBackend', 'SQLiteBackend', 'UIComponents', 'Windows'] 
\ No newline at end of file
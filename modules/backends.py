@@ -0,0 +1,211 @@
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+
+DEFAULT_CONNECTION_STRING = """
+        DRIVER={ODBC Driver 17 for SQL Server};
+        SERVER=localhost;
+        DATABASE=red_social;
+        Trusted_Connection=yes;
+        """
+
+
+class DatabaseBackend:
+    """Motor de almacenamiento: abre conexiones y resuelve diferencias de dialecto"""
+
+    name = None
+
+    def connect(self):
+        """Abrir una conexión DB-API nueva"""
+        raise NotImplementedError
+
+    def create_table_sql(self, name, columns):
+        """DDL idempotente para crear ``name`` si todavía no existe"""
+        raise NotImplementedError
+
+    def create_index_sql(self, name, table, columns, unique=False):
+        """DDL idempotente para crear el índice ``name`` sobre ``table(columns)``"""
+        raise NotImplementedError
+
+    def drop_index_sql(self, name, table):
+        """DDL idempotente para eliminar el índice ``name``"""
+        raise NotImplementedError
+
+    def prefix_pattern(self, prefix):
+        """Patrón que compara por prefijo en las sentencias de búsqueda (``prefix`` sin comodines)"""
+        raise NotImplementedError
+
+
+class SQLServerBackend(DatabaseBackend):
+    """SQL Server mediante pyodbc (ODBC Driver 17)"""
+
+    name = 'sqlserver'
+
+    def __init__(self, connection_string=DEFAULT_CONNECTION_STRING):
+        self.connection_string = connection_string
+
+    def connect(self):
+        import pyodbc
+        return pyodbc.connect(self.connection_string)
+
+    def create_table_sql(self, name, columns):
+        return f"IF OBJECT_ID(N'dbo.{name}', N'U') IS NULL CREATE TABLE {name} ({columns})"
+
+    def create_index_sql(self, name, table, columns, unique=False):
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        return (f"IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'{name}' "
+                f"AND object_id = OBJECT_ID(N'dbo.{table}')) "
+                f"CREATE {kind} {name} ON dbo.{table} ({columns})")
+
+    def drop_index_sql(self, name, table):
+        return (f"IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'{name}' "
+                f"AND object_id = OBJECT_ID(N'dbo.{table}')) "
+                f"DROP INDEX {name} ON dbo.{table}")
+
+    def prefix_pattern(self, prefix):
+        return prefix + '%'  # LIKE 'abc%' usa el índice
+
+
+def _sqlite_concat(*args):
+    # CONCAT de T-SQL trata NULL como cadena vacía
+    return ''.join('' if a is None else str(a) for a in args)
+
+
+def _convert_datetime(raw):
+    return datetime.fromisoformat(raw.decode())
+
+
+def _convert_date(raw):
+    return date.fromisoformat(raw.decode()[:10])
+
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('DATETIME', _convert_datetime)
+sqlite3.register_converter('DATE', _convert_date)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    apellido TEXT NOT NULL,
+    email TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    fecha_nacimiento DATE,
+    ubicacion TEXT,
+    biografia TEXT,
+    imagen_perfil TEXT,
+    fecha_registro DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+    activo INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS publicaciones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario_id INTEGER NOT NULL REFERENCES usuarios(id),
+    contenido TEXT NOT NULL,
+    tipo TEXT NOT NULL DEFAULT 'texto',
+    url_media TEXT,
+    fecha_publicacion DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+    activa INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS me_gusta (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario_id INTEGER NOT NULL REFERENCES usuarios(id),
+    publicacion_id INTEGER NOT NULL REFERENCES publicaciones(id),
+    fecha_like DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+    UNIQUE (usuario_id, publicacion_id)
+);
+
+CREATE TABLE IF NOT EXISTS comentarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario_id INTEGER NOT NULL REFERENCES usuarios(id),
+    publicacion_id INTEGER NOT NULL REFERENCES publicaciones(id),
+    contenido TEXT NOT NULL,
+    fecha_comentario DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+    activo INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS amistades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario1_id INTEGER NOT NULL REFERENCES usuarios(id),
+    usuario2_id INTEGER NOT NULL REFERENCES usuarios(id),
+    estado TEXT NOT NULL DEFAULT 'pendiente'
+        CHECK (estado IN ('pendiente', 'aceptada', 'rechazada')),
+    fecha_solicitud DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+    UNIQUE (usuario1_id, usuario2_id)
+);
+
+CREATE TABLE IF NOT EXISTS mensajes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    emisor_id INTEGER NOT NULL REFERENCES usuarios(id),
+    receptor_id INTEGER NOT NULL REFERENCES usuarios(id),
+    contenido TEXT NOT NULL,
+    fecha_envio DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+    leido INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class SQLiteBackend(DatabaseBackend):
+    """Motor embebido SQLite con el mismo esquema que la base SQL Server.
+
+    Registra ``CONCAT`` (ausente en SQLite < 3.44) para que las consultas
+    compartidas funcionen sin cambios y crea el esquema la primera vez que se
+    conecta.
+    ``path`` admite URIs ``file:`` (p. ej. ``file:bench?mode=memory&cache=shared``).
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path='red_social.db'):
+        self.path = path
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path,
+                               detect_types=sqlite3.PARSE_DECLTYPES,
+                               check_same_thread=False,  # el pool reparte conexiones entre hilos
+                               uri=self.path.startswith('file:'))
+        conn.create_function('CONCAT', -1, _sqlite_concat, deterministic=True)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA busy_timeout = 5000")
+        self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(SQLITE_SCHEMA)
+                conn.commit()
+                self._schema_ready = True
+
+    def create_table_sql(self, name, columns):
+        return f"CREATE TABLE IF NOT EXISTS {name} ({columns})"
+
+    def create_index_sql(self, name, table, columns, unique=False):
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        return f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({columns})"
+
+    def drop_index_sql(self, name, table):
+        return f"DROP INDEX IF EXISTS {name}"
+
+    def prefix_pattern(self, prefix):
+        # GLOB distingue mayúsculas, así que SQLite puede resolver 'abc*' con el índice
+        return prefix + '*'
+
+
+def backend_from_env():
+    """Elegir el motor según ``NIILO_DB_BACKEND`` (``sqlserver`` por defecto o ``sqlite``)"""
+    kind = os.environ.get('NIILO_DB_BACKEND', 'sqlserver').lower()
+    if kind == 'sqlite':
+        return SQLiteBackend(os.environ.get('NIILO_SQLITE_PATH', 'red_social.db'))
+    if kind == 'sqlserver':
+        return SQLServerBackend(os.environ.get('NIILO_CONNECTION_STRING', DEFAULT_CONNECTION_STRING))
+    raise ValueError(f"Motor de base de datos desconocido: {kind}")
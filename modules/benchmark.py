@@ -0,0 +1,67 @@
+import contextlib
+import io
+import statistics
+import time
+
+from .database import DatabaseManager
+
+
+def read_method_calls(db, user_id, post_id, other_id):
+    """Métodos de lectura de ``DatabaseManager`` y los argumentos de prueba"""
+    first_page = db.get_posts_page(limit=20) or []
+    after = (first_page[-1][4], first_page[-1][0]) if first_page else None
+    return [
+        ('get_user_by_credentials', ('nadie@ejemplo.com', db.hash_password('x'))),
+        ('get_user_basic', (user_id,)),
+        ('get_user_profile', (user_id,)),
+        ('get_all_users', ()),
+        ('get_user_posts', (user_id,)),
+        ('get_user_post_history', (user_id,)),
+        ('get_all_posts', ()),
+        ('get_posts_page', (None, 20)),
+        ('get_posts_page', (after, 20)),
+        ('get_post_comments', (post_id,)),
+        ('get_user_messages', (user_id,)),
+        ('get_conversations', (user_id,)),
+        ('get_messages_since', (user_id, 0)),
+        ('get_user_interactions', (user_id,)),
+        ('get_friendship_status', (user_id, other_id)),
+        ('get_friend_requests', (user_id,)),
+        ('get_user_friends', (user_id,)),
+        ('get_user_photo', (user_id,)),
+    ]
+
+
+def benchmark_read_methods(db, user_id=1, post_id=1, other_id=2, repeat=20):
+    """Mediana y p95 (ms) de cada método de lectura, sin pasar por la caché"""
+    results = []
+    for method_name, args in read_method_calls(db, user_id, post_id, other_id):
+        method = getattr(DatabaseManager, method_name)
+        method = getattr(method, '__wrapped__', method)  # saltar @cached
+        samples = []
+        # Algunos métodos imprimen diagnósticos: no deben ensuciar la salida
+        with contextlib.redirect_stdout(io.StringIO()):
+            method(db, *args)  # calentamiento: conexión y sentencia preparada
+            for _ in range(repeat):
+                started = time.perf_counter()
+                method(db, *args)
+                samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        label = method_name if method_name != 'get_posts_page' else \
+            f"get_posts_page({'siguiente' if args[0] else 'primera'})"
+        results.append({
+            'method': label,
+            'median_ms': statistics.median(samples),
+            'p95_ms': samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+        })
+    return results
+
+
+def compare_report(before, after):
+    """Tabla de texto con la mediana antes/después de cada método"""
+    lines = [f"{'MÉTODO':<34} {'ANTES ms':>10} {'DESPUÉS ms':>11} {'MEJORA':>8}"]
+    for old, new in zip(before, after):
+        speedup = old['median_ms'] / new['median_ms'] if new['median_ms'] else 0.0
+        lines.append(f"{old['method'][:34]:<34} {old['median_ms']:>10.2f} "
+                     f"{new['median_ms']:>11.2f} {speedup:>7.1f}x")
+    return '\n'.join(lines)
@@ -0,0 +1,125 @@
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """Caché LRU con caducidad por entrada e invalidación por etiquetas.
+
+    Cada entrada guarda su valor, su instante de caducidad y las etiquetas
+    que la invalidan (p. ej. ``friends:7``). Al superar ``max_entries`` se
+    descarta la entrada usada hace más tiempo.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}  # tag -> set(keys)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expirations': 0,
+                       'evictions': 0, 'invalidations': 0}
+
+    def get(self, key):
+        """Devolver ``(True, valor)`` si hay entrada vigente, ``(False, None)`` si no"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove_locked(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, value
+
+    def set(self, key, value, ttl, tags=()):
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove_locked(oldest)
+                self._stats['evictions'] += 1
+
+    def _remove_locked(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, *tags):
+        """Eliminar todas las entradas marcadas con alguna de ``tags``"""
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove_locked(key)
+                    self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+def _format_tags(signature, tags, args, kwargs):
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return [tag.format(**bound.arguments) for tag in tags]
+
+
+def cached(ttl, tags=()):
+    """Cachear el resultado de un método de ``DatabaseManager`` en ``self.cache``.
+
+    Las etiquetas pueden referirse a argumentos del método: ``'friends:{user_id}'``.
+    Los resultados ``None`` (errores) no se guardan.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = (method.__name__, args, tuple(sorted(kwargs.items())))
+            hit, value = self.cache.get(key)
+            if hit:
+                return value
+            value = method(self, *args, **kwargs)
+            if value is not None:
+                self.cache.set(key, value, ttl, _format_tags(signature, tags, (self,) + args, kwargs))
+            return value
+        return wrapper
+    return decorator
+
+
+def invalidates(*tags):
+    """Invalidar ``tags`` en ``self.cache`` cuando el método de escritura tiene éxito"""
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            if result:
+                self.cache.invalidate(*_format_tags(signature, tags, (self,) + args, kwargs))
+            return result
+        return wrapper
+    return decorator
@@ -1,428 +1,1175 @@
-import pyodbc
 from tkinter import messagebox
+from datetime import datetime, timedelta
 import hashlib
+import threading
+import time
+from .backends import backend_from_env
+from .cache import QueryCache, cached, invalidates
+from .directory import UserDirectory
+from .graph import FriendGraph
+from .health import HealthProbe
+from .metrics import QueryMetrics, statement_name_for
+from .pool import ConnectionPool, PoolTimeoutError
+from .search import query_terms, term_frequencies
+from .statements import (SEARCH_MAX_TERMS, USER_SOURCES, USER_STATS_COLUMNS, USERS_BY_IDS_BATCH,
+                         get_statement, is_statement, table_page_sql)
+from .suggestions import SuggestionEngine
+
+class QueryStream:
+    """Resultado de una consulta leído por lotes con ``fetchmany``.
+    
+    Mantiene la conexión del pool ocupada mientras el iterador esté vivo y la
+    devuelve al agotarse o al llamar a ``close`` (también como context manager).
+    Las columnas están disponibles en ``columns`` antes de leer ninguna fila.
+    """
+    
+    def __init__(self, manager, pooled, cursor, batch_size):
+        self._manager = manager
+        self._pooled = pooled
+        self._cursor = cursor
+        self.batch_size = batch_size
+        self.columns = [column[0] for column in cursor.description]
+        self.rows_read = 0
+    
+    @property
+    def closed(self):
+        return self._pooled is None
+    
+    def fetch_batch(self, size=None):
+        """Leer el siguiente lote (lista vacía cuando no quedan filas)"""
+        if self.closed:
+            return []
+        try:
+            rows = self._cursor.fetchmany(size or self.batch_size)
+        except Exception as e:
+            print(f"Error leyendo resultados: {e}")
+            self.close(conn_ok=False)
+            return []
+        if not rows:
+            self.close()
+            return []
+        self.rows_read += len(rows)
+        return rows
+    
+    def __iter__(self):
+        while True:
+            rows = self.fetch_batch()
+            if not rows:
+                return
+            yield from rows
+    
+    def close(self, conn_ok=True):
+        """Liberar el cursor y devolver la conexión al pool"""
+        if self._pooled is None:
+            return
+        pooled, self._pooled = self._pooled, None
+        try:
+            self._cursor.close()
+        except Exception:
+            conn_ok = False
+        if conn_ok:
+            # Descartar la transacción de lectura (sigue abierta si no se agotó)
+            try:
+                pooled.raw.rollback()
+            except Exception:
+                conn_ok = False
+        self._manager._release(pooled, conn_ok=conn_ok)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close(conn_ok=exc_type is None)
+    
+    def __del__(self):
+        self.close()
+
+class TablePages:
+    """Filas de una tabla leídas por páginas con clave, con la interfaz de ``QueryStream``.
+    
+    Cada ``fetch_batch`` es una consulta corta ``WHERE clave > última``
+    que toma y devuelve su propia conexión, así que entre lotes no se
+    retiene ninguna aunque el lector tarde en pedir el siguiente. La
+    primera página se lee al abrir (de ahí salen ``columns``).
+    """
+    
+    def __init__(self, manager, table, key, batch_size, first_page, columns, name):
+        self._manager = manager
+        self._table = table
+        self._key = key
+        self._key_index = columns.index(key)
+        self._pending = first_page
+        self._last_key = None
+        self._name = name
+        self._closed = False
+        self.batch_size = batch_size
+        self.columns = columns
+        self.rows_read = 0
+    
+    @property
+    def closed(self):
+        return self._closed
+    
+    def fetch_batch(self, size=None):
+        """Leer la siguiente página (lista vacía cuando no quedan filas)"""
+        if self._closed:
+            return []
+        if self._pending is not None:
+            rows, self._pending = self._pending, None
+        else:
+            sql = table_page_sql(self._table, self._key, self._manager.backend.name)
+            rows, _ = self._manager.execute_query(sql, (self._last_key, size or self.batch_size),
+                                                  name=self._name)
+        if not rows:
+            self.close()
+            return []
+        self._last_key = rows[-1][self._key_index]
+        self.rows_read += len(rows)
+        return rows
+    
+    def __iter__(self):
+        while True:
+            rows = self.fetch_batch()
+            if not rows:
+                return
+            yield from rows
+    
+    def close(self):
+        self._closed = True
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
 class DatabaseManager:
-    def __init__(self):
-        self.connection_string = """
-        DRIVER={ODBC Driver 17 for SQL Server};
-        SERVER=localhost;
-        DATABASE=red_social;
-        Trusted_Connection=yes;
-        """
+    # Tablas desnormalizadas mantenidas por la aplicación (nombre -> columnas)
+    DERIVED_TABLES = {
+        'publicacion_contadores': """
+            publicacion_id INT NOT NULL PRIMARY KEY,
+            total_likes INT NOT NULL DEFAULT 0,
+            total_comentarios INT NOT NULL DEFAULT 0
+        """,
+        'usuario_estadisticas': """
+            usuario_id INT NOT NULL PRIMARY KEY,
+            total_publicaciones INT NOT NULL DEFAULT 0,
+            total_amigos INT NOT NULL DEFAULT 0,
+            total_likes_recibidos INT NOT NULL DEFAULT 0,
+            total_likes_dados INT NOT NULL DEFAULT 0,
+            total_comentarios_recibidos INT NOT NULL DEFAULT 0,
+            total_comentarios_dados INT NOT NULL DEFAULT 0,
+            total_mensajes_enviados INT NOT NULL DEFAULT 0,
+            total_mensajes_recibidos INT NOT NULL DEFAULT 0
+        """,
+        'timeline_entradas': """
+            usuario_id INT NOT NULL,
+            publicacion_id INT NOT NULL,
+            fecha_publicacion DATETIME NOT NULL,
+            PRIMARY KEY (usuario_id, fecha_publicacion DESC, publicacion_id DESC)
+        """,
+        'conversaciones': """
+            usuario_id INT NOT NULL,
+            contacto_id INT NOT NULL,
+            ultimo_mensaje_id INT NOT NULL DEFAULT 0,
+            total_mensajes INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (usuario_id, contacto_id)
+        """,
+        'busqueda_terminos': """
+            termino VARCHAR(40) NOT NULL,
+            tipo VARCHAR(12) NOT NULL,
+            documento_id INT NOT NULL,
+            frecuencia INT NOT NULL DEFAULT 1,
+            PRIMARY KEY (termino, tipo, documento_id)
+        """,
+    }
+    
+    # Operaciones que repueblan cada tabla derivada desde las tablas base
+    DERIVED_REBUILDERS = {
+        'publicacion_contadores': '_reconcile_post_counters_ops',
+        'usuario_estadisticas': '_rebuild_user_stats_ops',
+        'timeline_entradas': '_rebuild_timeline_ops',
+        'conversaciones': '_rebuild_conversations_ops',
+    }
+    
+    # Timeline por usuario (fan-out en escritura)
+    TIMELINE_MAX_ENTRIES = 500     # entradas que conserva cada timeline
+    TIMELINE_TRIM_EVERY = 200      # publicaciones entre recortes de los timelines
+    FANOUT_MAX_FRIENDS = 1000      # por encima, sus publicaciones se mezclan al leer
+    FANOUT_MAX_READ_AUTHORS = 50   # autores mezclados al leer como máximo
+    
+    # Segundos tras los que se recarga el grafo de amistades (cambios de otros procesos)
+    FRIEND_GRAPH_MAX_AGE = 300
+    # Directorio de usuarios: altas de otros procesos (id posterior) y recarga completa
+    USER_DIRECTORY_REFRESH = 30
+    USER_DIRECTORY_MAX_AGE = 600
+    
+    def __init__(self, backend=None, pool_min_size=1, pool_max_size=5, pool_idle_timeout=300,
+                 cache_max_entries=512, slow_query_ms=200, health_interval=60):
+        # Motor de almacenamiento (SQL Server por defecto, SQLite embebido opcional)
+        self.backend = backend or backend_from_env()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        # Caché de lecturas frecuentes, invalidada por las escrituras
+        self.cache = QueryCache(max_entries=cache_max_entries)
+        # Latencias por sentencia y log de consultas lentas
+        self.metrics = QueryMetrics(slow_threshold_ms=slow_query_ms)
+        # Pool de conexiones compartido por execute_query/execute_update
+        self.pool = ConnectionPool(self.connect_db,
+                                   min_size=pool_min_size,
+                                   max_size=pool_max_size,
+                                   idle_timeout=pool_idle_timeout)
+        # Amistades aceptadas en memoria (se carga en el primer uso o con load_friend_graph)
+        self.friend_graph = FriendGraph()
+        self._friend_graph_lock = threading.Lock()
+        self.user_directory = UserDirectory()
+        self._user_directory_lock = threading.Lock()
+        self.suggestions = SuggestionEngine(self)
+        self._posts_since_trim = 0
+        # Usuarios cuyo timeline ya se reconstruyó en este proceso: desde entonces
+        # lo mantienen el reparto de publicaciones y la aceptación de amistades
+        self._timelines_rebuilt = set()
+        # Diagnóstico periódico en segundo plano (se arranca con health.start())
+        self.health = HealthProbe(self, interval=health_interval)
     
     def connect_db(self):
         """Conectar a la base de datos"""
         try:
-            return pyodbc.connect(self.connection_string)
+            return self.backend.connect()
         except Exception as e:
-            messagebox.showerror("Error de Conexión", f"No se pudo conectar a la base de datos:\n{str(e)}")
+            # Tk sólo admite diálogos desde su propio hilo
+            if threading.current_thread() is threading.main_thread():
+                messagebox.showerror("Error de Conexión", f"No se pudo conectar a la base de datos:\n{str(e)}")
+            else:
+                print(f"Error de conexión: {e}")
             return None
     
     def hash_password(self, password):
         """Hash simple para la contraseña"""
         return hashlib.sha256(password.encode()).hexdigest()
     
-    def execute_query(self, query, params=None):
-        """Ejecutar consulta y retornar resultados con cabeceras"""
-        conn = self.connect_db()
-        if not conn:
-            return None, None
+    def _acquire(self):
+        """Obtener una conexión del pool (``None`` si no se pudo conectar)"""
+        try:
+            pooled = self.pool.acquire()
+        except PoolTimeoutError as e:
+            print(f"Error obteniendo conexión: {e}")
+            return None
+        if pooled is not None and not self._schema_ready:
+            self._ensure_derived_schema(pooled)
+        return pooled
+    
+    def _ensure_derived_schema(self, pooled):
+        """Crear las tablas derivadas la primera vez que se usa la base de datos"""
+        conn = pooled.raw
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            try:
+                cursor = conn.cursor()
+                for name, columns in self.DERIVED_TABLES.items():
+                    cursor.execute(self.backend.create_table_sql(name, columns))
+                conn.commit()
+                # Tablas recién creadas (o vaciadas): poblarlas desde las tablas base
+                for name, rebuilder in self.DERIVED_REBUILDERS.items():
+                    cursor.execute(f"SELECT COUNT(*) FROM {name}")
+                    if cursor.fetchone()[0] == 0:
+                        metric = f"schema.rebuild.{name}"
+                        started = time.perf_counter()
+                        self._run_operations(pooled, getattr(self, rebuilder)(), metric)
+                        conn.commit()
+                        self.metrics.record(metric, (time.perf_counter() - started) * 1000)
+                cursor.close()
+                self._schema_ready = True
+            except Exception as e:
+                print(f"Error preparando tablas derivadas: {e}")
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+    
+    def _release(self, pooled, conn_ok=True):
+        """Devolver la conexión al pool, descartándola si quedó inutilizable"""
+        if not conn_ok:
+            try:
+                pooled.raw.rollback()
+            except Exception:
+                self.pool.release(pooled, broken=True)
+                return
+        self.pool.release(pooled)
+    
+    def get_pool_stats(self):
+        """Estadísticas del pool de conexiones"""
+        return self.pool.get_stats()
+    
+    def get_query_stats(self):
+        """Métricas por sentencia (llamadas, p50/p95/p99, filas, errores)"""
+        return self.metrics.snapshot()
+    
+    def dump_query_report(self, top_n=10):
+        """Imprimir las ``top_n`` sentencias que más tiempo consumen"""
+        print(f"=== TOP {top_n} SENTENCIAS POR TIEMPO TOTAL ===")
+        print(self.metrics.report(top_n))
+    
+    def get_prepare_stats(self):
+        """Reutilización de sentencias preparadas (totales de todas las conexiones)"""
+        return self.metrics.prepare_stats()
+    
+    def get_cache_stats(self):
+        """Estadísticas de la caché de lecturas"""
+        return self.cache.get_stats()
+    
+    def get_health_status(self):
+        """Último resultado del diagnóstico periódico (``None`` si aún no hay)"""
+        return self.health.status()
+    
+    def close(self):
+        """Detener el diagnóstico y cerrar todas las conexiones del pool"""
+        self.health.stop()
+        self.pool.close()
+    
+    def _resolve(self, query, name=None):
+        """Devolver ``(sql, nombre)`` para un nombre registrado o SQL literal"""
+        if is_statement(query):
+            return get_statement(query, self.backend.name), name or query
+        return query, name or statement_name_for(query)
+    
+    def _statement_cursor(self, pooled, statement, name=None):
+        """Cursor de ``statement`` en esta conexión.
         
+        Las sentencias registradas conservan su cursor en la conexión: al
+        ejecutar de nuevo el mismo texto el driver reutiliza la sentencia ya
+        preparada. El SQL literal usa un cursor desechable. La reutilización
+        se anota en las métricas de ``name`` (el de la llamada) si se indica.
+        """
+        if not is_statement(statement):
+            return pooled.raw.cursor(), False
+        cursor = pooled.statements.get(statement)
+        self.metrics.record_prepare(name or statement, reused=cursor is not None)
+        if cursor is None:
+            cursor = pooled.statements[statement] = pooled.raw.cursor()
+        return cursor, True
+    
+    @staticmethod
+    def _forget_statement(pooled, statement, cursor):
+        """Descartar el cursor de una sentencia que falló"""
+        if pooled.statements.get(statement) is cursor:
+            del pooled.statements[statement]
+        try:
+            cursor.close()
+        except Exception:
+            pass
+    
+    def _execute(self, pooled, statement, sql, params, name=None):
+        """Ejecutar en ``pooled`` y devolver ``(cursor, reutilizable)``"""
+        cursor, keep = self._statement_cursor(pooled, statement, name)
         try:
-            cursor = conn.cursor()
             if params:
-                cursor.execute(query, params)
+                cursor.execute(sql, params)
             else:
-                cursor.execute(query)
-            
+                cursor.execute(sql)
+        except Exception:
+            self._forget_statement(pooled, statement, cursor)
+            raise
+        return cursor, keep
+    
+    def execute_query(self, query, params=None, name=None):
+        """Ejecutar consulta y retornar resultados con cabeceras.
+        
+        ``query`` puede ser el nombre de una sentencia registrada en
+        ``modules.statements`` o SQL literal.
+        """
+        statement = query
+        query, name = self._resolve(query, name)
+        pooled = self._acquire()
+        if not pooled:
+            self.metrics.record(name, 0.0, error=True, query=query, params=params)
+            return None, None
+        
+        started = time.perf_counter()
+        try:
+            cursor, keep = self._execute(pooled, statement, query, params, name)
             results = cursor.fetchall()
             # Obtener nombres de las columnas
             columns = [column[0] for column in cursor.description]
-            conn.close()
+            if not keep:
+                cursor.close()
+            self._release(pooled)
+            self.metrics.record(name, (time.perf_counter() - started) * 1000, rows=len(results),
+                                query=query, params=params)
             return results, columns
         except Exception as e:
             print(f"Error ejecutando consulta: {e}")
-            conn.close()
+            self._release(pooled, conn_ok=False)
+            self.metrics.record(name, (time.perf_counter() - started) * 1000, error=True,
+                                query=query, params=params)
             return None, None
     
-    def execute_update(self, query, params=None):
-        """Ejecutar consulta de actualización (INSERT, UPDATE, DELETE)"""
-        conn = self.connect_db()
-        if not conn:
-            return False
+    def execute_query_stream(self, query, params=None, batch_size=500, name=None):
+        """Ejecutar consulta y devolver un ``QueryStream`` (``None`` si falla).
         
+        Se mide el tiempo hasta que el servidor devuelve el cursor, no la lectura.
+        El cursor queda en manos del stream, así que no se guarda en la conexión.
+        """
+        query, name = self._resolve(query, name)
+        pooled = self._acquire()
+        if not pooled:
+            self.metrics.record(name, 0.0, error=True, query=query, params=params)
+            return None
+        
+        started = time.perf_counter()
         try:
-            cursor = conn.cursor()
+            cursor = pooled.raw.cursor()
             if params:
                 cursor.execute(query, params)
             else:
                 cursor.execute(query)
-            
-            conn.commit()
-            conn.close()
+            stream = QueryStream(self, pooled, cursor, batch_size)
+            self.metrics.record(name, (time.perf_counter() - started) * 1000, query=query, params=params)
+            return stream
+        except Exception as e:
+            print(f"Error ejecutando consulta: {e}")
+            self._release(pooled, conn_ok=False)
+            self.metrics.record(name, (time.perf_counter() - started) * 1000, error=True,
+                                query=query, params=params)
+            return None
+    
+    def execute_table_pages(self, table, key='id', batch_size=500, name=None):
+        """Leer ``table`` por páginas de ``batch_size`` filas según ``key`` (``TablePages``; ``None`` si falla).
+        
+        A diferencia de ``execute_query_stream`` no ocupa una conexión del
+        pool mientras el lector decide si quiere más filas.
+        """
+        name = name or f"table_pages.{table}"
+        results, columns = self.execute_query(table_page_sql(table, key, self.backend.name, after=False),
+                                              (batch_size,), name=name)
+        if results is None:
+            return None
+        return TablePages(self, table, key, batch_size, results, columns, name)
+    
+    def execute_update(self, query, params=None, name=None):
+        """Ejecutar consulta de actualización (INSERT, UPDATE, DELETE)"""
+        statement = query
+        query, name = self._resolve(query, name)
+        pooled = self._acquire()
+        if not pooled:
+            self.metrics.record(name, 0.0, error=True, query=query, params=params)
+            return False
+        
+        started = time.perf_counter()
+        try:
+            cursor, keep = self._execute(pooled, statement, query, params, name)
+            rowcount = cursor.rowcount
+            pooled.raw.commit()
+            if not keep:
+                cursor.close()
+            self._release(pooled)
+            self.metrics.record(name, (time.perf_counter() - started) * 1000, rows=max(rowcount, 0),
+                                query=query, params=params)
             return True
         except Exception as e:
             print(f"Error ejecutando actualización: {e}")
-            conn.rollback()
-            conn.close()
+            self._release(pooled, conn_ok=False)
+            self.metrics.record(name, (time.perf_counter() - started) * 1000, error=True,
+                                query=query, params=params)
             return False
     
+    def _run_operations(self, pooled, operations, name=None):
+        """Ejecutar ``(sentencia, params[, required])`` en ``pooled`` sin confirmar.
+        
+        Si una sentencia devuelve el id de la fila que inserta (``OUTPUT
+        INSERTED.id`` / ``RETURNING id``), las operaciones siguientes pueden
+        dar ``params`` como función que recibe ese id.
+        
+        Devuelve False si una operación marcada como ``required`` no afecta
+        a ninguna fila.
+        """
+        inserted_id = None
+        for operation in operations:
+            statement, params = operation[0], operation[1]
+            required = operation[2] if len(operation) > 2 else False
+            if callable(params):
+                params = params(inserted_id)
+            sql, _ = self._resolve(statement)
+            cursor, keep = self._execute(pooled, statement, sql, params, name)
+            if cursor.description is not None:
+                rows = cursor.fetchall()
+                inserted_id = rows[0][0] if rows else None
+            rowcount = cursor.rowcount
+            if not keep:
+                cursor.close()
+            if required and rowcount == 0:
+                return False
+        return True
+    
+    def execute_transaction(self, operations, name=None):
+        """Ejecutar varias actualizaciones en una sola transacción (todo o nada)"""
+        first_query, first_params = self._resolve(operations[0][0])[0], operations[0][1]
+        name = name or statement_name_for(' ; '.join(self._resolve(op[0])[0] for op in operations))
+        pooled = self._acquire()
+        if not pooled:
+            self.metrics.record(name, 0.0, error=True)
+            return False
+        
+        started = time.perf_counter()
+        try:
+            ok = self._run_operations(pooled, operations, name)
+            if ok:
+                pooled.raw.commit()
+                self._release(pooled)
+            else:
+                self._release(pooled, conn_ok=False)  # rollback
+            self.metrics.record(name, (time.perf_counter() - started) * 1000, error=not ok,
+                                query=first_query, params=first_params)
+            return ok
+        except Exception as e:
+            print(f"Error ejecutando transacción: {e}")
+            self._release(pooled, conn_ok=False)
+            self.metrics.record(name, (time.perf_counter() - started) * 1000, error=True,
+                                query=first_query, params=first_params)
+            return False
+    
+    # --- Contadores de interacción por publicación ---
+    
+    @staticmethod
+    def _ensure_post_counter_op(post_id):
+        return ('post_counters.ensure', (post_id, post_id))
+    
+    @staticmethod
+    def _reconcile_post_counters_ops():
+        return [
+            ('post_counters.clear', None),
+            ('post_counters.rebuild', None),
+        ]
+    
+    def reconcile_post_counters(self):
+        """Recalcular los contadores desde me_gusta/comentarios.
+        
+        Devuelve el número de publicaciones cuyo contador estaba desviado
+        (``None`` si falla).
+        """
+        results, _ = self.execute_query('post_counters.drift', name='reconcile_post_counters')
+        if results is None:
+            return None
+        drifted = results[0][0]
+        if drifted and not self.execute_transaction(self._reconcile_post_counters_ops(),
+                                                   name='reconcile_post_counters.rebuild'):
+            return None
+        print(f"Contadores reconciliados: {drifted} publicaciones corregidas")
+        return drifted
+    
+    # --- Estadísticas precalculadas por usuario ---
+    
+    USER_STATS_COLUMNS = USER_STATS_COLUMNS
+    
+    def _user_stat_ops(self, column, source, user_params, delta=1):
+        """Operaciones para sumar ``delta`` a ``column`` del usuario indicado.
+        
+        ``source`` es una clave de ``USER_SOURCES``: ``'user'`` si el parámetro
+        es el id del usuario, o la subconsulta que lo obtiene (dueño de la
+        publicación, autor del comentario...). Los incrementos crean la fila
+        si no existe; los decrementos sólo tocan filas existentes.
+        """
+        if column not in self.USER_STATS_COLUMNS:
+            raise ValueError(f"Estadística desconocida: {column}")
+        if source not in USER_SOURCES:
+            raise ValueError(f"Origen de usuario desconocido: {source}")
+        ops = []
+        if delta > 0:
+            ops.append((f'user_stats.ensure.{source}', tuple(user_params) * 3))
+        ops.append((f'user_stats.add.{column}.{source}', (delta,) + tuple(user_params)))
+        return ops
+    
+    @staticmethod
+    def _rebuild_user_stats_ops(user_id=None):
+        if user_id is None:
+            return [('user_stats.clear_all', None), ('user_stats.rebuild_all', None)]
+        return [('user_stats.clear_user', (user_id,)), ('user_stats.rebuild_user', (user_id,))]
+    
+    def rebuild_user_stats(self, user_id=None):
+        """Recalcular ``usuario_estadisticas`` (de todos o de un usuario)"""
+        ok = self.execute_transaction(self._rebuild_user_stats_ops(user_id), name='rebuild_user_stats')
+        if ok:
+            print("Estadísticas de usuario recalculadas" + (f" para {user_id}" if user_id is not None else ""))
+        return ok
+    
     def get_user_by_credentials(self, email, password_hash):
         """Obtener usuario por credenciales"""
-        query = "SELECT id, nombre, apellido FROM usuarios WHERE email = ? AND password_hash = ? AND activo = 1"
-        results, _ = self.execute_query(query, (email, password_hash))
+        results, _ = self.execute_query('get_user_by_credentials', (email, password_hash))
+        return results[0] if results else None
+    
+    def get_user_basic(self, user_id):
+        """Obtener los datos básicos de un usuario (sin estadísticas)"""
+        results, _ = self.execute_query('get_user_basic', (user_id,))
         return results[0] if results else None
     
+    @invalidates('users')
     def create_user(self, nombre, apellido, email, password_hash, fecha_nacimiento, ubicacion, biografia):
         """Crear nuevo usuario"""
-        query = """
-        INSERT INTO usuarios (nombre, apellido, email, password_hash, fecha_nacimiento, ubicacion, biografia)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """
-        return self.execute_update(query, (nombre, apellido, email, password_hash, fecha_nacimiento, ubicacion, biografia))
+        ok = self.execute_transaction([
+            ('create_user', (nombre, apellido, email, password_hash, fecha_nacimiento, ubicacion, biografia)),
+            *self._search_ops('search.index.user', f"{nombre} {apellido}", (email,)),
+        ], name='create_user')
+        if ok and self.user_directory.loaded:
+            self._refresh_directory_user(email)
+        return ok
     
+    @cached(ttl=30, tags=('profile:{user_id}', 'profiles'))
     def get_user_profile(self, user_id):
         """Obtener perfil completo del usuario con estadísticas detalladas"""
-        query = """
-        SELECT 
-            u.id,
-            CONCAT(u.nombre, ' ', u.apellido) AS nombre_completo,
-            u.email,
-            u.ubicacion,
-            u.biografia,
-            u.fecha_registro,
-            -- Estadísticas de publicaciones
-            ISNULL(posts_stats.total_publicaciones, 0) AS total_publicaciones,
-            -- Estadísticas de amigos
-            ISNULL(friends_stats.total_amigos, 0) AS total_amigos,
-            -- Estadísticas de likes
-            ISNULL(likes_received.total_likes_recibidos, 0) AS total_likes_recibidos,
-            ISNULL(likes_given.total_likes_dados, 0) AS total_likes_dados,
-            -- Estadísticas de comentarios
-            ISNULL(comments_received.total_comentarios_recibidos, 0) AS total_comentarios_recibidos,
-            ISNULL(comments_given.total_comentarios_dados, 0) AS total_comentarios_dados,
-            -- Estadísticas de mensajes
-            ISNULL(messages_sent.total_mensajes_enviados, 0) AS total_mensajes_enviados,
-            ISNULL(messages_received.total_mensajes_recibidos, 0) AS total_mensajes_recibidos
-        FROM usuarios u
-        -- Subconsulta para publicaciones
-        LEFT JOIN (
-            SELECT usuario_id, COUNT(*) as total_publicaciones
-            FROM publicaciones 
-            WHERE activa = 1
-            GROUP BY usuario_id
-        ) posts_stats ON u.id = posts_stats.usuario_id
-        -- Subconsulta para amigos
-        LEFT JOIN (
-            SELECT 
-                CASE 
-                    WHEN usuario1_id = ? THEN usuario2_id 
-                    ELSE usuario1_id 
-                END as friend_id
-            FROM amistades 
-            WHERE (usuario1_id = ? OR usuario2_id = ?) AND estado = 'aceptada'
-        ) friends_temp ON u.id = friends_temp.friend_id
-        LEFT JOIN (
-            SELECT COUNT(*) as total_amigos
-            FROM (
-                SELECT 
-                    CASE 
-                        WHEN usuario1_id = ? THEN usuario2_id 
-                        ELSE usuario1_id 
-                    END as friend_id
-                FROM amistades 
-                WHERE (usuario1_id = ? OR usuario2_id = ?) AND estado = 'aceptada'
-            ) friends_list
-        ) friends_stats ON 1=1
-        -- Subconsulta para likes recibidos
-        LEFT JOIN (
-            SELECT p.usuario_id, COUNT(*) as total_likes_recibidos
-            FROM me_gusta mg
-            JOIN publicaciones p ON mg.publicacion_id = p.id
-            WHERE p.activa = 1
-            GROUP BY p.usuario_id
-        ) likes_received ON u.id = likes_received.usuario_id
-        -- Subconsulta para likes dados
-        LEFT JOIN (
-            SELECT usuario_id, COUNT(*) as total_likes_dados
-            FROM me_gusta
-            GROUP BY usuario_id
-        ) likes_given ON u.id = likes_given.usuario_id
-        -- Subconsulta para comentarios recibidos
-        LEFT JOIN (
-            SELECT p.usuario_id, COUNT(*) as total_comentarios_recibidos
-            FROM comentarios c
-            JOIN publicaciones p ON c.publicacion_id = p.id
-            WHERE c.activo = 1 AND p.activa = 1
-            GROUP BY p.usuario_id
-        ) comments_received ON u.id = comments_received.usuario_id
-        -- Subconsulta para comentarios dados
-        LEFT JOIN (
-            SELECT usuario_id, COUNT(*) as total_comentarios_dados
-            FROM comentarios
-            WHERE activo = 1
-            GROUP BY usuario_id
-        ) comments_given ON u.id = comments_given.usuario_id
-        -- Subconsulta para mensajes enviados
-        LEFT JOIN (
-            SELECT emisor_id, COUNT(*) as total_mensajes_enviados
-            FROM mensajes
-            GROUP BY emisor_id
-        ) messages_sent ON u.id = messages_sent.emisor_id
-        -- Subconsulta para mensajes recibidos
-        LEFT JOIN (
-            SELECT receptor_id, COUNT(*) as total_mensajes_recibidos
-            FROM mensajes
-            GROUP BY receptor_id
-        ) messages_received ON u.id = messages_received.receptor_id
-        WHERE u.id = ? AND u.activo = 1
-        """
-        
-        results, _ = self.execute_query(query, (user_id, user_id, user_id, user_id, user_id, user_id, user_id))
+        results, _ = self.execute_query('get_user_profile', (user_id,))
         return results[0] if results else None
     
+    @cached(ttl=60, tags=('users',))
     def get_all_users(self):
         """Obtener todos los usuarios activos"""
-        query = "SELECT id, CONCAT(nombre, ' ', apellido), email FROM usuarios WHERE activo = 1"
-        results, _ = self.execute_query(query)
+        results, _ = self.execute_query('get_all_users')
         return results
     
+    def get_users_by_ids(self, user_ids):
+        """Usuarios activos ``(id, nombre_completo, email, ubicacion)`` de ``user_ids``"""
+        users = []
+        for start in range(0, len(user_ids), USERS_BY_IDS_BATCH):
+            batch = list(user_ids[start:start + USERS_BY_IDS_BATCH])
+            batch += [None] * (USERS_BY_IDS_BATCH - len(batch))
+            results, _ = self.execute_query('get_users_by_ids', batch)
+            users.extend(results or [])
+        return users
+    
     def get_user_posts(self, user_id, limit=30):
         """Obtener publicaciones de un usuario"""
-        query = """
-        SELECT p.id, p.contenido, p.fecha_publicacion, p.tipo,
-               COUNT(DISTINCT mg.id) as likes,
-               COUNT(DISTINCT c.id) as comentarios
-        FROM publicaciones p
-        LEFT JOIN me_gusta mg ON p.id = mg.publicacion_id
-        LEFT JOIN comentarios c ON p.id = c.publicacion_id AND c.activo = 1
-        WHERE p.usuario_id = ? AND p.activa = 1
-        GROUP BY p.id, p.contenido, p.fecha_publicacion, p.tipo
-        ORDER BY p.fecha_publicacion DESC
-        """
-        results, _ = self.execute_query(query, (user_id,))
+        results, _ = self.execute_query('get_user_posts', (user_id,))
+        return results
+    
+    def get_user_post_history(self, user_id):
+        """Obtener todas las publicaciones de un usuario, incluidas las inactivas"""
+        results, _ = self.execute_query('get_user_post_history', (user_id,))
         return results
     
+    @invalidates('profile:{user_id}')
     def create_post(self, user_id, contenido, tipo='texto', url_media=None):
-        """Crear nueva publicación"""
-        query = "INSERT INTO publicaciones (usuario_id, contenido, tipo, url_media) VALUES (?, ?, ?, ?)"
-        return self.execute_update(query, (user_id, contenido, tipo, url_media))
+        """Crear nueva publicación y repartirla en los timelines de los amigos"""
+        ok = self.execute_transaction([
+            ('create_post', (user_id, contenido, tipo, url_media)),
+            self._timeline_fanout_op(user_id),
+            *self._new_document_search_ops('publicacion', contenido),
+            *self._user_stat_ops('total_publicaciones', 'user', (user_id,)),
+        ], name='create_post')
+        if ok:
+            self._posts_since_trim += 1
+            if self._posts_since_trim >= self.TIMELINE_TRIM_EVERY:
+                self._posts_since_trim = 0
+                self.trim_timelines()
+        return ok
+    
+    # --- Timeline personal ---
+    
+    def _is_high_degree(self, user_id):
+        graph = self._graph()
+        return graph is not None and graph.friend_count(user_id) > self.FANOUT_MAX_FRIENDS
+    
+    def _timeline_fanout_op(self, user_id):
+        if self._is_high_degree(user_id):
+            # Demasiados amigos: sólo su propio timeline; los lectores lo mezclan al leer
+            return ('timeline.fanout_self', lambda post_id: (post_id,))
+        return ('timeline.fanout', lambda post_id: (user_id,) * 3 + (post_id,))
+    
+    @classmethod
+    def _rebuild_timeline_ops(cls, user_id=None):
+        if user_id is None:
+            return [('timeline.clear_all', None),
+                    ('timeline.rebuild_all', (cls.TIMELINE_MAX_ENTRIES,))]
+        return [('timeline.clear_user', (user_id,)),
+                ('timeline.rebuild_user', (user_id,) * 4 + (cls.TIMELINE_MAX_ENTRIES,))]
+    
+    def rebuild_timeline(self, user_id=None):
+        """Reconstruir el timeline de un usuario (o de todos) desde amistades y publicaciones"""
+        ok = self.execute_transaction(self._rebuild_timeline_ops(user_id), name='rebuild_timeline')
+        if ok and user_id is not None:
+            self._timelines_rebuilt.add(user_id)
+        return ok
+    
+    def trim_timelines(self):
+        """Recortar cada timeline a ``TIMELINE_MAX_ENTRIES`` entradas"""
+        return self.execute_update('timeline.trim', (self.TIMELINE_MAX_ENTRIES,))
+    
+    def get_timeline_page(self, user_id, after=None, limit=20):
+        """Página del timeline de ``user_id``: publicaciones propias y de sus amigos.
+        
+        Se lee como un rango de ``timeline_entradas``; las publicaciones de
+        amigos con más de ``FANOUT_MAX_FRIENDS`` amigos no se repartieron al
+        escribirlas y se mezclan aquí. ``after`` es la clave
+        ``(fecha_publicacion, id)`` de la última publicación mostrada.
+        """
+        if after is None:
+            posts, _ = self.execute_query('timeline.page.first', (user_id, limit), name='get_timeline_page')
+            if posts == [] and user_id not in self._timelines_rebuilt:
+                # Arranque en frío (timeline aún sin generar): reconstruirlo sólo la primera
+                # vez; si sigue vacío es que no hay nada que mostrar y la lectura no escribe
+                self.rebuild_timeline(user_id)
+                posts, _ = self.execute_query('timeline.page.first', (user_id, limit), name='get_timeline_page')
+        else:
+            fecha, post_id = after
+            posts, _ = self.execute_query('timeline.page.after', (user_id, fecha, fecha, post_id, limit),
+                                          name='get_timeline_page')
+        if posts is None:
+            return None
+        
+        graph = self._graph()
+        if graph is None:
+            return posts
+        authors = [friend for friend in graph.friends(user_id)
+                   if graph.friend_count(friend) > self.FANOUT_MAX_FRIENDS][:self.FANOUT_MAX_READ_AUTHORS]
+        if not authors:
+            return posts
+        merged = {post[0]: post for post in posts}
+        for author in authors:
+            if after is None:
+                extra, _ = self.execute_query('timeline.author_page.first', (author, limit),
+                                              name='get_timeline_page.fanout_read')
+            else:
+                extra, _ = self.execute_query('timeline.author_page.after', (author, fecha, fecha, post_id, limit),
+                                              name='get_timeline_page.fanout_read')
+            for post in extra or []:
+                merged.setdefault(post[0], post)
+        return sorted(merged.values(), key=lambda post: (post[4], post[0]), reverse=True)[:limit]
     
     def get_all_posts(self):
         """Obtener todas las publicaciones activas con información completa"""
         # Primero hacer una consulta simple para verificar que hay datos
-        simple_query = "SELECT COUNT(*) FROM publicaciones WHERE activa = 1"
-        count_result, _ = self.execute_query(simple_query)
+        count_result, _ = self.execute_query('get_all_posts.count')
         print(f"Total de publicaciones activas: {count_result[0][0] if count_result else 0}")
         
-        # Consulta simplificada para obtener las publicaciones
-        query = """
-        SELECT 
-            p.id,
-            CONCAT(u.nombre, ' ', u.apellido) as autor,
-            u.id as usuario_id,
-            p.contenido,
-            p.fecha_publicacion,
-            p.tipo,
-            p.url_media,
-            ISNULL(likes_count.total_likes, 0) as total_likes,
-            ISNULL(comments_count.total_comentarios, 0) as total_comentarios
-        FROM publicaciones p
-        JOIN usuarios u ON p.usuario_id = u.id
-        LEFT JOIN (
-            SELECT publicacion_id, COUNT(*) as total_likes 
-            FROM me_gusta 
-            GROUP BY publicacion_id
-        ) likes_count ON p.id = likes_count.publicacion_id
-        LEFT JOIN (
-            SELECT publicacion_id, COUNT(*) as total_comentarios 
-            FROM comentarios 
-            WHERE activo = 1
-            GROUP BY publicacion_id
-        ) comments_count ON p.id = comments_count.publicacion_id
-        WHERE p.activa = 1 AND u.activo = 1
-        ORDER BY p.fecha_publicacion DESC
-        """
-        results, _ = self.execute_query(query)
+        results, _ = self.execute_query('get_all_posts')
         print(f"Publicaciones obtenidas: {len(results) if results else 0}")
         return results
     
+    def get_posts_page(self, after=None, limit=20):
+        """Obtener una página del feed paginando por clave (fecha_publicacion, id).
+        
+        ``after`` es la clave ``(fecha_publicacion, id)`` de la última publicación
+        ya mostrada (``None`` para la primera página). El coste no depende del
+        número total de publicaciones: los conteos salen de
+        ``publicacion_contadores``.
+        """
+        if after is None:
+            results, _ = self.execute_query('get_posts_page.first', (limit,), name='get_posts_page')
+        else:
+            fecha, post_id = after
+            results, _ = self.execute_query('get_posts_page.after', (fecha, fecha, post_id, limit),
+                                            name='get_posts_page')
+        return results
+    
+    @invalidates('profiles')
     def like_post(self, user_id, post_id):
         """Dar like a una publicación"""
-        query = "INSERT INTO me_gusta (usuario_id, publicacion_id) VALUES (?, ?)"
-        return self.execute_update(query, (user_id, post_id))
+        return self.execute_transaction([
+            ('like_post', (user_id, post_id)),
+            self._ensure_post_counter_op(post_id),
+            ('post_counters.add_like', (post_id,)),
+            *self._user_stat_ops('total_likes_dados', 'user', (user_id,)),
+            *self._user_stat_ops('total_likes_recibidos', 'post_owner', (post_id,)),
+        ], name='like_post')
     
+    @invalidates('profiles')
     def comment_post(self, user_id, post_id, contenido):
         """Comentar una publicación"""
-        query = "INSERT INTO comentarios (usuario_id, publicacion_id, contenido) VALUES (?, ?, ?)"
-        return self.execute_update(query, (user_id, post_id, contenido))
+        return self.execute_transaction([
+            ('comment_post', (user_id, post_id, contenido)),
+            *self._new_document_search_ops('comentario', contenido),
+            self._ensure_post_counter_op(post_id),
+            ('post_counters.add_comment', (post_id,)),
+            *self._user_stat_ops('total_comentarios_dados', 'user', (user_id,)),
+            *self._user_stat_ops('total_comentarios_recibidos', 'post_owner', (post_id,)),
+        ], name='comment_post')
+    
+    @invalidates('profiles')
+    def deactivate_comment(self, comment_id):
+        """Desactivar un comentario y descontarlo de los contadores y estadísticas"""
+        return self.execute_transaction([
+            # Los descuentos se aplican antes de desactivarlo: sus subconsultas
+            # sólo encuentran comentarios activos
+            *self._user_stat_ops('total_comentarios_dados', 'comment_author', (comment_id,), delta=-1),
+            *self._user_stat_ops('total_comentarios_recibidos', 'comment_post_owner', (comment_id,), delta=-1),
+            ('post_counters.remove_comment', (comment_id,)),
+            ('deactivate_comment', (comment_id,), True),
+        ], name='deactivate_comment')
     
     def get_post_comments(self, post_id):
         """Obtener comentarios de una publicación"""
-        query = """
-        SELECT c.id, c.contenido, c.fecha_comentario, CONCAT(u.nombre, ' ', u.apellido)
-        FROM comentarios c
-        JOIN usuarios u ON c.usuario_id = u.id
-        WHERE c.publicacion_id = ? AND c.activo = 1
-        ORDER BY c.fecha_comentario ASC
-        """
-        results, _ = self.execute_query(query, (post_id,))
+        results, _ = self.execute_query('get_post_comments', (post_id,))
         return results
     
+    @invalidates('profile:{sender_id}', 'profile:{receiver_id}')
     def send_message(self, sender_id, receiver_id, contenido):
         """Enviar mensaje"""
-        query = "INSERT INTO mensajes (emisor_id, receptor_id, contenido) VALUES (?, ?, ?)"
-        return self.execute_update(query, (sender_id, receiver_id, contenido))
+        return self.execute_transaction([
+            ('send_message', (sender_id, receiver_id, contenido)),
+            *self._conversation_ops(sender_id, receiver_id),
+            *self._user_stat_ops('total_mensajes_enviados', 'user', (sender_id,)),
+            *self._user_stat_ops('total_mensajes_recibidos', 'user', (receiver_id,)),
+        ], name='send_message')
+    
+    @staticmethod
+    def _conversation_ops(sender_id, receiver_id):
+        """Actualizar la conversación de cada lado con el mensaje recién insertado"""
+        if sender_id == receiver_id:
+            return []
+        ops = []
+        for user_id, contact_id in ((sender_id, receiver_id), (receiver_id, sender_id)):
+            ops.append(('conversations.ensure', (user_id, contact_id, user_id, contact_id)))
+            ops.append(('conversations.touch', (sender_id, receiver_id, user_id, contact_id)))
+        return ops
+    
+    @staticmethod
+    def _rebuild_conversations_ops():
+        return [
+            ('conversations.clear', None),
+            ('conversations.rebuild', None),
+        ]
     
     def get_user_messages(self, user_id):
-        """Obtener mensajes de un usuario"""
-        query = """
-        SELECT m.id, m.contenido, m.fecha_envio, m.leido,
-               CONCAT(u.nombre, ' ', u.apellido) as sender_name,
-               CASE WHEN m.emisor_id = ? THEN 'Enviado' ELSE 'Recibido' END as tipo
-        FROM mensajes m
-        JOIN usuarios u ON (m.emisor_id = u.id OR m.receptor_id = u.id)
-        WHERE (m.emisor_id = ? OR m.receptor_id = ?) AND u.id != ?
-        ORDER BY m.fecha_envio DESC
+        """Obtener todos los mensajes de un usuario.
+        
+        Filas ``(id, contenido, fecha_envio, leido, contacto, tipo, contacto_id)``.
         """
-        results, _ = self.execute_query(query, (user_id, user_id, user_id, user_id))
+        results, _ = self.execute_query('get_user_messages', (user_id, user_id))
         return results
     
+    def get_conversations(self, user_id):
+        """Conversaciones de un usuario, de la más reciente a la más antigua.
+        
+        Filas ``(contacto_id, contacto, ultimo_mensaje_id, contenido,
+        fecha_envio, tipo, total_mensajes)``: el último mensaje de cada una
+        sale del índice ``conversaciones``, sin recorrer el historial.
+        """
+        results, _ = self.execute_query('get_conversations', (user_id,))
+        return results
+    
+    def get_conversation_messages(self, user_id, contact_id, before_id=None, limit=50):
+        """Mensajes con ``contact_id`` (``(id, contenido, fecha_envio, leido, tipo)``),
+        los más recientes primero; ``before_id`` pagina hacia atrás.
+        """
+        params = (user_id, user_id, contact_id, contact_id, user_id)
+        if before_id is None:
+            results, _ = self.execute_query('get_conversation_messages.first', params + (limit,),
+                                            name='get_conversation_messages')
+        else:
+            results, _ = self.execute_query('get_conversation_messages.before', params + (before_id, limit),
+                                            name='get_conversation_messages')
+        return results
+    
+    def get_messages_since(self, user_id, last_id=0, limit=500):
+        """Mensajes enviados o recibidos con id mayor que ``last_id``, en orden de id.
+        
+        Mismas filas que ``get_user_messages``; quien refresca guarda el
+        mayor id visto y sólo recibe lo nuevo.
+        """
+        results, _ = self.execute_query('get_messages_since', (user_id, last_id, user_id, last_id, limit))
+        return results
+    
+    NOTIFICATION_KINDS = ('mensajes', 'solicitudes', 'likes', 'comentarios')
+    
+    def get_notifications_since(self, user_id, watermarks):
+        """Novedades de ``user_id`` posteriores a ``watermarks`` en una sola consulta.
+        
+        ``watermarks`` asocia cada tipo de ``NOTIFICATION_KINDS`` con el mayor
+        id visto (``None`` no cuenta nada: sólo fija la marca inicial).
+        Devuelve ``{tipo: (nuevos, nueva_marca)}`` o ``None`` si falla.
+        """
+        mensajes, solicitudes, likes, comentarios = (watermarks.get(kind) for kind in self.NOTIFICATION_KINDS)
+        results, _ = self.execute_query('notifications.since', (
+            mensajes, user_id,
+            solicitudes, user_id,
+            likes, user_id, user_id,
+            comentarios, user_id, user_id,
+        ))
+        if not results:
+            return None
+        row = results[0]
+        return {kind: (row[4 + index], row[index]) for index, kind in enumerate(self.NOTIFICATION_KINDS)}
+    
     def get_user_interactions(self, user_id, days=30):
         """Obtener interacciones de un usuario (likes y comentarios)"""
-        query = f"""
-            SELECT 'Like' as tipo, mg.fecha_like as fecha, 
-                   CONCAT('Te gustó una publicación de ', u.nombre, ' ', u.apellido) as detalle
-            FROM me_gusta mg
-            JOIN publicaciones p ON mg.publicacion_id = p.id
-            JOIN usuarios u ON p.usuario_id = u.id
-            WHERE mg.usuario_id = ? AND mg.fecha_like >= DATEADD(DAY, -{days}, GETDATE())
-            UNION ALL
-            SELECT 'Comentario' as tipo, c.fecha_comentario as fecha,
-                   CONCAT('Comentaste en una publicación de ', u.nombre, ' ', u.apellido) as detalle
-            FROM comentarios c
-            JOIN publicaciones p ON c.publicacion_id = p.id
-            JOIN usuarios u ON p.usuario_id = u.id
-            WHERE c.usuario_id = ? AND c.fecha_comentario >= DATEADD(DAY, -{days}, GETDATE())
-            ORDER BY fecha DESC
-        """
-        results, _ = self.execute_query(query, (user_id, user_id))
+        # La ventana se pasa como parámetro: un único plan para cualquier ``days``
+        since = datetime.now() - timedelta(days=days)
+        results, _ = self.execute_query('get_user_interactions', (user_id, since, user_id, since))
         return results if results else []
     
+    # --- Búsqueda ---
+    
+    @staticmethod
+    def _search_ops(statement, text, params):
+        """Una fila de ``busqueda_terminos`` por término distinto de ``text``"""
+        return [(statement, (term, frequency, *params))
+                for term, frequency in term_frequencies(text).items()]
+    
+    @staticmethod
+    def _new_document_search_ops(kind, text):
+        """Como ``_search_ops`` para el documento que acaba de insertar la operación anterior"""
+        return [('search.index', lambda document_id, term=term, frequency=frequency:
+                 (term, kind, document_id, frequency))
+                for term, frequency in term_frequencies(text).items()]
+    
+    def search(self, query, limit=20):
+        """Buscar en publicaciones, comentarios y usuarios (sin distinguir acentos).
+        
+        Filas ``(tipo, id, texto, autor, fecha, coincidencias, frecuencia)``
+        ordenadas por relevancia; lista vacía si ``query`` no tiene términos.
+        """
+        exact, prefix = query_terms(query, SEARCH_MAX_TERMS)
+        if prefix is None:
+            return []
+        params = (*exact, *[None] * (SEARCH_MAX_TERMS - len(exact)),
+                  self.backend.prefix_pattern(prefix), limit)
+        results, _ = self.execute_query('search.query', params, name='search')
+        return results
+    
+    def rebuild_search_index(self, batch_size=500):
+        """Reconstruir ``busqueda_terminos`` desde las tablas base.
+        
+        Se escribe por lotes de ``batch_size`` documentos, cada uno en su
+        transacción. Devuelve los documentos indexados (``None`` si falla).
+        """
+        if not self.execute_update('search.clear'):
+            return None
+        stream = self.execute_query_stream('search.documents', batch_size=batch_size)
+        if stream is None:
+            return None
+        indexed = 0
+        with stream:
+            while True:
+                documents = stream.fetch_batch()
+                if not documents:
+                    break
+                ops = [('search.index', (term, tipo, document_id, frequency))
+                       for tipo, document_id, text in documents
+                       for term, frequency in term_frequencies(text).items()]
+                if ops and not self.execute_transaction(ops, name='rebuild_search_index'):
+                    return None
+                indexed += len(documents)
+        print(f"Índice de búsqueda reconstruido: {indexed} documentos")
+        return indexed
+    
+    def ensure_search_index(self):
+        """Construir el índice de búsqueda si todavía está vacío (primer uso)"""
+        results, _ = self.execute_query('search.is_empty')
+        if results and results[0][0]:
+            return self.rebuild_search_index() is not None
+        return results is not None
+    
+    # --- Directorio de usuarios (búsqueda mientras se escribe) ---
+    
+    def load_user_directory(self):
+        """(Re)construir el directorio en memoria desde los usuarios activos"""
+        stream = self.execute_query_stream('get_all_users', batch_size=5000, name='user_directory.load')
+        if stream is None:
+            return False
+        with stream:
+            self.user_directory.load(stream)
+        print(f"Directorio de usuarios cargado: {self.user_directory.get_stats()['users']} usuarios")
+        return True
+    
+    def refresh_user_directory(self):
+        """Añadir al directorio los usuarios dados de alta después de la última lectura"""
+        results, _ = self.execute_query('user_directory.after', (self.user_directory.max_id,))
+        if results is None:
+            return False
+        self.user_directory.add_users(results)
+        return True
+    
+    def user_directory_current(self):
+        """¿Se puede buscar en el directorio sin leer de la base de datos?"""
+        directory = self.user_directory
+        return directory.loaded and time.monotonic() - directory.refreshed_at <= self.USER_DIRECTORY_REFRESH
+    
+    def _directory(self):
+        """Directorio cargado (``None`` si no se pudo cargar).
+        
+        Cada ``USER_DIRECTORY_REFRESH`` segundos lee las altas nuevas y cada
+        ``USER_DIRECTORY_MAX_AGE`` lo recarga entero (bajas y cambios de
+        otros procesos); mientras, los demás hilos usan el que hay.
+        """
+        directory = self.user_directory
+        if not directory.loaded:
+            with self._user_directory_lock:
+                if not directory.loaded and not self.load_user_directory():
+                    return None
+        elif not self.user_directory_current() and self._user_directory_lock.acquire(blocking=False):
+            try:
+                if time.monotonic() - directory.loaded_at > self.USER_DIRECTORY_MAX_AGE:
+                    self.load_user_directory()
+                elif not self.user_directory_current():
+                    self.refresh_user_directory()
+            finally:
+                self._user_directory_lock.release()
+        return directory
+    
+    def _refresh_directory_user(self, email):
+        results, _ = self.execute_query('get_user_by_email', (email,))
+        if results:
+            self.user_directory.add_user(results[0])
+    
+    def search_users(self, query, limit=10, exclude=()):
+        """Usuarios ``(id, nombre_completo, email)`` cuyo nombre o email empieza por ``query``.
+        
+        Se responde desde memoria; la primera llamada carga el directorio y,
+        pasado ``USER_DIRECTORY_REFRESH``, se leen las altas nuevas (hágase
+        fuera del hilo de Tk salvo con ``user_directory_current``). ``None``
+        si no se pudo cargar.
+        """
+        directory = self._directory()
+        return directory.search(query, limit, exclude) if directory else None
+    
+    # --- Grafo de amistades ---
+    
+    def load_friend_graph(self):
+        """(Re)construir el grafo de amistades desde ``amistades``"""
+        stream = self.execute_query_stream('friend_graph.edges', batch_size=5000)
+        if stream is None:
+            return False
+        with stream:
+            self.friend_graph.load(stream)
+        self.suggestions.clear()
+        print(f"Grafo de amistades cargado: {self.friend_graph.get_stats()['edges']} amistades")
+        return True
+    
+    def _graph_stale(self):
+        return time.monotonic() - self.friend_graph.loaded_at > self.FRIEND_GRAPH_MAX_AGE
+    
+    def _graph(self):
+        """Grafo de amistades cargado (``None`` si no se pudo cargar).
+        
+        Pasados ``FRIEND_GRAPH_MAX_AGE`` segundos se recarga; mientras tanto
+        los demás hilos siguen usando el grafo anterior.
+        """
+        if not self.friend_graph.loaded:
+            with self._friend_graph_lock:
+                if not self.friend_graph.loaded and not self.load_friend_graph():
+                    return None
+        elif self._graph_stale() and self._friend_graph_lock.acquire(blocking=False):
+            try:
+                if self._graph_stale():
+                    self.load_friend_graph()
+            finally:
+                self._friend_graph_lock.release()
+        return self.friend_graph
+    
+    def are_friends(self, user_id, other_id):
+        graph = self._graph()
+        return graph.are_friends(user_id, other_id) if graph else False
+    
+    def get_friend_count(self, user_id):
+        graph = self._graph()
+        return graph.friend_count(user_id) if graph else 0
+    
+    def get_friendship_status(self, user_id, other_id):
+        """Estado de la amistad entre dos usuarios en cualquier sentido (``None`` si no hay).
+        
+        Se consulta siempre en la base de datos: el grafo en memoria no ve
+        las solicitudes de otros clientes hasta que se recarga.
+        """
+        results, _ = self.execute_query('get_friendship_status', (user_id, other_id, other_id, user_id))
+        return results[0][0] if results else None
+    
+    @invalidates('requests:{receiver_id}')
     def send_friend_request(self, sender_id, receiver_id):
-        """Enviar solicitud de amistad"""
-        query = "INSERT INTO amistades (usuario1_id, usuario2_id, estado) VALUES (?, ?, 'pendiente')"
-        return self.execute_update(query, (sender_id, receiver_id))
+        """Enviar solicitud de amistad (False si ya hay una relación entre ambos)"""
+        ok = self.execute_transaction([
+            ('send_friend_request', (sender_id, receiver_id) * 2 + (receiver_id, sender_id), True),
+        ], name='send_friend_request')
+        if ok:
+            self.friend_graph.set_request_status(sender_id, receiver_id, 'pendiente')
+        return ok
     
+    @cached(ttl=30, tags=('requests:{user_id}',))
     def get_friend_requests(self, user_id):
         """Obtener solicitudes de amistad pendientes"""
-        query = """
-        SELECT u.id, CONCAT(u.nombre, ' ', u.apellido), u.email, a.fecha_solicitud
-        FROM amistades a
-        JOIN usuarios u ON a.usuario1_id = u.id
-        WHERE a.usuario2_id = ? AND a.estado = 'pendiente'
-        """
-        results, _ = self.execute_query(query, (user_id,))
+        results, _ = self.execute_query('get_friend_requests', (user_id,))
         return results if results is not None else []
     
+    @invalidates('requests:{receiver_id}', 'friends:{sender_id}', 'friends:{receiver_id}',
+                 'profile:{sender_id}', 'profile:{receiver_id}')
     def accept_friend_request(self, sender_id, receiver_id):
         """Aceptar solicitud de amistad"""
-        query = "UPDATE amistades SET estado = 'aceptada' WHERE usuario1_id = ? AND usuario2_id = ?"
-        return self.execute_update(query, (sender_id, receiver_id))
+        ok = self.execute_transaction([
+            ('accept_friend_request', (sender_id, receiver_id), True),
+            *self._user_stat_ops('total_amigos', 'user', (sender_id,)),
+            *self._user_stat_ops('total_amigos', 'user', (receiver_id,)),
+            # Los timelines incorporan las publicaciones del nuevo amigo
+            *self._rebuild_timeline_ops(sender_id),
+            *self._rebuild_timeline_ops(receiver_id),
+        ], name='accept_friend_request')
+        if ok:
+            self.friend_graph.add_friendship(sender_id, receiver_id)
+            self.suggestions.on_friendship_added(self.friend_graph, sender_id, receiver_id)
+        return ok
+    
+    @invalidates('requests:{receiver_id}')
+    def reject_friend_request(self, sender_id, receiver_id):
+        """Rechazar solicitud de amistad"""
+        ok = self.execute_transaction([
+            ('reject_friend_request', (sender_id, receiver_id), True),
+        ], name='reject_friend_request')
+        if ok:
+            self.friend_graph.set_request_status(sender_id, receiver_id, 'rechazada')
+        return ok
+    
+    def get_friend_suggestions(self, user_id, limit=10):
+        """Personas que quizá conozcas: ``(id, nombre, email, amigos_en_comun, ubicacion)``"""
+        graph = self._graph()
+        if graph is None:
+            return []
+        return self.suggestions.suggest(graph, user_id, limit)
     
+    @cached(ttl=60, tags=('friends:{user_id}', 'users'))
     def get_user_friends(self, user_id):
         """Obtener amigos de un usuario"""
-        query = """
-        SELECT u.id, CONCAT(u.nombre, ' ', u.apellido), u.email
-        FROM usuarios u
-        JOIN amistades a ON (u.id = a.usuario1_id OR u.id = a.usuario2_id)
-        WHERE (a.usuario1_id = ? OR a.usuario2_id = ?) 
-        AND a.estado = 'aceptada' AND u.id != ? AND u.activo = 1
-        """
-        results, _ = self.execute_query(query, (user_id, user_id, user_id))
-        return results
+        graph = self._graph()
+        directory = self._directory() if graph is not None else None
+        if directory is None:
+            results, _ = self.execute_query('get_user_friends', (user_id, user_id, user_id))
+            return results
+        # Sólo amigos activos, como la consulta original
+        friends = (directory.get(friend) for friend in graph.friends(user_id))
+        return [friend for friend in friends if friend is not None]
     
+    @invalidates('photo:{user_id}')
     def update_user_photo(self, user_id, photo_path):
         """Actualizar foto de perfil del usuario"""
-        query = "UPDATE usuarios SET imagen_perfil = ? WHERE id = ?"
-        return self.execute_update(query, (photo_path, user_id))
+        return self.execute_update('update_user_photo', (photo_path, user_id))
     
+    def get_all_user_photos(self):
+        """``(usuario_id, imagen_perfil)`` de los usuarios con foto"""
+        results, _ = self.execute_query('get_all_user_photos')
+        return results
+    
+    @cached(ttl=300, tags=('photo:{user_id}',))
     def get_user_photo(self, user_id):
         """Obtener ruta de la foto de perfil del usuario"""
-        query = "SELECT imagen_perfil FROM usuarios WHERE id = ?"
-        results, _ = self.execute_query(query, (user_id,))
+        results, _ = self.execute_query('get_user_photo', (user_id,))
         return results[0][0] if results and results[0][0] else None
     
+    @invalidates('users', 'profile:{user_id}')
     def update_user_email(self, user_id, new_email):
         """Actualizar email del usuario"""
-        query = "UPDATE usuarios SET email = ? WHERE id = ?"
-        return self.execute_update(query, (new_email, user_id))
+        ok = self.execute_update('update_user_email', (new_email, user_id))
+        if ok:
+            # Las sugerencias guardan (id, nombre, email, ubicacion) de cada candidato
+            self.suggestions.invalidate(user_id)
+            if self.user_directory.loaded:
+                self._refresh_directory_user(new_email)
+        return ok
     
     def debug_database_state(self):
         """Función de debugging para verificar el estado de la base de datos"""
         print("=== DEBUGGING DATABASE STATE ===")
-        
-        # Verificar conexión
-        conn = None
-        try:
-            conn = self.connect_db()
-            if conn is None:
-                print("✗ No se pudo conectar a la base de datos")
-                return
-            print("✓ Conexión a la base de datos exitosa")
-        except Exception as e:
-            print(f"✗ Error de conexión: {e}")
-            return
-        
-        # Verificar tabla usuarios
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM usuarios WHERE activo = 1")
-            result = cursor.fetchone()
-            user_count = result[0] if result else 0
-            print(f"✓ Usuarios activos: {user_count}")
-        except Exception as e:
-            print(f"✗ Error consultando usuarios: {e}")
-        
-        # Verificar tabla publicaciones
-        try:
-            cursor.execute("SELECT COUNT(*) FROM publicaciones")
-            result = cursor.fetchone()
-            total_posts = result[0] if result else 0
-            print(f"✓ Total de publicaciones: {total_posts}")
-            
-            cursor.execute("SELECT COUNT(*) FROM publicaciones WHERE activa = 1")
-            result = cursor.fetchone()
-            active_posts = result[0] if result else 0
-            print(f"✓ Publicaciones activas: {active_posts}")
-            
-            # Mostrar algunas publicaciones de ejemplo
-            cursor.execute("SELECT TOP 3 id, usuario_id, contenido, activa FROM publicaciones")
-            sample_posts = cursor.fetchall()
-            print(f"✓ Ejemplos de publicaciones: {sample_posts}")
-            
-        except Exception as e:
-            print(f"✗ Error consultando publicaciones: {e}")
-        
-        # Verificar tabla me_gusta
-        try:
-            cursor.execute("SELECT COUNT(*) FROM me_gusta")
-            result = cursor.fetchone()
-            likes_count = result[0] if result else 0
-            print(f"✓ Total de likes: {likes_count}")
-        except Exception as e:
-            print(f"✗ Error consultando likes: {e}")
-        
-        # Verificar tabla comentarios
-        try:
-            cursor.execute("SELECT COUNT(*) FROM comentarios")
-            result = cursor.fetchone()
-            comments_count = result[0] if result else 0
-            print(f"✓ Total de comentarios: {comments_count}")
-        except Exception as e:
-            print(f"✗ Error consultando comentarios: {e}")
-        
-        if conn:
-            conn.close()
-        print("=== FIN DEBUGGING ===") 
\ No newline at end of file
+        status = self.health.run_once()
+        if not status['ok']:
+            print("✗ No se pudo consultar la base de datos")
+        else:
+            print(f"✓ Conexión a la base de datos exitosa ({status['latency_ms']:.1f} ms)")
+            for check, value in status['counts'].items():
+                print(f"✓ {check}: {value}")
+        print("=== FIN DEBUGGING ===")
+        return status
@@ -0,0 +1,128 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from .search import normalize
+
+
+class UserDirectory:
+    """Índice en memoria de los usuarios activos para buscar mientras se escribe.
+
+    Guarda una lista ordenada de claves ``(palabra, usuario_id)``: cada
+    palabra del nombre completo y el email, normalizados sin acentos. Una
+    búsqueda es una bisección hasta el término más largo de la consulta y un
+    recorrido corto hacia delante, acotado por ``max_scan`` claves; todos los
+    términos deben empezar alguna palabra del usuario. Las altas y cambios
+    se insertan en la lista ordenada sin reconstruirla.
+
+    ``max_id`` es el mayor id leído de la base de datos (con ``load`` o
+    ``add_users``) y ``refreshed_at`` (``time.monotonic``), cuándo: el dueño
+    pide periódicamente los usuarios con id posterior para ver las altas de
+    otros procesos.
+    """
+
+    def __init__(self, max_scan=2000):
+        self.max_scan = max_scan
+        self._keys = []   # (clave, usuario_id) ordenadas
+        self._users = {}  # usuario_id -> (id, nombre_completo, email)
+        self._words = {}  # usuario_id -> palabras normalizadas (nombre y email)
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.loaded_at = None
+        self.refreshed_at = None
+        self.max_id = 0
+
+    @staticmethod
+    def _user_keys(user):
+        _, nombre, email = user
+        words = normalize(nombre or '').split()
+        email = normalize(email or '')
+        if email:
+            words.append(email)
+        return set(words), words
+
+    def load(self, rows):
+        """Construir el índice desde filas ``(id, nombre_completo, email)``"""
+        keys, users, words = [], {}, {}
+        for row in rows:
+            user = tuple(row)
+            user_keys, user_words = self._user_keys(user)
+            keys.extend((key, user[0]) for key in user_keys)
+            users[user[0]] = user
+            words[user[0]] = user_words
+        keys.sort()
+        with self._lock:
+            self._keys, self._users, self._words = keys, users, words
+            self.loaded = True
+            self.loaded_at = self.refreshed_at = time.monotonic()
+            self.max_id = max(users, default=0)
+
+    def add_user(self, user):
+        """Dar de alta (o actualizar) ``(id, nombre_completo, email)``.
+
+        No mueve ``max_id``: un usuario creado en este proceso puede tener un
+        id posterior a otros aún no leídos.
+        """
+        user = tuple(user)
+        with self._lock:
+            self._add_locked(user)
+
+    def add_users(self, rows):
+        """Dar de alta las filas leídas con id posterior a ``max_id``"""
+        with self._lock:
+            for row in rows:
+                user = tuple(row)
+                self._add_locked(user)
+                self.max_id = max(self.max_id, user[0])
+            self.refreshed_at = time.monotonic()
+
+    def _add_locked(self, user):
+        self._remove_locked(user[0])
+        user_keys, user_words = self._user_keys(user)
+        for key in user_keys:
+            insort(self._keys, (key, user[0]))
+        self._users[user[0]] = user
+        self._words[user[0]] = user_words
+
+    def _remove_locked(self, user_id):
+        user = self._users.pop(user_id, None)
+        if user is None:
+            return
+        self._words.pop(user_id, None)
+        for key in self._user_keys(user)[0]:
+            index = bisect_left(self._keys, (key, user_id))
+            if index < len(self._keys) and self._keys[index] == (key, user_id):
+                del self._keys[index]
+
+    def get(self, user_id):
+        """``(id, nombre_completo, email)`` de un usuario activo (``None`` si no lo es)"""
+        with self._lock:
+            return self._users.get(user_id)
+
+    def search(self, query, limit=10, exclude=()):
+        """Hasta ``limit`` usuarios ``(id, nombre_completo, email)`` que encajan con ``query``.
+
+        Sin consulta devuelve los primeros en orden alfabético.
+        """
+        terms = normalize(query or '').split()
+        first = max(terms, key=len) if terms else ''
+        with self._lock:
+            seen, matches = set(), []
+            index = bisect_left(self._keys, (first,))
+            end = min(len(self._keys), index + self.max_scan)
+            while index < end and len(matches) < limit:
+                key, user_id = self._keys[index]
+                if not key.startswith(first):
+                    break
+                index += 1
+                if user_id in seen or user_id in exclude:
+                    continue
+                seen.add(user_id)
+                words = self._words[user_id]
+                if all(any(word.startswith(term) for word in words) for term in terms):
+                    matches.append(self._users[user_id])
+            return matches
+
+    def get_stats(self):
+        with self._lock:
+            return {'users': len(self._users), 'keys': len(self._keys), 'loaded': self.loaded}
@@ -0,0 +1,72 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundExecutor:
+    """Ejecuta trabajo bloqueante (consultas, E/S) en hilos de trabajo.
+
+    ``submit`` devuelve un ``Future``; si se indican ``callback``/``errback``
+    se invocan en el hilo de Tk: los hilos de trabajo sólo encolan el
+    resultado y el bucle de Tk lo recoge con ``root.after``. Si se pasa
+    ``widget`` y ya fue destruido cuando llega el resultado, se descarta.
+    ``submit`` debe llamarse desde el hilo de Tk.
+    """
+
+    def __init__(self, root, max_workers=4, poll_interval=25, name='niilo-worker'):
+        self.root = root
+        self.poll_interval = poll_interval
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._completed = queue.SimpleQueue()
+        self._pending = 0
+        self._polling = False
+        self._closed = False
+
+    def submit(self, fn, *args, callback=None, errback=None, widget=None, **kwargs):
+        """Programar ``fn(*args, **kwargs)`` en segundo plano"""
+        future = self._pool.submit(fn, *args, **kwargs)
+        if callback is not None or errback is not None:
+            self._pending += 1
+            future.add_done_callback(
+                lambda f: self._completed.put((f, callback, errback, widget)))
+            self._schedule_poll()
+        return future
+
+    def _schedule_poll(self):
+        if not self._polling and not self._closed:
+            self._polling = True
+            self.root.after(self.poll_interval, self._drain)
+
+    def _drain(self):
+        """Entregar en el hilo de Tk los resultados terminados"""
+        self._polling = False
+        while True:
+            try:
+                future, callback, errback, widget = self._completed.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if future.cancelled():
+                continue
+            try:
+                if widget is not None and not widget.winfo_exists():
+                    continue
+            except Exception:
+                continue  # la ventana ya no existe
+            error = future.exception()
+            try:
+                if error is not None:
+                    if errback is not None:
+                        errback(error)
+                    else:
+                        print(f"Error en tarea en segundo plano: {error}")
+                elif callback is not None:
+                    callback(future.result())
+            except Exception as e:
+                print(f"Error entregando resultado a la interfaz: {e}")
+        if self._pending > 0:
+            self._schedule_poll()
+
+    def shutdown(self, wait=False):
+        """Detener los hilos de trabajo y cancelar tareas no iniciadas"""
+        self._closed = True
+        self._pool.shutdown(wait=wait, cancel_futures=True)
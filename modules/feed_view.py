@@ -0,0 +1,191 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualPostList:
+    """Lista de publicaciones sobre un ``Canvas`` que sólo mantiene vivas las tarjetas visibles.
+
+    Todas las filas miden ``row_height`` px: la fila ``i`` ocupa
+    ``i * row_height`` en el canvas y la región de scroll cubre la lista
+    entera, así que la barra se comporta como si estuvieran todas. Sólo
+    existen como widgets las tarjetas de las filas visibles más
+    ``overscan`` por arriba y por abajo; al desplazarse, las que salen de
+    la vista se mueven a las filas que entran y se les cambia el texto y
+    los comandos. El número de widgets no depende del largo del feed.
+
+    ``actions(post)`` devuelve los botones de cada tarjeta como
+    ``[(texto, color, comando, activo), ...]`` (siempre los mismos
+    botones, con otro texto, comando o estado); ``on_scroll(first, last)``
+    recibe la fracción visible, para pedir más páginas al acercarse al
+    final. ``update_post`` cambia una fila y sólo vuelve a pintar su
+    tarjeta, si está a la vista.
+    """
+
+    BG = '#1a1a2e'
+    CARD_BG = '#2d2d44'
+    CONTENT_MAX_CHARS = 300  # Lo que cabe en las líneas fijas de la tarjeta
+    PADX = 20
+
+    def __init__(self, parent, row_height=200, overscan=2, actions=None, on_scroll=None):
+        self.row_height = row_height
+        self.overscan = overscan
+        self.actions = actions
+        self.on_scroll = on_scroll
+        self.posts = []
+        self._rows = {}   # id de publicación -> fila
+        self._live = {}   # fila -> tarjeta mostrándola
+        self._free = []   # tarjetas sin fila, para reutilizar
+        self._created = 0
+
+        self.frame = tk.Frame(parent, bg=self.BG)
+        self.canvas = tk.Canvas(self.frame, bg=self.BG, highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_yscroll, yscrollincrement=20)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self._status = self.canvas.create_text(0, 0, text='', font=('Segoe UI', 12, 'italic'),
+                                               fill='#a0a0a0', anchor='n')
+        self.canvas.bind("<Configure>", self._on_resize)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind(sequence, self._on_wheel)
+        self._update_scrollregion()
+
+    # --- Datos ---
+
+    def append(self, posts):
+        """Añadir filas al final y mostrar las que caigan en la vista"""
+        for post in posts:
+            self._rows.setdefault(post[0], len(self.posts))
+            self.posts.append(post)
+        self._update_scrollregion()
+        self._render()
+
+    def get_post(self, post_id):
+        """Fila actual de la publicación ``post_id`` (``None`` si no está en la lista)"""
+        row = self._rows.get(post_id)
+        return self.posts[row] if row is not None else None
+
+    def update_post(self, post):
+        """Sustituir la fila de ``post`` (por su id) y repintar sólo su tarjeta"""
+        row = self._rows.get(post[0])
+        if row is None:
+            return
+        self.posts[row] = post
+        card = self._live.get(row)
+        if card is not None:
+            self._bind_card(card, post)
+
+    def set_status(self, text):
+        """Texto bajo la última fila (cargando, sin publicaciones...); ``''`` para ocultarlo"""
+        self.canvas.itemconfigure(self._status, text=text)
+        self._update_scrollregion()
+
+    def get_stats(self):
+        return {'rows': len(self.posts), 'live_cards': len(self._live),
+                'free_cards': len(self._free), 'created_cards': self._created}
+
+    # --- Geometría ---
+
+    def _content_height(self):
+        return len(self.posts) * self.row_height
+
+    def _update_scrollregion(self):
+        width = self.canvas.winfo_width()
+        extra = 60 if self.canvas.itemcget(self._status, 'text') else 0
+        self.canvas.coords(self._status, width // 2, self._content_height() + 20)
+        self.canvas.configure(scrollregion=(0, 0, width, self._content_height() + extra))
+
+    def _card_width(self):
+        return max(self.canvas.winfo_width() - 2 * self.PADX, 1)
+
+    def _on_resize(self, event):
+        for card in self._live.values():
+            self.canvas.itemconfigure(card['window'], width=self._card_width())
+        self._update_scrollregion()
+        self._render()
+
+    def _on_wheel(self, event):
+        self.canvas.yview_scroll(-3 if event.num == 4 or event.delta > 0 else 3, "units")
+        return "break"
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._render()
+        if self.on_scroll is not None:
+            self.on_scroll(first, last)
+
+    # --- Tarjetas ---
+
+    def _visible_rows(self):
+        top = self.canvas.canvasy(0)
+        bottom = top + max(self.canvas.winfo_height(), 1)
+        first = max(int(top // self.row_height) - self.overscan, 0)
+        last = min(int(bottom // self.row_height) + self.overscan, len(self.posts) - 1)
+        return range(first, last + 1)
+
+    def _render(self):
+        """Reciclar las tarjetas que salen de la vista para las filas que entran"""
+        rows = self._visible_rows()
+        for row in [row for row in self._live if row not in rows]:
+            card = self._live.pop(row)
+            self.canvas.itemconfigure(card['window'], state='hidden')
+            self._free.append(card)
+        for row in rows:
+            if row in self._live:
+                continue
+            card = self._free.pop() if self._free else self._create_card()
+            self._bind_card(card, self.posts[row])
+            self.canvas.coords(card['window'], self.PADX, row * self.row_height + 10)
+            self.canvas.itemconfigure(card['window'], state='normal', width=self._card_width())
+            self._live[row] = card
+
+    def _create_card(self):
+        """Tarjeta vacía con la misma estructura que ``UIComponents.create_post_card``"""
+        frame = tk.Frame(self.canvas, bg=self.CARD_BG, relief='flat', bd=2)
+        header = tk.Frame(frame, bg=self.CARD_BG)
+        header.pack(fill='x', padx=15, pady=10)
+        author = tk.Label(header, font=('Segoe UI', 12, 'bold'), bg=self.CARD_BG, fg='#4ecdc4')
+        author.pack(side='left')
+        date = tk.Label(header, font=('Segoe UI', 10), bg=self.CARD_BG, fg='#a0a0a0')
+        date.pack(side='right')
+
+        footer = tk.Frame(frame, bg=self.CARD_BG)
+        footer.pack(side='bottom', fill='x', padx=15, pady=(0, 10))
+        likes = tk.Label(footer, font=('Segoe UI', 10), bg=self.CARD_BG, fg='#ff6b6b')
+        likes.pack(side='left', padx=(0, 15))
+        comments = tk.Label(footer, font=('Segoe UI', 10), bg=self.CARD_BG, fg='#45b7d1')
+        comments.pack(side='left', padx=(0, 15))
+        # El contenido se empaqueta el último: si no cabe, se recorta él y no el pie
+        content = tk.Label(frame, font=('Segoe UI', 11), bg=self.CARD_BG, fg='white',
+                           wraplength=600, justify='left', anchor='nw')
+        content.pack(fill='both', expand=True, padx=15, pady=(0, 10))
+
+        window = self.canvas.create_window(self.PADX, 0, window=frame, anchor='nw',
+                                           width=self._card_width(), height=self.row_height - 20)
+        for widget in (frame, header, author, date, content, footer, likes, comments):
+            for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+                widget.bind(sequence, self._on_wheel)
+        self._created += 1
+        return {'window': window, 'author': author, 'date': date, 'content': content,
+                'footer': footer, 'likes': likes, 'comments': comments, 'buttons': []}
+
+    def _bind_card(self, card, post):
+        fecha = post[4].strftime("%d/%m/%Y %H:%M") if hasattr(post[4], 'strftime') else str(post[4])
+        contenido = post[3] or ''
+        if len(contenido) > self.CONTENT_MAX_CHARS:
+            contenido = contenido[:self.CONTENT_MAX_CHARS].rstrip() + '…'
+        card['author'].config(text=f"👤 {post[1]}")
+        card['date'].config(text=f"📅 {fecha}")
+        card['content'].config(text=contenido)
+        card['likes'].config(text=f"❤️ {post[7]}")
+        card['comments'].config(text=f"💬 {post[8]}")
+        actions = self.actions(post) if self.actions is not None else []
+        # Los botones se crean la primera vez que se usa la tarjeta y después sólo se reconfiguran
+        while len(card['buttons']) < len(actions):
+            button = tk.Button(card['footer'], fg='white', font=('Segoe UI', 10),
+                               border=0, cursor='hand2', padx=15, pady=5)
+            button.pack(side='left', padx=5)
+            card['buttons'].append(button)
+        for button, (text, color, command, enabled) in zip(card['buttons'], actions):
+            button.config(text=text, bg=color, command=command,
+                          state='normal' if enabled else 'disabled')
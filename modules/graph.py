@@ -0,0 +1,173 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+
+class FriendGraph:
+    """Índice en memoria de las amistades aceptadas.
+
+    Las listas de adyacencia se guardan en formato CSR: ``offsets[u]`` y
+    ``offsets[u + 1]`` delimitan en ``neighbors`` los amigos del usuario
+    ``u`` (ordenados, para buscar con bisección). Como el CSR no admite
+    inserciones baratas, las amistades aceptadas después de la carga se
+    anotan en ``_added`` y se compactan en un CSR nuevo al superar
+    ``compact_threshold`` aristas añadidas. ``loaded_at`` (``time.monotonic``)
+    permite al dueño recargarlo para ver los cambios de otros procesos.
+
+    También recuerda el estado de las solicitudes no aceptadas
+    (``pendiente``/``rechazada``) para responder ``status`` sin consultar.
+    """
+
+    def __init__(self, compact_threshold=1024):
+        self.compact_threshold = compact_threshold
+        self.offsets = array('i', [0])
+        self.neighbors = array('i')
+        self._added = {}    # usuario -> set(amigos) aún fuera del CSR
+        self._pending_changes = 0
+        self._requests = {}  # (menor, mayor) -> estado de amistades no aceptadas
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.loaded_at = None
+
+    # --- Construcción ---
+
+    def load(self, rows):
+        """Construir el índice desde filas ``(usuario1_id, usuario2_id, estado)``"""
+        sources, targets = array('i'), array('i')
+        requests = {}
+        accepted = set()
+        for user1, user2, estado in rows:
+            if estado == 'aceptada':
+                pair = self._pair(user1, user2)
+                if pair in accepted:  # la misma amistad registrada en ambos sentidos
+                    continue
+                accepted.add(pair)
+                sources.append(user1)
+                targets.append(user2)
+            else:
+                requests[self._pair(user1, user2)] = estado
+        offsets, neighbors = self._build_csr(sources, targets)
+        with self._lock:
+            self.offsets, self.neighbors = offsets, neighbors
+            self._added = {}
+            self._pending_changes = 0
+            self._requests = requests
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+
+    @staticmethod
+    def _build_csr(sources, targets):
+        """CSR no dirigido a partir de pares de aristas"""
+        size = max(max(sources, default=0), max(targets, default=0)) + 2
+        degree = array('i', bytes(4 * size))
+        for user1, user2 in zip(sources, targets):
+            degree[user1 + 1] += 1
+            degree[user2 + 1] += 1
+        offsets = array('i', degree)
+        for user in range(1, size):
+            offsets[user] += offsets[user - 1]
+        neighbors = array('i', bytes(4 * offsets[-1]))
+        cursor = array('i', offsets)
+        for user1, user2 in zip(sources, targets):
+            neighbors[cursor[user1]] = user2
+            cursor[user1] += 1
+            neighbors[cursor[user2]] = user1
+            cursor[user2] += 1
+        for user in range(size - 1):
+            start, end = offsets[user], offsets[user + 1]
+            if end - start > 1:
+                neighbors[start:end] = array('i', sorted(neighbors[start:end]))
+        return offsets, neighbors
+
+    @staticmethod
+    def _pair(user1, user2):
+        return (user1, user2) if user1 < user2 else (user2, user1)
+
+    # --- Consultas ---
+
+    def _row(self, user_id):
+        if 0 <= user_id < len(self.offsets) - 1:
+            return self.offsets[user_id], self.offsets[user_id + 1]
+        return 0, 0
+
+    def _in_csr(self, user_id, friend_id):
+        start, end = self._row(user_id)
+        index = bisect_left(self.neighbors, friend_id, start, end)
+        return index < end and self.neighbors[index] == friend_id
+
+    def are_friends(self, user_id, other_id):
+        with self._lock:
+            if other_id in self._added.get(user_id, ()):
+                return True
+            return self._in_csr(user_id, other_id)
+
+    def friends(self, user_id):
+        """Ids de los amigos de ``user_id`` (lista ordenada)"""
+        with self._lock:
+            start, end = self._row(user_id)
+            result = self.neighbors[start:end].tolist()
+            added = self._added.get(user_id)
+            if added:
+                result = sorted(set(result) | added)
+            return result
+
+    def friend_count(self, user_id):
+        with self._lock:
+            start, end = self._row(user_id)
+            return end - start + len(self._added.get(user_id, ()))
+
+    def status(self, user_id, other_id):
+        """Estado de la relación en cualquier sentido (``None`` si no hay)"""
+        if self.are_friends(user_id, other_id):
+            return 'aceptada'
+        with self._lock:
+            return self._requests.get(self._pair(user_id, other_id))
+
+    # --- Cambios ---
+
+    def set_request_status(self, user_id, other_id, estado):
+        """Anotar una solicitud ``pendiente`` o ``rechazada``"""
+        with self._lock:
+            self._requests[self._pair(user_id, other_id)] = estado
+
+    def add_friendship(self, user_id, other_id):
+        with self._lock:
+            self._requests.pop(self._pair(user_id, other_id), None)
+            for user, friend in ((user_id, other_id), (other_id, user_id)):
+                if not self._in_csr(user, friend):
+                    self._added.setdefault(user, set()).add(friend)
+            self._note_change_locked()
+
+    def _note_change_locked(self):
+        self._pending_changes += 1
+        if self._pending_changes >= self.compact_threshold:
+            self._compact_locked()
+
+    def _compact_locked(self):
+        """Integrar los cambios anotados en un CSR nuevo"""
+        sources, targets = array('i'), array('i')
+        for user in range(len(self.offsets) - 1):
+            for index in range(self.offsets[user], self.offsets[user + 1]):
+                friend = self.neighbors[index]
+                if user < friend:
+                    sources.append(user)
+                    targets.append(friend)
+        for user, friends in self._added.items():
+            for friend in friends:
+                if user < friend:
+                    sources.append(user)
+                    targets.append(friend)
+        self.offsets, self.neighbors = self._build_csr(sources, targets)
+        self._added = {}
+        self._pending_changes = 0
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'users': len(self.offsets) - 1,
+                'edges': len(self.neighbors) // 2,
+                'pending_changes': self._pending_changes,
+                'requests': len(self._requests),
+                'loaded': self.loaded,
+            }
@@ -0,0 +1,68 @@
+import threading
+import time
+from datetime import datetime
+
+
+class HealthProbe:
+    """Comprobación periódica del estado de la base de datos.
+
+    Ejecuta los conteos de diagnóstico en un hilo propio cada ``interval``
+    segundos y guarda el último resultado con su marca de tiempo. ``status``
+    devuelve siempre ese resultado en caché: consultar el estado nunca lanza
+    consultas desde el hilo de quien pregunta.
+    """
+
+    def __init__(self, db, interval=60):
+        self.db = db
+        self.interval = interval
+        self._status = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Arrancar las comprobaciones en segundo plano (la primera, inmediata)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='niilo-health', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def request_refresh(self):
+        """Adelantar la próxima comprobación sin esperar a su resultado"""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:  # p. ej. el pool se cerró durante la comprobación
+                print(f"Error en el diagnóstico de la base de datos: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def run_once(self):
+        """Ejecutar las comprobaciones ahora y devolver el nuevo estado"""
+        started = time.perf_counter()
+        results, columns = self.db.execute_query('health.counts')
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        status = {
+            'ok': bool(results),
+            'checked_at': datetime.now(),
+            'latency_ms': elapsed_ms,
+            'counts': dict(zip(columns, results[0])) if results else {},
+            'pool': self.db.get_pool_stats(),
+        }
+        with self._lock:
+            self._status = status
+        return status
+
+    def status(self):
+        """Último estado conocido (``None`` si aún no se ha comprobado)"""
+        with self._lock:
+            return dict(self._status) if self._status is not None else None
@@ -0,0 +1,98 @@
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageOps, ImageTk
+
+
+def decode_image(path, size):
+    """Abrir ``path`` y devolverlo como imagen cuadrada de ``size`` px.
+
+    Con JPEG se usa el modo borrador: el decodificador reduce la imagen por
+    un factor 1/2-1/8 mientras la lee, sin descomprimir el original entero.
+    Las versiones ya generadas con ese tamaño no se remuestrean.
+    """
+    with Image.open(path) as image:
+        if image.format == 'JPEG':
+            image.draft('RGB', (size, size))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    if image.size != (size, size):
+        image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    return image
+
+
+class ImageLoader:
+    """Carga de imágenes fuera del hilo de Tk con caché LRU de imágenes decodificadas.
+
+    La lectura, decodificación y escalado se hacen en los hilos de
+    ``executor``; en el hilo de Tk sólo se construye el ``ImageTk.PhotoImage``.
+    La caché guarda las imágenes ya decodificadas por ``(ruta, tamaño,
+    mtime)``, así que un fichero sustituido no se sirve desde caché, y
+    descarta las usadas hace más tiempo al superar ``max_bytes``.
+    """
+
+    def __init__(self, executor, max_bytes=32 * 1024 * 1024):
+        self.executor = executor
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()  # (ruta, tamaño, mtime) -> PIL.Image
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def _image_bytes(image):
+        return image.width * image.height * len(image.getbands())
+
+    def _key(self, path, size):
+        return (os.path.abspath(path), size, os.path.getmtime(path))
+
+    def _get(self, key):
+        with self._lock:
+            image = self._images.get(key)
+            if image is None:
+                self._stats['misses'] += 1
+                return None
+            self._images.move_to_end(key)
+            self._stats['hits'] += 1
+            return image
+
+    def _put(self, key, image):
+        with self._lock:
+            if key in self._images:
+                return
+            self._images[key] = image
+            self._bytes += self._image_bytes(image)
+            while self._bytes > self.max_bytes and len(self._images) > 1:
+                _, oldest = self._images.popitem(last=False)
+                self._bytes -= self._image_bytes(oldest)
+                self._stats['evictions'] += 1
+
+    def _decode(self, key, path, size):
+        image = decode_image(path, size)
+        self._put(key, image)
+        return image
+
+    def load(self, path, size, callback, errback=None, widget=None):
+        """Entregar a ``callback`` (en el hilo de Tk) un ``PhotoImage`` de ``path`` a ``size`` px.
+
+        Si la imagen está en caché, ``callback`` se llama inmediatamente.
+        """
+        try:
+            key = self._key(path, size)
+        except OSError as e:
+            if errback is not None:
+                errback(e)
+            return
+        image = self._get(key)
+        if image is not None:
+            callback(ImageTk.PhotoImage(image))
+            return
+        self.executor.submit(self._decode, key, path, size,
+                             callback=lambda decoded: callback(ImageTk.PhotoImage(decoded)),
+                             errback=errback, widget=widget)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, images=len(self._images), bytes=self._bytes, max_bytes=self.max_bytes)
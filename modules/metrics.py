@@ -0,0 +1,174 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+DEFAULT_SLOW_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs', 'slow_queries.log')
+
+
+def statement_name_for(query):
+    """Nombre estable para SQL sin nombre explícito (hash del texto normalizado)"""
+    normalized = re.sub(r'\s+', ' ', query).strip()
+    return 'sql:' + hashlib.sha1(normalized.encode()).hexdigest()[:10]
+
+
+def redact_params(params):
+    """Describir los parámetros sin revelar sus valores"""
+    if not params:
+        return '()'
+    return '(' + ', '.join(type(p).__name__ for p in params) + ')'
+
+
+class StatementStats:
+    """Acumulados y muestras recientes de latencia de una sentencia"""
+
+    def __init__(self, sample_size):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.prepares = 0  # sentencia preparada por primera vez en una conexión
+        self.reuses = 0    # ejecución con la sentencia ya preparada
+        self.samples = deque(maxlen=sample_size)
+
+    @property
+    def reuse_rate(self):
+        total = self.prepares + self.reuses
+        return self.reuses / total if total else 0.0
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class QueryMetrics:
+    """Histogramas de latencia por sentencia y registro de consultas lentas.
+
+    Las percentiles se calculan sobre las últimas ``sample_size`` ejecuciones
+    de cada sentencia. Las que superan ``slow_threshold_ms`` se escriben en un
+    log rotativo con los parámetros anonimizados.
+    """
+
+    def __init__(self, slow_threshold_ms=200, slow_log_path=DEFAULT_SLOW_LOG,
+                 sample_size=1024, max_bytes=1_000_000, backup_count=5):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.slow_log_path = slow_log_path
+        self.sample_size = sample_size
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._slow_logger = None
+        self._logger_lock = threading.Lock()
+
+    def _get_slow_logger(self):
+        if self._slow_logger is not None:
+            return self._slow_logger
+        # Dos hilos con su primera consulta lenta a la vez no deben añadir dos handlers
+        with self._logger_lock:
+            if self._slow_logger is not None:
+                return self._slow_logger
+            logger = logging.getLogger(f'niilo.slow_queries.{id(self)}')
+            logger.propagate = False
+            logger.setLevel(logging.WARNING)
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.slow_log_path)), exist_ok=True)
+                handler = RotatingFileHandler(self.slow_log_path, maxBytes=self.max_bytes,
+                                              backupCount=self.backup_count, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+                logger.addHandler(handler)
+            except OSError as e:
+                print(f"No se pudo abrir el log de consultas lentas: {e}")
+                logger.addHandler(logging.NullHandler())
+            self._slow_logger = logger
+        return self._slow_logger
+
+    def _get_stats_locked(self, name):
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = StatementStats(self.sample_size)
+        return stats
+
+    def record_prepare(self, name, reused):
+        """Anotar si ``name`` reutilizó una sentencia ya preparada en la conexión"""
+        with self._lock:
+            stats = self._get_stats_locked(name)
+            if reused:
+                stats.reuses += 1
+            else:
+                stats.prepares += 1
+
+    def prepare_stats(self):
+        """Totales de preparación/reutilización de todas las sentencias"""
+        with self._lock:
+            prepares = sum(stats.prepares for stats in self._stats.values())
+            reuses = sum(stats.reuses for stats in self._stats.values())
+        total = prepares + reuses
+        return {'prepares': prepares, 'reuses': reuses,
+                'reuse_rate': reuses / total if total else 0.0}
+
+    def record(self, name, elapsed_ms, rows=0, error=False, query=None, params=None):
+        """Registrar una ejecución de la sentencia ``name``"""
+        with self._lock:
+            stats = self._get_stats_locked(name)
+            stats.calls += 1
+            stats.rows += rows or 0
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.samples.append(elapsed_ms)
+            if error:
+                stats.errors += 1
+        if self.slow_threshold_ms is not None and elapsed_ms >= self.slow_threshold_ms:
+            sql = re.sub(r'\s+', ' ', query).strip() if query else ''
+            self._get_slow_logger().warning(
+                f"{name} {elapsed_ms:.1f}ms rows={rows or 0} error={error} "
+                f"params={redact_params(params)} sql={sql}")
+
+    def snapshot(self):
+        """Lista de métricas por sentencia, ordenada por tiempo total"""
+        with self._lock:
+            items = list(self._stats.items())
+            rows = []
+            for name, stats in items:
+                rows.append({
+                    'statement': name,
+                    'calls': stats.calls,
+                    'errors': stats.errors,
+                    'rows': stats.rows,
+                    'total_ms': stats.total_ms,
+                    'avg_ms': stats.total_ms / stats.calls if stats.calls else 0.0,
+                    'p50_ms': stats.percentile(50),
+                    'p95_ms': stats.percentile(95),
+                    'p99_ms': stats.percentile(99),
+                    'max_ms': stats.max_ms,
+                    'prepares': stats.prepares,
+                    'reuses': stats.reuses,
+                    'reuse_rate': stats.reuse_rate,
+                })
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+        return rows
+
+    def report(self, top_n=10):
+        """Informe de texto con las ``top_n`` sentencias más costosas"""
+        rows = self.snapshot()[:top_n]
+        lines = [f"{'SENTENCIA':<32} {'LLAMADAS':>8} {'TOTAL ms':>10} {'p50':>8} {'p95':>8} "
+                 f"{'p99':>8} {'FILAS':>8} {'ERRORES':>7} {'REUSO':>6}"]
+        for row in rows:
+            lines.append(f"{row['statement'][:32]:<32} {row['calls']:>8} {row['total_ms']:>10.1f} "
+                         f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+                         f"{row['rows']:>8} {row['errors']:>7} {row['reuse_rate']:>6.0%}")
+        prepared = self.prepare_stats()
+        lines.append(f"Sentencias preparadas reutilizadas: {prepared['reuses']}/"
+                     f"{prepared['reuses'] + prepared['prepares']} ({prepared['reuse_rate']:.0%})")
+        return '\n'.join(lines)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
@@ -0,0 +1,163 @@
+from datetime import datetime
+
+# Tabla donde se registran las versiones aplicadas
+MIGRATIONS_TABLE = 'schema_migraciones'
+MIGRATIONS_TABLE_COLUMNS = """
+    version INT NOT NULL PRIMARY KEY,
+    descripcion VARCHAR(200) NOT NULL,
+    fecha_aplicacion DATETIME NOT NULL
+"""
+
+# Migraciones versionadas, en orden. Cada índice es (nombre, tabla, columnas)
+# y sirve a las consultas indicadas en el comentario.
+MIGRATIONS = [
+    {
+        'version': 1,
+        'description': "Índices de likes y comentarios",
+        'indexes': [
+            # Contadores y reconciliación: likes/comentarios de una publicación
+            ('ix_me_gusta_publicacion', 'me_gusta', 'publicacion_id'),
+            # Likes dados por un usuario (estadísticas, interacciones)
+            ('ix_me_gusta_usuario_publicacion', 'me_gusta', 'usuario_id, publicacion_id'),
+            # get_post_comments y conteo de comentarios activos
+            ('ix_comentarios_publicacion_activo', 'comentarios', 'publicacion_id, activo'),
+            # Comentarios hechos por un usuario (get_user_interactions)
+            ('ix_comentarios_usuario_fecha', 'comentarios', 'usuario_id, fecha_comentario'),
+        ],
+    },
+    {
+        'version': 2,
+        'description': "Índices de mensajes y amistades",
+        'indexes': [
+            # get_user_messages filtra por emisor o receptor
+            ('ix_mensajes_emisor', 'mensajes', 'emisor_id, fecha_envio'),
+            ('ix_mensajes_receptor', 'mensajes', 'receptor_id, fecha_envio'),
+            # Estado de una amistad concreta y amigos aceptados
+            ('ix_amistades_usuarios_estado', 'amistades', 'usuario1_id, usuario2_id, estado'),
+            # Solicitudes recibidas (get_friend_requests) y amigos por usuario2_id
+            ('ix_amistades_usuario2_estado', 'amistades', 'usuario2_id, estado'),
+        ],
+    },
+    {
+        'version': 3,
+        'description': "Índices del feed de publicaciones",
+        'indexes': [
+            # get_posts_page: paginación por (fecha_publicacion, id) de las activas
+            ('ix_publicaciones_activa_fecha', 'publicaciones', 'activa, fecha_publicacion DESC, id DESC'),
+            # get_user_posts / get_user_post_history
+            ('ix_publicaciones_usuario_fecha', 'publicaciones', 'usuario_id, fecha_publicacion DESC'),
+        ],
+    },
+    {
+        'version': 4,
+        'description': "Índices de conversaciones y sincronización de mensajes",
+        'indexes': [
+            # get_conversation_messages: mensajes de un emisor a un receptor por id
+            ('ix_mensajes_conversacion', 'mensajes', 'emisor_id, receptor_id, id'),
+            # get_messages_since: mensajes enviados o recibidos con id posterior
+            ('ix_mensajes_emisor_id', 'mensajes', 'emisor_id, id'),
+            ('ix_mensajes_receptor_id', 'mensajes', 'receptor_id, id'),
+        ],
+    },
+]
+
+
+class MigrationRunner:
+    """Aplica las migraciones de ``MIGRATIONS`` y registra las versiones aplicadas.
+
+    Cada migración se ejecuta junto con su registro en ``schema_migraciones``
+    en una sola transacción de ``DatabaseManager``. El DDL lo genera el motor
+    (``create_index_sql``), así que sirve igual para SQL Server y SQLite.
+    """
+
+    def __init__(self, db, migrations=MIGRATIONS):
+        self.db = db
+        self.migrations = sorted(migrations, key=lambda migration: migration['version'])
+
+    def _ensure_table(self):
+        return self.db.execute_update(
+            self.db.backend.create_table_sql(MIGRATIONS_TABLE, MIGRATIONS_TABLE_COLUMNS),
+            name='migrations.create_table')
+
+    def applied_versions(self):
+        """Versiones ya aplicadas (``None`` si no se pudo consultar)"""
+        if not self._ensure_table():
+            return None
+        results, _ = self.db.execute_query('migrations.applied')
+        return None if results is None else {row[0] for row in results}
+
+    def status(self):
+        """Lista de ``(version, descripcion, aplicada)``"""
+        applied = self.applied_versions()
+        if applied is None:
+            return None
+        return [(m['version'], m['description'], m['version'] in applied) for m in self.migrations]
+
+    def _up_ops(self, migration):
+        backend = self.db.backend
+        ops = [(backend.create_index_sql(name, table, columns), None)
+               for name, table, columns in migration['indexes']]
+        ops.append(('migrations.record', (migration['version'], migration['description'], datetime.now())))
+        return ops
+
+    def _down_ops(self, migration):
+        backend = self.db.backend
+        ops = [(backend.drop_index_sql(name, table), None)
+               for name, table, _ in reversed(migration['indexes'])]
+        ops.append(('migrations.forget', (migration['version'],)))
+        return ops
+
+    def migrate(self, target=None):
+        """Aplicar las migraciones pendientes hasta ``target`` (todas por defecto).
+
+        Devuelve la lista de versiones aplicadas o ``None`` si alguna falla
+        (las anteriores quedan aplicadas).
+        """
+        applied = self.applied_versions()
+        if applied is None:
+            return None
+        done = []
+        for migration in self.migrations:
+            version = migration['version']
+            if version in applied or (target is not None and version > target):
+                continue
+            if not self._apply(migration):
+                return None
+            done.append(version)
+        return done
+
+    def apply(self, version):
+        """Aplicar sólo la migración ``version`` (True si queda aplicada)"""
+        migration = next((m for m in self.migrations if m['version'] == version), None)
+        if migration is None:
+            print(f"✗ No existe la migración {version}")
+            return False
+        applied = self.applied_versions()
+        if applied is None:
+            return False
+        return version in applied or self._apply(migration)
+
+    def _apply(self, migration):
+        version = migration['version']
+        if not self.db.execute_transaction(self._up_ops(migration), name=f'migrations.up.{version}'):
+            print(f"✗ Error aplicando la migración {version}")
+            return False
+        print(f"✓ Migración {version} aplicada: {migration['description']}")
+        return True
+
+    def rollback(self, target=0):
+        """Revertir las migraciones aplicadas posteriores a ``target``"""
+        applied = self.applied_versions()
+        if applied is None:
+            return None
+        done = []
+        for migration in reversed(self.migrations):
+            version = migration['version']
+            if version not in applied or version <= target:
+                continue
+            if not self.db.execute_transaction(self._down_ops(migration), name=f'migrations.down.{version}'):
+                print(f"✗ Error revirtiendo la migración {version}")
+                return None
+            print(f"✓ Migración {version} revertida")
+            done.append(version)
+        return done
@@ -0,0 +1,81 @@
+import threading
+
+
+class NotificationPoller:
+    """Sondeo unificado de novedades (mensajes, solicitudes, likes y comentarios).
+
+    Cada ``poll`` hace una sola consulta (``get_notifications_since``) con las
+    marcas del sondeo anterior y acumula los contadores que muestra la
+    interfaz hasta que el usuario abre la ventana correspondiente
+    (``mark_seen``). El intervalo se adapta a la actividad: vuelve a
+    ``min_interval`` cuando hay novedades y se multiplica por ``backoff``
+    (hasta ``max_interval``) en cada sondeo sin ellas.
+
+    ``poll`` se ejecuta en un hilo de trabajo; el resto, en el hilo de Tk.
+    """
+
+    def __init__(self, db, min_interval=5, max_interval=120, backoff=2):
+        self.db = db
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self.user_id = None
+        self._watermarks = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def start_session(self, user_id):
+        """Empezar a sondear para ``user_id``.
+
+        El primer sondeo sólo fija las marcas, salvo para las solicitudes:
+        las pendientes de antes de iniciar sesión también cuentan.
+        """
+        with self._lock:
+            self.user_id = user_id
+            self.interval = self.min_interval
+            self._watermarks = {kind: None for kind in self.db.NOTIFICATION_KINDS}
+            self._watermarks['solicitudes'] = 0
+            self._counts = dict.fromkeys(self.db.NOTIFICATION_KINDS, 0)
+
+    def stop_session(self):
+        with self._lock:
+            self.user_id = None
+
+    def poll(self):
+        """Consultar novedades y devolver los contadores pendientes (``None`` sin sesión)"""
+        with self._lock:
+            user_id, watermarks = self.user_id, dict(self._watermarks)
+        if user_id is None:
+            return None
+        result = self.db.get_notifications_since(user_id, watermarks)
+        with self._lock:
+            if self.user_id != user_id:  # la sesión cambió durante la consulta
+                return None
+            if result is None:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+                return dict(self._counts)
+            activity = False
+            for kind, (new, watermark) in result.items():
+                self._watermarks[kind] = watermark
+                if new:
+                    self._counts[kind] += new
+                    activity = True
+            if activity:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+            return dict(self._counts)
+
+    def mark_seen(self, *kinds):
+        """Poner a cero los contadores de ``kinds`` y devolver los pendientes"""
+        with self._lock:
+            for kind in kinds:
+                if kind in self._counts:
+                    self._counts[kind] = 0
+            return dict(self._counts)
+
+    def poke(self):
+        """Adelantar el ritmo de sondeo (p. ej. tras una acción del usuario)"""
+        with self._lock:
+            self.interval = self.min_interval
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import re
+import time
+
+from PIL import Image, ImageOps, features
+
+from .images import decode_image
+
+PHOTOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'profile_photos')
+
+# Lados (px) de las versiones cuadradas que se generan al subir una foto
+PHOTO_SIZES = (32, 64, 120, 240)
+
+# WebP si Pillow lo soporta (bastante más ligero); si no, PNG
+PHOTO_FORMAT, PHOTO_EXTENSION = ('WEBP', '.webp') if features.check('webp') else ('PNG', '.png')
+
+# Las fotos se guardan por contenido: ``ab/cd/<sha256>_<tamaño>.webp`` bajo
+# ``PHOTOS_DIR``. Dos niveles de 256 subdirectorios mantienen pequeño cada
+# directorio, y ``usuarios.imagen_perfil`` guarda esa clave relativa.
+_DERIVATIVE = re.compile(r'^(?P<stem>.+)_(?P<size>\d+)(?P<ext>\.webp|\.png)$')
+_PHOTO_KEY = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}_\d+(\.webp|\.png)$')
+
+
+def content_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 del fichero, leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_photo_key(stored):
+    """``True`` si ``stored`` es una clave del almacén (y no una ruta antigua)"""
+    return bool(stored) and _PHOTO_KEY.match(stored) is not None
+
+
+def resolve_photo_path(stored, photos_dir=PHOTOS_DIR):
+    """Ruta en disco de una clave del almacén; las rutas antiguas se devuelven tal cual"""
+    if not is_photo_key(stored):
+        return stored
+    return os.path.join(photos_dir, *stored.split('/'))
+
+
+def _store_stem(path, photos_dir):
+    """Ruta sin ``_<tamaño>.<ext>`` si ``path`` es una versión del almacén; si no, ``None``.
+
+    Sólo cuentan las claves ``ab/cd/<sha256>`` con un tamaño de
+    ``PHOTO_SIZES``: las fotos antiguas (``profile_<uid>_<fecha>_<hora>.png``)
+    también acaban en ``_<número>.png`` y no son versiones de nada.
+    """
+    match = _DERIVATIVE.match(path)
+    if match is None or int(match['size']) not in PHOTO_SIZES:
+        return None
+    try:
+        relative = os.path.relpath(path, photos_dir).replace(os.sep, '/')
+    except ValueError:  # otra unidad en Windows: no está en el almacén
+        return None
+    return match['stem'] if is_photo_key(relative) else None
+
+
+def ingest_photo(source_path, photos_dir=PHOTOS_DIR):
+    """Guardar ``source_path`` en el almacén y devolver su clave.
+
+    La clave sale del SHA-256 del fichero subido: si ya estaba (el mismo
+    fichero subido otra vez, por el mismo u otro usuario) no se decodifica
+    ni se escribe nada; sólo se renueva la fecha de sus ficheros para que
+    ``collect_garbage`` no los borre antes de guardar la clave. Si no, se
+    decodifica una vez con ``decode_image`` (enderezada según su EXIF, en
+    RGB o RGBA y recortada al centro en un cuadrado) y se escriben las
+    versiones de ``PHOTO_SIZES``, cada una reducida a partir de la anterior. La clave es la de la versión más
+    grande, que se escribe la última: si existe, existen todas.
+    """
+    digest = content_hash(source_path)
+    stem = f"{digest[:2]}/{digest[2:4]}/{digest}"
+    key = f"{stem}_{max(PHOTO_SIZES)}{PHOTO_EXTENSION}"
+    if os.path.exists(resolve_photo_path(key, photos_dir)):
+        for size in PHOTO_SIZES:
+            try:
+                os.utime(resolve_photo_path(f"{stem}_{size}{PHOTO_EXTENSION}", photos_dir))
+            except OSError:
+                pass  # borrada entre tanto: la siguiente subida la regenerará
+        return key
+
+    os.makedirs(os.path.join(photos_dir, digest[:2], digest[2:4]), exist_ok=True)
+    image = decode_image(source_path, max(PHOTO_SIZES))
+    versions = []
+    for size in sorted(PHOTO_SIZES, reverse=True):
+        if image.size != (size, size):
+            image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        versions.append((size, image))
+    for size, image in reversed(versions):
+        path = resolve_photo_path(f"{stem}_{size}{PHOTO_EXTENSION}", photos_dir)
+        # Escribir aparte y renombrar: nunca queda a medias un fichero con su nombre final
+        partial = path + '.tmp'
+        if PHOTO_FORMAT == 'WEBP':
+            image.save(partial, PHOTO_FORMAT, quality=85, method=4)
+        else:
+            image.save(partial, PHOTO_FORMAT, optimize=True)
+        os.replace(partial, path)
+    return key
+
+
+def photo_path_for_size(stored, size, photos_dir=PHOTOS_DIR):
+    """Versión ya generada más adecuada para mostrar ``stored`` a ``size`` px.
+
+    La más pequeña que no sea menor que ``size`` (o la mayor disponible).
+    ``None`` si ``stored`` no es una versión generada (fotos subidas antes
+    de generarlas) o si el fichero no existe.
+    """
+    path = resolve_photo_path(stored, photos_dir)
+    if not path:
+        return None
+    match = _DERIVATIVE.match(path)
+    if match is None or int(match['size']) not in PHOTO_SIZES:
+        return None
+    bucket = next((bucket for bucket in sorted(PHOTO_SIZES) if bucket >= size), max(PHOTO_SIZES))
+    path = f"{match['stem']}_{bucket}{match['ext']}"
+    return path if os.path.exists(path) else None
+
+
+def collect_garbage(referenced, photos_dir=PHOTOS_DIR, grace_seconds=3600, dry_run=False):
+    """Borrar de ``photos_dir`` los ficheros que ninguna foto de ``referenced`` usa.
+
+    ``referenced`` son los valores de ``usuarios.imagen_perfil``: de cada
+    clave del almacén se conservan todas sus versiones; cualquier otra ruta
+    se compara exactamente. Los ficheros modificados hace
+    menos de ``grace_seconds`` se respetan (una subida aún sin guardar en la
+    base de datos). Devuelve ``(ficheros, bytes)`` borrados.
+    """
+    photos_dir = os.path.abspath(photos_dir)
+    keep = set()
+    for stored in referenced:
+        path = resolve_photo_path(stored, photos_dir)
+        if not path:
+            continue
+        path = os.path.abspath(path)
+        keep.add(_store_stem(path, photos_dir) or path)
+
+    cutoff = time.time() - grace_seconds
+    removed, freed = 0, 0
+    for directory, _, files in os.walk(photos_dir, topdown=False):
+        for name in files:
+            path = os.path.join(directory, name)
+            if (_store_stem(path, photos_dir) or path) in keep:
+                continue
+            stat = os.stat(path)
+            if stat.st_mtime > cutoff:
+                continue
+            if not dry_run:
+                os.remove(path)
+            removed += 1
+            freed += stat.st_size
+        # Subdirectorios de reparto que se hayan quedado vacíos
+        if not dry_run and directory != photos_dir and not os.listdir(directory):
+            os.rmdir(directory)
+    return removed, freed
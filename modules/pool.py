@@ -0,0 +1,227 @@
+import threading
+import time
+
+
+class PoolTimeoutError(Exception):
+    """No se pudo obtener una conexión del pool a tiempo"""
+
+
+class PooledConnection:
+    """Conexión física gestionada por el pool"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+        # Cursores preparados por nombre de sentencia (ver DatabaseManager)
+        self.statements = {}
+
+
+class ConnectionPool:
+    """Pool de conexiones acotado y seguro entre hilos.
+
+    Mantiene entre ``min_size`` y ``max_size`` conexiones abiertas, descarta
+    las que llevan más de ``idle_timeout`` segundos sin usarse y comprueba la
+    salud de una conexión al entregarla si no se ha verificado en los últimos
+    ``check_interval`` segundos.
+    """
+
+    def __init__(self, factory, min_size=1, max_size=5, idle_timeout=300,
+                 check_interval=30, checkout_timeout=10, health_query="SELECT 1"):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Tamaños de pool inválidos")
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self.checkout_timeout = checkout_timeout
+        self.health_query = health_query
+
+        self._idle = []  # pila LIFO: la conexión más reciente se reutiliza antes
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            'hits': 0,         # entregas servidas con una conexión ociosa
+            'misses': 0,       # entregas que tuvieron que abrir una conexión
+            'waits': 0,        # entregas que esperaron por una conexión libre
+            'timeouts': 0,
+            'creates': 0,
+            'create_errors': 0,
+            'evictions': 0,    # conexiones cerradas por inactividad
+            'health_failures': 0,
+            'discards': 0,     # conexiones devueltas como rotas
+        }
+
+    # --- Ciclo de vida de conexiones ---
+
+    def _create(self):
+        try:
+            raw = self.factory()
+        except Exception:
+            with self._cond:
+                self._stats['create_errors'] += 1
+            raise
+        if raw is None:
+            with self._cond:
+                self._stats['create_errors'] += 1
+            return None
+        with self._cond:
+            self._stats['creates'] += 1
+        return PooledConnection(raw)
+
+    @staticmethod
+    def _close_raw(pooled):
+        try:
+            pooled.raw.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, pooled):
+        try:
+            cursor = pooled.raw.cursor()
+            cursor.execute(self.health_query)
+            cursor.fetchall()
+            cursor.close()
+            pooled.last_checked = time.monotonic()
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle_locked(self, now):
+        """Cerrar conexiones ociosas caducadas respetando ``min_size``"""
+        expired = []
+        keep = []
+        total = len(self._idle) + self._in_use
+        # Las más antiguas están al principio de la pila
+        for pooled in self._idle:
+            if (now - pooled.last_used > self.idle_timeout
+                    and total - len(expired) > self.min_size):
+                expired.append(pooled)
+            else:
+                keep.append(pooled)
+        self._idle = keep
+        self._stats['evictions'] += len(expired)
+        return expired
+
+    # --- API pública ---
+
+    def acquire(self, timeout=None):
+        """Obtener una conexión; devuelve ``PooledConnection`` o ``None``"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+
+        while True:
+            to_close = []
+            pooled = None
+            must_create = False
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("El pool de conexiones está cerrado")
+                to_close = self._evict_idle_locked(time.monotonic())
+                if self._idle:
+                    pooled = self._idle.pop()
+                    self._in_use += 1
+                elif self._in_use < self.max_size:
+                    self._in_use += 1
+                    must_create = True
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Sin conexiones libres tras {timeout}s (máximo {self.max_size})")
+                    if not waited:
+                        self._stats['waits'] += 1
+                        waited = True
+                    self._cond.wait(remaining)
+                    continue
+
+            for old in to_close:
+                self._close_raw(old)
+
+            if must_create:
+                try:
+                    pooled = self._create()
+                except Exception:
+                    self._release_slot()
+                    raise
+                if pooled is None:
+                    self._release_slot()
+                    return None
+                with self._cond:
+                    self._stats['misses'] += 1
+                return pooled
+
+            # Verificar salud si hace tiempo que no se comprueba
+            if time.monotonic() - pooled.last_checked > self.check_interval:
+                if not self._is_healthy(pooled):
+                    self._close_raw(pooled)
+                    with self._cond:
+                        self._stats['health_failures'] += 1
+                    self._release_slot()
+                    continue
+            with self._cond:
+                self._stats['hits'] += 1
+            return pooled
+
+    def release(self, pooled, broken=False):
+        """Devolver una conexión al pool (o descartarla si está rota)"""
+        if pooled is None:
+            return
+        if broken or self._closed:
+            self._close_raw(pooled)
+            with self._cond:
+                if broken:
+                    self._stats['discards'] += 1
+            self._release_slot()
+            return
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    def _release_slot(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def prefill(self):
+        """Abrir conexiones hasta alcanzar ``min_size``"""
+        while True:
+            with self._cond:
+                if self._closed or len(self._idle) + self._in_use >= self.min_size:
+                    return
+                self._in_use += 1
+            try:
+                pooled = self._create()
+            except Exception:
+                self._release_slot()
+                return
+            if pooled is None:
+                self._release_slot()
+                return
+            self.release(pooled)
+
+    def close(self):
+        """Cerrar todas las conexiones ociosas y rechazar nuevas entregas"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for pooled in idle:
+            self._close_raw(pooled)
+
+    def get_stats(self):
+        """Estadísticas del pool"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._in_use
+            stats['size'] = len(self._idle) + self._in_use
+            stats['max_size'] = self.max_size
+        return stats
@@ -0,0 +1,50 @@
+import re
+import unicodedata
+from collections import Counter
+
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 40  # coincide con busqueda_terminos.termino
+
+# Palabras vacías del español (ya normalizadas): no aportan nada al buscar
+STOPWORDS = frozenset("""
+    al algo algun alguna algunas alguno algunos ante antes aqui como con contra cual cuando
+    de del desde donde durante el ella ellas ellos en entre era es esa esas ese eso esos esta
+    estas este esto estos fue ha hay la las le les lo los mas me mi mis muy nada ni no nos o
+    os otra otro para pero poco por porque que se sea ser si sin sobre su sus tambien te ti
+    tu tus un una unas uno unos ya yo
+""".split())
+
+_TERM = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text):
+    """Minúsculas sin acentos ni diéresis (``Canción`` -> ``cancion``, ``Ñandú`` -> ``nandu``)"""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    """Términos normalizados de ``text``, en orden y sin palabras vacías"""
+    if not text:
+        return []
+    return [term[:MAX_TERM_LENGTH] for term in _TERM.findall(normalize(text))
+            if len(term) >= MIN_TERM_LENGTH and term not in STOPWORDS]
+
+
+def term_frequencies(text):
+    """``{termino: apariciones}`` para indexar un documento"""
+    return Counter(tokenize(text))
+
+
+def query_terms(query, max_terms):
+    """Dividir una búsqueda en ``(exactos, prefijo)``.
+
+    El último término se busca por prefijo (quien escribe aún puede estar
+    tecleándolo); los anteriores, exactos y sin repetir. ``prefijo`` es
+    ``None`` si la búsqueda no tiene términos útiles.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return [], None
+    exact, prefix = terms[:-1], terms[-1]
+    return exact[:max_terms], prefix
@@ -0,0 +1,570 @@
+"""Registro central de sentencias SQL con nombre.
+
+Cada entrada es el texto SQL, o un diccionario ``{dialecto: sql}`` cuando
+SQL Server y SQLite necesitan sintaxis distinta. Todas las sentencias usan
+parámetros ``?``: ningún valor se interpola en el texto, de modo que cada
+nombre corresponde a un único plan en el servidor y ``DatabaseManager``
+puede preparar la sentencia una vez por conexión y reutilizarla.
+"""
+
+USERS_BY_IDS_BATCH = 50
+SEARCH_MAX_TERMS = 8  # términos exactos por búsqueda (los que falten se pasan como NULL)
+
+_POST_FEED_SELECT = """
+    p.id,
+    CONCAT(u.nombre, ' ', u.apellido) as autor,
+    u.id as usuario_id,
+    p.contenido,
+    p.fecha_publicacion,
+    p.tipo,
+    p.url_media,
+    COALESCE(pc.total_likes, 0) as total_likes,
+    COALESCE(pc.total_comentarios, 0) as total_comentarios
+"""
+
+_POST_FEED_COLUMNS = _POST_FEED_SELECT + """
+FROM publicaciones p
+JOIN usuarios u ON p.usuario_id = u.id
+LEFT JOIN publicacion_contadores pc ON pc.publicacion_id = p.id
+WHERE p.activa = 1 AND u.activo = 1
+"""
+
+# Timeline materializado: rango de (usuario_id, fecha_publicacion, publicacion_id)
+_TIMELINE_COLUMNS = _POST_FEED_SELECT + """
+FROM timeline_entradas t
+JOIN publicaciones p ON p.id = t.publicacion_id
+JOIN usuarios u ON p.usuario_id = u.id
+LEFT JOIN publicacion_contadores pc ON pc.publicacion_id = p.id
+WHERE t.usuario_id = ? AND p.activa = 1 AND u.activo = 1
+"""
+_TIMELINE_AFTER = " AND (t.fecha_publicacion < ? OR (t.fecha_publicacion = ? AND t.publicacion_id < ?))"
+_TIMELINE_ORDER = " ORDER BY t.fecha_publicacion DESC, t.publicacion_id DESC"
+
+# Autor del timeline y sus amigos aceptados (tres parámetros: el usuario)
+_TIMELINE_AUTHORS = """
+    SELECT ? AS usuario_id
+    UNION SELECT usuario2_id FROM amistades WHERE usuario1_id = ? AND estado = 'aceptada'
+    UNION SELECT usuario1_id FROM amistades WHERE usuario2_id = ? AND estado = 'aceptada'
+"""
+
+_FEED_AFTER = " AND (p.fecha_publicacion < ? OR (p.fecha_publicacion = ? AND p.id < ?))"
+_FEED_ORDER = " ORDER BY p.fecha_publicacion DESC, p.id DESC"
+
+
+# Mensajes de un usuario como (id, contenido, fecha_envio, leido, contacto,
+# tipo, contacto_id): enviados y recibidos por separado para usar los
+# índices de emisor y receptor (nunca ``emisor_id = ? OR receptor_id = ?``)
+_MESSAGES_SENT = """
+    SELECT m.id, m.contenido, m.fecha_envio, m.leido,
+           CONCAT(u.nombre, ' ', u.apellido) AS contacto, 'Enviado' AS tipo, u.id AS contacto_id
+    FROM mensajes m
+    JOIN usuarios u ON u.id = m.receptor_id
+    WHERE m.emisor_id = ? AND m.receptor_id <> m.emisor_id
+"""
+_MESSAGES_RECEIVED = """
+    SELECT m.id, m.contenido, m.fecha_envio, m.leido,
+           CONCAT(u.nombre, ' ', u.apellido) AS contacto, 'Recibido' AS tipo, u.id AS contacto_id
+    FROM mensajes m
+    JOIN usuarios u ON u.id = m.emisor_id
+    WHERE m.receptor_id = ? AND m.receptor_id <> m.emisor_id
+"""
+
+# Mensajes entre el usuario y un contacto, del más reciente al más antiguo
+_CONVERSATION_COLUMNS = """
+    m.id, m.contenido, m.fecha_envio, m.leido,
+    CASE WHEN m.emisor_id = ? THEN 'Enviado' ELSE 'Recibido' END AS tipo
+FROM mensajes m
+WHERE ((m.emisor_id = ? AND m.receptor_id = ?) OR (m.emisor_id = ? AND m.receptor_id = ?))
+"""
+
+
+def _paged(body):
+    """SELECT paginado cuyo límite es siempre el último parámetro"""
+    return {
+        'sqlserver': f"SELECT {body} OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY",
+        'sqlite': f"SELECT {body} LIMIT ?",
+    }
+
+
+def _search_query():
+    """Búsqueda en el índice invertido: ``SEARCH_MAX_TERMS`` términos exactos,
+    un patrón de prefijo (LIKE en SQL Server, GLOB en SQLite) y el límite.
+
+    Los documentos desactivados se descartan en la propia consulta; el
+    orden es por términos coincidentes, apariciones y fecha.
+    """
+    placeholders = ', '.join('?' * SEARCH_MAX_TERMS)
+    body = """
+        b.tipo, b.documento_id,
+        MAX(COALESCE(p.contenido, c.contenido, CONCAT(u.nombre, ' ', u.apellido))) AS texto,
+        MAX(CONCAT(a.nombre, ' ', a.apellido)) AS autor,
+        MAX(COALESCE(p.fecha_publicacion, c.fecha_comentario, u.fecha_registro)) AS fecha,
+        COUNT(*) AS coincidencias, SUM(b.frecuencia) AS frecuencia
+    FROM busqueda_terminos b
+    LEFT JOIN publicaciones p ON b.tipo = 'publicacion' AND p.id = b.documento_id AND p.activa = 1
+    LEFT JOIN comentarios c ON b.tipo = 'comentario' AND c.id = b.documento_id AND c.activo = 1
+    LEFT JOIN usuarios u ON b.tipo = 'usuario' AND u.id = b.documento_id AND u.activo = 1
+    LEFT JOIN usuarios a ON a.id = COALESCE(p.usuario_id, c.usuario_id, u.id)
+    WHERE (b.termino IN ({placeholders}) OR b.termino {prefix_match} ?)
+      AND (p.id IS NOT NULL OR c.id IS NOT NULL OR u.id IS NOT NULL)
+    GROUP BY b.tipo, b.documento_id
+    ORDER BY coincidencias DESC, frecuencia DESC, fecha DESC
+    """
+    return {
+        'sqlserver': _paged(body.format(placeholders=placeholders, prefix_match='LIKE'))['sqlserver'],
+        'sqlite': _paged(body.format(placeholders=placeholders, prefix_match='GLOB'))['sqlite'],
+    }
+
+
+STATEMENTS = {
+    # --- Usuarios ---
+    'get_user_by_credentials':
+        "SELECT id, nombre, apellido FROM usuarios WHERE email = ? AND password_hash = ? AND activo = 1",
+    'get_user_basic': """
+        SELECT id, nombre, apellido, email, ubicacion, biografia, fecha_registro
+        FROM usuarios WHERE id = ?
+    """,
+    'create_user': """
+        INSERT INTO usuarios (nombre, apellido, email, password_hash, fecha_nacimiento, ubicacion, biografia)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    'get_user_profile': """
+        SELECT
+            u.id,
+            CONCAT(u.nombre, ' ', u.apellido) AS nombre_completo,
+            u.email,
+            u.ubicacion,
+            u.biografia,
+            u.fecha_registro,
+            COALESCE(s.total_publicaciones, 0) AS total_publicaciones,
+            COALESCE(s.total_amigos, 0) AS total_amigos,
+            COALESCE(s.total_likes_recibidos, 0) AS total_likes_recibidos,
+            COALESCE(s.total_likes_dados, 0) AS total_likes_dados,
+            COALESCE(s.total_comentarios_recibidos, 0) AS total_comentarios_recibidos,
+            COALESCE(s.total_comentarios_dados, 0) AS total_comentarios_dados,
+            COALESCE(s.total_mensajes_enviados, 0) AS total_mensajes_enviados,
+            COALESCE(s.total_mensajes_recibidos, 0) AS total_mensajes_recibidos
+        FROM usuarios u
+        -- Estadísticas mantenidas por las operaciones de escritura
+        LEFT JOIN usuario_estadisticas s ON s.usuario_id = u.id
+        WHERE u.id = ? AND u.activo = 1
+    """,
+    # Lote de tamaño fijo: los huecos se rellenan con NULL para reutilizar el plan
+    'get_users_by_ids': f"""
+        SELECT id, CONCAT(nombre, ' ', apellido), email, ubicacion
+        FROM usuarios
+        WHERE activo = 1 AND id IN ({', '.join(['?'] * USERS_BY_IDS_BATCH)})
+    """,
+    'get_all_users': "SELECT id, CONCAT(nombre, ' ', apellido), email FROM usuarios WHERE activo = 1",
+    'user_directory.after':
+        "SELECT id, CONCAT(nombre, ' ', apellido), email FROM usuarios WHERE id > ? AND activo = 1 ORDER BY id",
+    'get_user_by_email': "SELECT id, CONCAT(nombre, ' ', apellido), email FROM usuarios WHERE email = ? AND activo = 1",
+    'update_user_photo': "UPDATE usuarios SET imagen_perfil = ? WHERE id = ?",
+    'get_user_photo': "SELECT imagen_perfil FROM usuarios WHERE id = ?",
+    'get_all_user_photos': "SELECT id, imagen_perfil FROM usuarios WHERE imagen_perfil IS NOT NULL",
+    'update_user_email': "UPDATE usuarios SET email = ? WHERE id = ?",
+
+    # --- Publicaciones ---
+    # Devuelve el id de la publicación para las operaciones siguientes de la transacción
+    'create_post': {
+        'sqlserver': "INSERT INTO publicaciones (usuario_id, contenido, tipo, url_media) "
+                     "OUTPUT INSERTED.id VALUES (?, ?, ?, ?)",
+        'sqlite': "INSERT INTO publicaciones (usuario_id, contenido, tipo, url_media) "
+                  "VALUES (?, ?, ?, ?) RETURNING id",
+    },
+    'get_user_posts': """
+        SELECT p.id, p.contenido, p.fecha_publicacion, p.tipo,
+               COALESCE(pc.total_likes, 0) as likes,
+               COALESCE(pc.total_comentarios, 0) as comentarios
+        FROM publicaciones p
+        LEFT JOIN publicacion_contadores pc ON pc.publicacion_id = p.id
+        WHERE p.usuario_id = ? AND p.activa = 1
+        ORDER BY p.fecha_publicacion DESC
+    """,
+    'get_user_post_history': """
+        SELECT contenido, fecha_publicacion, activa
+        FROM publicaciones
+        WHERE usuario_id = ?
+        ORDER BY fecha_publicacion DESC
+    """,
+    'get_all_posts.count': "SELECT COUNT(*) FROM publicaciones WHERE activa = 1",
+    'get_all_posts': "SELECT " + _POST_FEED_COLUMNS + " ORDER BY p.fecha_publicacion DESC",
+    'get_posts_page.first': _paged(_POST_FEED_COLUMNS + _FEED_ORDER),
+    'get_posts_page.after': _paged(_POST_FEED_COLUMNS + _FEED_AFTER + _FEED_ORDER),
+
+    'timeline.page.first': _paged(_TIMELINE_COLUMNS + _TIMELINE_ORDER),
+    'timeline.page.after': _paged(_TIMELINE_COLUMNS + _TIMELINE_AFTER + _TIMELINE_ORDER),
+    # Publicaciones de un autor muy conectado (se mezclan al leer, sin fan-out)
+    'timeline.author_page.first': _paged(_POST_FEED_COLUMNS + " AND p.usuario_id = ?" + _FEED_ORDER),
+    'timeline.author_page.after': _paged(_POST_FEED_COLUMNS + " AND p.usuario_id = ?" + _FEED_AFTER + _FEED_ORDER),
+    # Fan-out en escritura: la publicación recién creada se copia al timeline
+    # del autor y de sus amigos
+    'timeline.fanout': f"""
+        INSERT INTO timeline_entradas (usuario_id, publicacion_id, fecha_publicacion)
+        SELECT destino.usuario_id, p.id, p.fecha_publicacion
+        FROM publicaciones p
+        CROSS JOIN ({_TIMELINE_AUTHORS}) destino
+        WHERE p.id = ?
+    """,
+    'timeline.fanout_self': """
+        INSERT INTO timeline_entradas (usuario_id, publicacion_id, fecha_publicacion)
+        SELECT p.usuario_id, p.id, p.fecha_publicacion
+        FROM publicaciones p
+        WHERE p.id = ?
+    """,
+    'timeline.clear_all': "DELETE FROM timeline_entradas",
+    'timeline.rebuild_all': """
+        INSERT INTO timeline_entradas (usuario_id, publicacion_id, fecha_publicacion)
+        SELECT lector, id, fecha_publicacion FROM (
+            SELECT v.lector, p.id, p.fecha_publicacion,
+                   ROW_NUMBER() OVER (PARTITION BY v.lector
+                                      ORDER BY p.fecha_publicacion DESC, p.id DESC) AS rn
+            FROM (SELECT id AS lector, id AS autor FROM usuarios
+                  UNION SELECT usuario1_id, usuario2_id FROM amistades WHERE estado = 'aceptada'
+                  UNION SELECT usuario2_id, usuario1_id FROM amistades WHERE estado = 'aceptada') v
+            JOIN publicaciones p ON p.usuario_id = v.autor
+            WHERE p.activa = 1
+        ) ranked
+        WHERE rn <= ?
+    """,
+    'timeline.clear_user': "DELETE FROM timeline_entradas WHERE usuario_id = ?",
+    'timeline.rebuild_user': f"""
+        INSERT INTO timeline_entradas (usuario_id, publicacion_id, fecha_publicacion)
+        SELECT ?, id, fecha_publicacion FROM (
+            SELECT p.id, p.fecha_publicacion,
+                   ROW_NUMBER() OVER (ORDER BY p.fecha_publicacion DESC, p.id DESC) AS rn
+            FROM publicaciones p
+            WHERE p.activa = 1 AND p.usuario_id IN ({_TIMELINE_AUTHORS})
+        ) ranked
+        WHERE rn <= ?
+    """,
+    # Recortar cada timeline a sus ``?`` entradas más recientes
+    'timeline.trim': {
+        'sqlserver': """
+            WITH ranked AS (
+                SELECT ROW_NUMBER() OVER (PARTITION BY usuario_id
+                                          ORDER BY fecha_publicacion DESC, publicacion_id DESC) AS rn
+                FROM timeline_entradas
+            )
+            DELETE FROM ranked WHERE rn > ?
+        """,
+        'sqlite': """
+            DELETE FROM timeline_entradas WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, ROW_NUMBER() OVER (PARTITION BY usuario_id
+                                                     ORDER BY fecha_publicacion DESC, publicacion_id DESC) AS rn
+                    FROM timeline_entradas
+                ) WHERE rn > ?
+            )
+        """,
+    },
+
+    # --- Likes y comentarios ---
+    'like_post': "INSERT INTO me_gusta (usuario_id, publicacion_id) VALUES (?, ?)",
+    # Devuelve el id del comentario (para indexarlo en la misma transacción)
+    'comment_post': {
+        'sqlserver': "INSERT INTO comentarios (usuario_id, publicacion_id, contenido) "
+                     "OUTPUT INSERTED.id VALUES (?, ?, ?)",
+        'sqlite': "INSERT INTO comentarios (usuario_id, publicacion_id, contenido) VALUES (?, ?, ?) RETURNING id",
+    },
+    'deactivate_comment': "UPDATE comentarios SET activo = 0 WHERE id = ? AND activo = 1",
+    'get_post_comments': """
+        SELECT c.id, c.contenido, c.fecha_comentario, CONCAT(u.nombre, ' ', u.apellido)
+        FROM comentarios c
+        JOIN usuarios u ON c.usuario_id = u.id
+        WHERE c.publicacion_id = ? AND c.activo = 1
+        ORDER BY c.fecha_comentario ASC
+    """,
+    'get_user_interactions': """
+        SELECT 'Like' as tipo, mg.fecha_like as fecha,
+               CONCAT('Te gustó una publicación de ', u.nombre, ' ', u.apellido) as detalle
+        FROM me_gusta mg
+        JOIN publicaciones p ON mg.publicacion_id = p.id
+        JOIN usuarios u ON p.usuario_id = u.id
+        WHERE mg.usuario_id = ? AND mg.fecha_like >= ?
+        UNION ALL
+        SELECT 'Comentario' as tipo, c.fecha_comentario as fecha,
+               CONCAT('Comentaste en una publicación de ', u.nombre, ' ', u.apellido) as detalle
+        FROM comentarios c
+        JOIN publicaciones p ON c.publicacion_id = p.id
+        JOIN usuarios u ON p.usuario_id = u.id
+        WHERE c.usuario_id = ? AND c.fecha_comentario >= ?
+        ORDER BY fecha DESC
+    """,
+
+    # --- Mensajes ---
+    'send_message': "INSERT INTO mensajes (emisor_id, receptor_id, contenido) VALUES (?, ?, ?)",
+    'get_user_messages':
+        "SELECT * FROM (" + _MESSAGES_SENT + " UNION ALL " + _MESSAGES_RECEIVED + ") mensajes_usuario"
+        " ORDER BY fecha_envio DESC, id DESC",
+    # Sincronización incremental: mensajes con id posterior al último visto
+    'get_messages_since': _paged(
+        "* FROM (" + _MESSAGES_SENT + " AND m.id > ? UNION ALL "
+        + _MESSAGES_RECEIVED + " AND m.id > ?) nuevos ORDER BY id"),
+    'get_conversation_messages.first': _paged(_CONVERSATION_COLUMNS + " ORDER BY m.id DESC"),
+    'get_conversation_messages.before': _paged(_CONVERSATION_COLUMNS + " AND m.id < ? ORDER BY m.id DESC"),
+
+    # --- Conversaciones: una fila por usuario y contacto con su último mensaje ---
+    'get_conversations': """
+        SELECT c.contacto_id, CONCAT(u.nombre, ' ', u.apellido) AS contacto,
+               m.id, m.contenido, m.fecha_envio,
+               CASE WHEN m.emisor_id = c.usuario_id THEN 'Enviado' ELSE 'Recibido' END AS tipo,
+               c.total_mensajes
+        FROM conversaciones c
+        JOIN mensajes m ON m.id = c.ultimo_mensaje_id
+        JOIN usuarios u ON u.id = c.contacto_id
+        WHERE c.usuario_id = ?
+        ORDER BY c.ultimo_mensaje_id DESC
+    """,
+    'conversations.ensure': """
+        INSERT INTO conversaciones (usuario_id, contacto_id, ultimo_mensaje_id, total_mensajes)
+        SELECT ?, ?, 0, 0
+        WHERE NOT EXISTS (SELECT 1 FROM conversaciones WHERE usuario_id = ? AND contacto_id = ?)
+    """,
+    # El mensaje recién insertado es el de mayor id entre emisor y receptor
+    'conversations.touch': """
+        UPDATE conversaciones
+        SET ultimo_mensaje_id = (SELECT MAX(id) FROM mensajes WHERE emisor_id = ? AND receptor_id = ?),
+            total_mensajes = total_mensajes + 1
+        WHERE usuario_id = ? AND contacto_id = ?
+    """,
+    'conversations.clear': "DELETE FROM conversaciones",
+    'conversations.rebuild': """
+        INSERT INTO conversaciones (usuario_id, contacto_id, ultimo_mensaje_id, total_mensajes)
+        SELECT usuario_id, contacto_id, MAX(id), COUNT(*)
+        FROM (SELECT emisor_id AS usuario_id, receptor_id AS contacto_id, id FROM mensajes
+              UNION ALL
+              SELECT receptor_id, emisor_id, id FROM mensajes) m
+        WHERE usuario_id <> contacto_id
+        GROUP BY usuario_id, contacto_id
+    """,
+
+    # --- Amistades ---
+    'get_friendship_status': """
+        SELECT estado FROM amistades
+        WHERE (usuario1_id = ? AND usuario2_id = ?)
+           OR (usuario1_id = ? AND usuario2_id = ?)
+    """,
+    # Sólo si no hay ya una relación entre ambos, en ningún sentido
+    'send_friend_request': """
+        INSERT INTO amistades (usuario1_id, usuario2_id, estado)
+        SELECT ?, ?, 'pendiente'
+        WHERE NOT EXISTS (
+            SELECT 1 FROM amistades
+            WHERE (usuario1_id = ? AND usuario2_id = ?)
+               OR (usuario1_id = ? AND usuario2_id = ?)
+        )
+    """,
+    'get_friend_requests': """
+        SELECT u.id, CONCAT(u.nombre, ' ', u.apellido), u.email, a.fecha_solicitud
+        FROM amistades a
+        JOIN usuarios u ON a.usuario1_id = u.id
+        WHERE a.usuario2_id = ? AND a.estado = 'pendiente'
+    """,
+    'accept_friend_request':
+        "UPDATE amistades SET estado = 'aceptada' WHERE usuario1_id = ? AND usuario2_id = ? AND estado = 'pendiente'",
+    'reject_friend_request':
+        "UPDATE amistades SET estado = 'rechazada' WHERE usuario1_id = ? AND usuario2_id = ? AND estado = 'pendiente'",
+    'get_user_friends': """
+        SELECT u.id, CONCAT(u.nombre, ' ', u.apellido), u.email
+        FROM usuarios u
+        JOIN amistades a ON (u.id = a.usuario1_id OR u.id = a.usuario2_id)
+        WHERE (a.usuario1_id = ? OR a.usuario2_id = ?)
+        AND a.estado = 'aceptada' AND u.id != ? AND u.activo = 1
+    """,
+
+    'friend_graph.edges': "SELECT usuario1_id, usuario2_id, estado FROM amistades",
+
+    # --- Contadores por publicación ---
+    'post_counters.ensure': """
+        INSERT INTO publicacion_contadores (publicacion_id, total_likes, total_comentarios)
+        SELECT ?, 0, 0
+        WHERE NOT EXISTS (SELECT 1 FROM publicacion_contadores WHERE publicacion_id = ?)
+    """,
+    'post_counters.add_like':
+        "UPDATE publicacion_contadores SET total_likes = total_likes + 1 WHERE publicacion_id = ?",
+    'post_counters.add_comment':
+        "UPDATE publicacion_contadores SET total_comentarios = total_comentarios + 1 WHERE publicacion_id = ?",
+    'post_counters.remove_comment': """
+        UPDATE publicacion_contadores SET total_comentarios = total_comentarios - 1
+        WHERE publicacion_id = (SELECT publicacion_id FROM comentarios WHERE id = ? AND activo = 1)
+    """,
+    # Conteos agrupados en una pasada por tabla (no una subconsulta por publicación)
+    'post_counters.drift': """
+        SELECT COUNT(*)
+        FROM publicaciones p
+        LEFT JOIN publicacion_contadores pc ON pc.publicacion_id = p.id
+        LEFT JOIN (SELECT publicacion_id, COUNT(*) AS n FROM me_gusta GROUP BY publicacion_id) mg
+               ON mg.publicacion_id = p.id
+        LEFT JOIN (SELECT publicacion_id, COUNT(*) AS n FROM comentarios WHERE activo = 1 GROUP BY publicacion_id) c
+               ON c.publicacion_id = p.id
+        WHERE COALESCE(pc.total_likes, 0) <> COALESCE(mg.n, 0)
+           OR COALESCE(pc.total_comentarios, 0) <> COALESCE(c.n, 0)
+    """,
+    'post_counters.clear': "DELETE FROM publicacion_contadores",
+    'post_counters.rebuild': """
+        INSERT INTO publicacion_contadores (publicacion_id, total_likes, total_comentarios)
+        SELECT p.id, COALESCE(mg.n, 0), COALESCE(c.n, 0)
+        FROM publicaciones p
+        LEFT JOIN (SELECT publicacion_id, COUNT(*) AS n FROM me_gusta GROUP BY publicacion_id) mg
+               ON mg.publicacion_id = p.id
+        LEFT JOIN (SELECT publicacion_id, COUNT(*) AS n FROM comentarios WHERE activo = 1 GROUP BY publicacion_id) c
+               ON c.publicacion_id = p.id
+    """,
+
+    # --- Migraciones (MigrationRunner) ---
+    'migrations.applied': "SELECT version FROM schema_migraciones",
+    'migrations.record': "INSERT INTO schema_migraciones (version, descripcion, fecha_aplicacion) VALUES (?, ?, ?)",
+    'migrations.forget': "DELETE FROM schema_migraciones WHERE version = ?",
+
+    # --- Búsqueda: índice invertido busqueda_terminos ---
+    'search.query': _search_query(),
+    # Altas incrementales de usuarios (publicaciones y comentarios usan search.index con su id)
+    'search.index.user': """
+        INSERT INTO busqueda_terminos (termino, tipo, documento_id, frecuencia)
+        SELECT ?, 'usuario', id, ? FROM usuarios WHERE email = ?
+    """,
+    'search.index':
+        "INSERT INTO busqueda_terminos (termino, tipo, documento_id, frecuencia) VALUES (?, ?, ?, ?)",
+    'search.documents': """
+        SELECT 'publicacion', id, contenido FROM publicaciones
+        UNION ALL SELECT 'comentario', id, contenido FROM comentarios
+        UNION ALL SELECT 'usuario', id, CONCAT(nombre, ' ', apellido) FROM usuarios
+    """,
+    'search.is_empty': "SELECT CASE WHEN EXISTS (SELECT 1 FROM busqueda_terminos) THEN 0 ELSE 1 END",
+    'search.clear': "DELETE FROM busqueda_terminos",
+
+    # --- Notificaciones (NotificationPoller): un solo viaje al servidor ---
+    # Marcas = mayor id de cada tabla en el sondeo anterior. Cada conteo sólo
+    # recorre las filas nuevas (rango sobre la clave primaria) hasta el id
+    # máximo leído en esta misma sentencia, que pasa a ser la nueva marca.
+    'notifications.since': """
+        SELECT mx.mensajes, mx.solicitudes, mx.likes, mx.comentarios,
+            (SELECT COUNT(*) FROM mensajes m
+             WHERE m.id > ? AND m.id <= mx.mensajes
+               AND m.receptor_id = ? AND m.emisor_id <> m.receptor_id) AS nuevos_mensajes,
+            (SELECT COUNT(*) FROM amistades a
+             WHERE a.id > ? AND a.id <= mx.solicitudes
+               AND a.usuario2_id = ? AND a.estado = 'pendiente') AS nuevas_solicitudes,
+            (SELECT COUNT(*) FROM me_gusta mg JOIN publicaciones p ON p.id = mg.publicacion_id
+             WHERE mg.id > ? AND mg.id <= mx.likes
+               AND p.usuario_id = ? AND mg.usuario_id <> ?) AS nuevos_likes,
+            (SELECT COUNT(*) FROM comentarios c JOIN publicaciones p ON p.id = c.publicacion_id
+             WHERE c.id > ? AND c.id <= mx.comentarios AND c.activo = 1
+               AND p.usuario_id = ? AND c.usuario_id <> ?) AS nuevos_comentarios
+        FROM (SELECT
+            COALESCE((SELECT MAX(id) FROM mensajes), 0) AS mensajes,
+            COALESCE((SELECT MAX(id) FROM amistades), 0) AS solicitudes,
+            COALESCE((SELECT MAX(id) FROM me_gusta), 0) AS likes,
+            COALESCE((SELECT MAX(id) FROM comentarios), 0) AS comentarios) mx
+    """,
+
+    # --- Diagnóstico (HealthProbe): un solo viaje al servidor ---
+    'health.counts': """
+        SELECT
+            (SELECT COUNT(*) FROM usuarios WHERE activo = 1) AS usuarios_activos,
+            (SELECT COUNT(*) FROM publicaciones) AS publicaciones,
+            (SELECT COUNT(*) FROM publicaciones WHERE activa = 1) AS publicaciones_activas,
+            (SELECT COUNT(*) FROM me_gusta) AS likes,
+            (SELECT COUNT(*) FROM comentarios) AS comentarios
+    """,
+}
+
+
+# --- Estadísticas por usuario ---
+
+USER_STATS_COLUMNS = (
+    'total_publicaciones', 'total_amigos',
+    'total_likes_recibidos', 'total_likes_dados',
+    'total_comentarios_recibidos', 'total_comentarios_dados',
+    'total_mensajes_enviados', 'total_mensajes_recibidos',
+)
+
+# Cómo se obtiene el usuario afectado a partir del parámetro de la operación
+USER_SOURCES = {
+    'user': "?",
+    'post_owner': "(SELECT usuario_id FROM publicaciones WHERE id = ?)",
+    # Las dos siguientes sólo devuelven usuario mientras el comentario siga activo
+    'comment_author': "(SELECT usuario_id FROM comentarios WHERE id = ? AND activo = 1)",
+    'comment_post_owner': """(SELECT p.usuario_id FROM comentarios c JOIN publicaciones p ON p.id = c.publicacion_id
+                              WHERE c.id = ? AND c.activo = 1)""",
+}
+
+for _source, _user_sql in USER_SOURCES.items():
+    STATEMENTS[f'user_stats.ensure.{_source}'] = f"""
+        INSERT INTO usuario_estadisticas (usuario_id)
+        SELECT {_user_sql}
+        WHERE {_user_sql} IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM usuario_estadisticas WHERE usuario_id = {_user_sql})
+    """
+    for _column in USER_STATS_COLUMNS:
+        STATEMENTS[f'user_stats.add.{_column}.{_source}'] = (
+            f"UPDATE usuario_estadisticas SET {_column} = {_column} + ? WHERE usuario_id = {_user_sql}")
+
+# Cada estadística sale de una agregación por usuario unida a usuarios
+_USER_STATS_REBUILD = """
+    INSERT INTO usuario_estadisticas (usuario_id, total_publicaciones, total_amigos,
+        total_likes_recibidos, total_likes_dados, total_comentarios_recibidos,
+        total_comentarios_dados, total_mensajes_enviados, total_mensajes_recibidos)
+    SELECT u.id,
+           COALESCE(pub.n, 0), COALESCE(ami.n, 0),
+           COALESCE(lr.n, 0), COALESCE(ld.n, 0),
+           COALESCE(cr.n, 0), COALESCE(cd.n, 0),
+           COALESCE(me.n, 0), COALESCE(mr.n, 0)
+    FROM usuarios u
+    LEFT JOIN (SELECT usuario_id AS uid, COUNT(*) AS n FROM publicaciones WHERE activa = 1
+               GROUP BY usuario_id) pub ON pub.uid = u.id
+    LEFT JOIN (SELECT uid, COUNT(*) AS n FROM (
+                   SELECT usuario1_id AS uid FROM amistades WHERE estado = 'aceptada'
+                   UNION ALL
+                   SELECT usuario2_id AS uid FROM amistades WHERE estado = 'aceptada') amigos
+               GROUP BY uid) ami ON ami.uid = u.id
+    LEFT JOIN (SELECT p.usuario_id AS uid, COUNT(*) AS n FROM me_gusta mg
+               JOIN publicaciones p ON mg.publicacion_id = p.id WHERE p.activa = 1
+               GROUP BY p.usuario_id) lr ON lr.uid = u.id
+    LEFT JOIN (SELECT usuario_id AS uid, COUNT(*) AS n FROM me_gusta
+               GROUP BY usuario_id) ld ON ld.uid = u.id
+    LEFT JOIN (SELECT p.usuario_id AS uid, COUNT(*) AS n FROM comentarios c
+               JOIN publicaciones p ON c.publicacion_id = p.id WHERE c.activo = 1 AND p.activa = 1
+               GROUP BY p.usuario_id) cr ON cr.uid = u.id
+    LEFT JOIN (SELECT usuario_id AS uid, COUNT(*) AS n FROM comentarios WHERE activo = 1
+               GROUP BY usuario_id) cd ON cd.uid = u.id
+    LEFT JOIN (SELECT emisor_id AS uid, COUNT(*) AS n FROM mensajes
+               GROUP BY emisor_id) me ON me.uid = u.id
+    LEFT JOIN (SELECT receptor_id AS uid, COUNT(*) AS n FROM mensajes
+               GROUP BY receptor_id) mr ON mr.uid = u.id
+"""
+
+STATEMENTS.update({
+    'user_stats.clear_all': "DELETE FROM usuario_estadisticas",
+    'user_stats.rebuild_all': _USER_STATS_REBUILD,
+    'user_stats.clear_user': "DELETE FROM usuario_estadisticas WHERE usuario_id = ?",
+    'user_stats.rebuild_user': _USER_STATS_REBUILD + " WHERE u.id = ?",
+})
+
+
+def is_statement(name):
+    """¿``name`` es una sentencia registrada (y no SQL literal)?"""
+    return isinstance(name, str) and name in STATEMENTS
+
+
+def get_statement(name, dialect):
+    """Texto SQL de la sentencia ``name`` para el motor ``dialect``"""
+    try:
+        sql = STATEMENTS[name]
+    except KeyError:
+        raise KeyError(f"Sentencia no registrada: {name}") from None
+    if isinstance(sql, dict):
+        return sql[dialect]
+    return sql
+
+
+def table_page_sql(table, key, dialect, after=True):
+    """``SELECT *`` de una página de ``table`` por ``key`` creciente.
+
+    Parámetros ``(ultima_clave, límite)``, o sólo ``(límite,)`` para la
+    primera página (``after=False``). ``table`` y ``key`` se insertan tal
+    cual: sólo nombres conocidos, nunca texto del usuario.
+    """
+    where = f" WHERE {key} > ?" if after else ""
+    return _paged(f"* FROM {table}{where} ORDER BY {key}")[dialect]
@@ -0,0 +1,122 @@
+import heapq
+import threading
+from collections import Counter
+
+
+class SuggestionEngine:
+    """Sugerencias de amistad ("personas que quizá conozcas").
+
+    Los candidatos son amigos de amigos, recorridos en ``FriendGraph`` con
+    un recorrido de dos saltos acotado: como mucho ``max_first_hop`` amigos
+    (los de menor grado primero, que son los más informativos) y
+    ``max_second_hop`` vecinos de cada uno. Se ordenan por amigos en común
+    más ``location_weight`` si comparten ``ubicacion``.
+
+    Los conteos de amigos en común se guardan por usuario y se ajustan
+    incrementalmente cuando se acepta una amistad. Las ubicaciones sólo se
+    consultan para los candidatos, nunca para toda la tabla de usuarios.
+    """
+
+    def __init__(self, db, max_first_hop=1000, max_second_hop=500, location_weight=2,
+                 max_cached_users=1000):
+        self.db = db
+        self.max_first_hop = max_first_hop
+        self.max_second_hop = max_second_hop
+        self.location_weight = location_weight
+        self.max_cached_users = max_cached_users
+        self._mutuals = {}   # usuario -> Counter(candidato -> amigos en común)
+        self._profiles = {}  # candidato -> (id, nombre_completo, email, ubicacion)
+        self._lock = threading.Lock()
+
+    def _count_mutuals(self, graph, user_id):
+        friends = graph.friends(user_id)
+        if len(friends) > self.max_first_hop:
+            friends = sorted(friends, key=graph.friend_count)[:self.max_first_hop]
+        mutuals = Counter()
+        for friend in friends:
+            neighbors = graph.friends(friend)
+            mutuals.update(neighbors[:self.max_second_hop])
+        return mutuals
+
+    def suggest(self, graph, user_id, limit=10):
+        """Lista de ``(id, nombre_completo, email, amigos_en_comun, ubicacion)``"""
+        with self._lock:
+            mutuals = self._mutuals.get(user_id)
+        if mutuals is None:
+            mutuals = self._count_mutuals(graph, user_id)
+            with self._lock:
+                if len(self._mutuals) >= self.max_cached_users:
+                    self._mutuals.pop(next(iter(self._mutuals)))
+                self._mutuals[user_id] = mutuals
+
+        with self._lock:
+            counts = list(mutuals.items())
+        # Sobra margen para descartar amigos, solicitudes y usuarios inactivos
+        candidates = heapq.nlargest(limit * 5, (
+            (count, candidate) for candidate, count in counts
+            if candidate != user_id and count > 0
+            and graph.status(user_id, candidate) is None))
+        self._load_profiles([user_id] + [candidate for _, candidate in candidates])
+
+        with self._lock:
+            own = self._profiles.get(user_id)
+            own_location = own[3] if own else None
+            ranked = []
+            for count, candidate in candidates:
+                profile = self._profiles.get(candidate)
+                if profile is None:  # inactivo o inexistente
+                    continue
+                shared = bool(own_location) and profile[3] == own_location
+                ranked.append((count + (self.location_weight if shared else 0), count, candidate, profile))
+        ranked.sort(key=lambda item: (-item[0], -item[1], item[2]))
+        return [(profile[0], profile[1], profile[2], count, profile[3])
+                for _, count, _, profile in ranked[:limit]]
+
+    def _load_profiles(self, user_ids):
+        with self._lock:
+            missing = [user_id for user_id in user_ids if user_id not in self._profiles]
+        if not missing:
+            return
+        rows = self.db.get_users_by_ids(missing)
+        with self._lock:
+            if len(self._profiles) > self.max_cached_users * 50:
+                self._profiles.clear()
+            for row in rows:
+                self._profiles[row[0]] = tuple(row)
+
+    # --- Mantenimiento incremental ---
+
+    def on_friendship_added(self, graph, user_id, other_id):
+        """Ajustar los conteos guardados tras aceptar ``user_id``-``other_id``.
+
+        ``graph`` ya contiene la nueva amistad. Sólo cambian los conteos de
+        los dos usuarios y de sus amigos; los que no están en caché se
+        calcularán al pedirlos.
+        """
+        user_friends = graph.friends(user_id)
+        other_friends = graph.friends(other_id)
+        with self._lock:
+            for user, other, other_side in ((user_id, other_id, other_friends),
+                                            (other_id, user_id, user_friends)):
+                mutuals = self._mutuals.get(user)
+                if mutuals is not None:
+                    # El nuevo amigo deja de ser candidato; sus amigos ganan uno en común
+                    mutuals.pop(other, None)
+                    mutuals.update(friend for friend in other_side[:self.max_second_hop] if friend != user)
+                # Cada amigo de ``other`` tiene ahora a ``user`` como amigo en común más
+                for friend in other_side:
+                    friend_mutuals = self._mutuals.get(friend)
+                    if friend_mutuals is not None and friend != user:
+                        friend_mutuals[user] += 1
+
+    def invalidate(self, *user_ids):
+        """Olvidar los conteos y el perfil guardados de ``user_ids`` (p. ej. tras cambiar su email)"""
+        with self._lock:
+            for user_id in user_ids:
+                self._mutuals.pop(user_id, None)
+                self._profiles.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._mutuals.clear()
+            self._profiles.clear()
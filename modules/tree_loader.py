@@ -0,0 +1,186 @@
+import time
+from collections import deque
+
+
+class TreeviewLoader:
+    """Relleno de un ``ttk.Treeview`` por trozos sin bloquear el hilo de Tk.
+
+    Las filas se insertan en tandas de como mucho ``slice_ms`` ms
+    programadas con ``after``, así que la ventana sigue respondiendo
+    mientras se cargan miles de filas. Con ``load_stream`` las filas salen
+    de un ``QueryStream`` o un ``TablePages`` (cualquier objeto con
+    ``fetch_batch``/``close``; ``TablePages`` no retiene conexión entre lotes)
+    y cada lote se lee en ``executor`` sólo cuando la vista se acerca al
+    final (``prefetch``, fracción del scroll).
+
+    Empezar otra carga, llamar a ``cancel`` o destruir el árbol cancela la
+    carga en curso y cierra su stream, devolviendo la conexión al pool.
+    Todo (salvo las lecturas del stream) ocurre en el hilo de Tk.
+    """
+
+    def __init__(self, tree, executor, scrollbar=None, slice_ms=15, prefetch=0.9):
+        self.tree = tree
+        self.executor = executor
+        self.scrollbar = scrollbar
+        self.slice_ms = slice_ms
+        self.prefetch = prefetch
+        self._load = None
+        tree.configure(yscrollcommand=self._on_scroll)
+        tree.bind('<Destroy>', self._on_destroy, add='+')
+
+    # --- Cargas ---
+
+    def load(self, rows, insert=None, on_progress=None, clear=True):
+        """Insertar ``rows`` (ya leídas) por trozos.
+
+        ``insert(row)`` inserta una fila en el árbol (por defecto, al final
+        con ``values=tuple(row)``). Con ``clear=False`` no se vacía el árbol
+        y, si hay una carga de filas en curso, las nuevas se ponen a la cola
+        detrás de las suyas en lugar de cancelarla.
+        """
+        load = self._load
+        if clear or load is None or load['source'] is not None or load['fetching']:
+            load = self._start(on_progress, clear)
+        load['queue'].extend((insert or self._insert_values, row) for row in rows or ())
+        load['complete'] = False
+        self._schedule(load)
+
+    def load_stream(self, open_stream, on_open=None, insert=None, on_progress=None, clear=True):
+        """Insertar las filas del stream que devuelve ``open_stream()``, leyendo lotes según se necesiten.
+
+        ``open_stream`` se ejecuta en ``executor``. ``on_open(stream)`` se
+        llama en el hilo de Tk antes de insertar nada (con ``None`` si no
+        se pudo abrir), p. ej. para configurar columnas.
+        """
+        load = self._start(on_progress, clear)
+        load['insert'] = insert or self._insert_values
+        load['fetching'] = True
+
+        def on_opened(stream):
+            load['fetching'] = False
+            load['source'] = stream
+            if load['cancelled']:
+                self._close_source(load)
+                return
+            if on_open is not None:
+                on_open(stream)
+                if load['cancelled']:  # ``on_open`` pudo empezar otra carga
+                    return
+            if stream is None:
+                load['exhausted'] = True
+                self._finish_chunk(load)
+                return
+            self._fetch(load)
+
+        self.executor.submit(open_stream, callback=on_opened, errback=lambda e: on_opened(None))
+
+    def cancel(self):
+        """Detener la carga en curso (las filas ya insertadas se quedan)"""
+        load, self._load = self._load, None
+        if load is None or load['cancelled']:
+            return
+        load['cancelled'] = True
+        load['queue'].clear()
+        if load['job'] is not None:
+            try:
+                self.tree.after_cancel(load['job'])
+            except Exception:
+                pass  # el árbol ya no existe
+            load['job'] = None
+        # Si hay una lectura en marcha, el stream se cierra cuando termine
+        if not load['fetching']:
+            self._close_source(load)
+
+    def _insert_values(self, row):
+        self.tree.insert('', 'end', values=tuple(row))
+
+    def _start(self, on_progress, clear):
+        self.cancel()
+        if clear:
+            self.tree.delete(*self.tree.get_children())
+        self._load = {
+            'queue': deque(), 'insert': None, 'on_progress': on_progress,
+            'source': None, 'fetching': False, 'exhausted': False,
+            'cancelled': False, 'complete': False, 'job': None, 'inserted': 0,
+        }
+        return self._load
+
+    # --- Inserción por trozos ---
+
+    def _schedule(self, load):
+        if load['job'] is None and not load['cancelled']:
+            load['job'] = self.tree.after(1, self._insert_chunk, load)
+
+    def _insert_chunk(self, load):
+        load['job'] = None
+        if load['cancelled']:
+            return
+        deadline = time.perf_counter() + self.slice_ms / 1000
+        queue = load['queue']
+        while queue:
+            for insert, row in [queue.popleft() for _ in range(min(50, len(queue)))]:
+                insert(row)
+                load['inserted'] += 1
+            if time.perf_counter() >= deadline:
+                break
+        if queue:
+            self._schedule(load)
+            return
+        self._finish_chunk(load)
+
+    def _finish_chunk(self, load):
+        """Tras vaciar la cola: pedir otro lote si la vista ya llega al final o dar la carga por terminada"""
+        if load['source'] is not None and not load['exhausted']:
+            if self._near_end():
+                self._fetch(load)
+        else:
+            load['complete'] = True
+        if load['on_progress'] is not None:
+            load['on_progress'](load['inserted'], load['complete'])
+
+    # --- Lectura del stream ---
+
+    def _near_end(self):
+        return self.tree.yview()[1] >= self.prefetch
+
+    def _fetch(self, load):
+        if load['fetching'] or load['cancelled']:
+            return
+        load['fetching'] = True
+
+        def on_batch(rows):
+            load['fetching'] = False
+            if load['cancelled']:
+                self._close_source(load)
+                return
+            if not rows:
+                load['exhausted'] = True  # fetch_batch ya ha cerrado el stream
+            load['queue'].extend((load['insert'], row) for row in rows or ())
+            if load['queue']:
+                self._schedule(load)
+            else:
+                self._finish_chunk(load)
+
+        def on_error(error):
+            print(f"Error leyendo filas: {error}")
+            on_batch([])
+            self._close_source(load)
+
+        self.executor.submit(load['source'].fetch_batch, callback=on_batch, errback=on_error)
+
+    def _close_source(self, load):
+        source, load['source'] = load['source'], None
+        if source is not None:
+            self.executor.submit(source.close)
+
+    def _on_scroll(self, first, last):
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        load = self._load
+        if (load is not None and load['source'] is not None and not load['exhausted']
+                and not load['queue'] and float(last) >= self.prefetch):
+            self._fetch(load)
+
+    def _on_destroy(self, event):
+        if event.widget is self.tree:
+            self.cancel()
@@ -119,6 +119,15 @@ class UIComponents:
         
         return window
     
+    @staticmethod
+    def create_loading_label(parent, text="⏳ Cargando...", bg='#1a1a2e'):
+        """Crear etiqueta de carga mientras llegan los datos"""
+        loading_label = tk.Label(parent, text=text,
+                                font=('Segoe UI', 12, 'italic'),
+                                bg=bg, fg='#a0a0a0')
+        loading_label.pack(pady=20)
+        return loading_label
+
     @staticmethod
     def create_post_card(parent, post_data):
         """Crear tarjeta de publicación moderna"""
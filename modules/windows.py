@@ -3,8 +3,7 @@ from tkinter import ttk, messagebox, simpledialog, filedialog
 from tkcalendar import DateEntry
 from datetime import datetime
 import os
-import shutil
-from PIL import Image, ImageTk
+from .photos import ingest_photo, photo_path_for_size, resolve_photo_path
 from .ui_components import UIComponents
 
 class Windows:
@@ -35,7 +34,12 @@ class Windows:
             email = email_entry.get()
             password = self.db.hash_password(password_entry.get().strip())
             
-            user = self.db.get_user_by_credentials(email, password)
+            login_button.config(state='disabled')
+            self.app.executor.submit(self.db.get_user_by_credentials, email, password,
+                                     callback=finish_login, widget=login_win)
+        
+        def finish_login(user):
+            login_button.config(state='normal')
             if user:
                 self.app.current_user_id = user[0]
                 self.app.user_label.config(text=f"👤 {user[1]} {user[2]}", fg='#4ecdc4')
@@ -44,6 +48,7 @@ class Windows:
                 self.app.login_btn.pack_forget()
                 self.app.register_btn.pack_forget()
                 self.app.logout_btn.pack(side=tk.LEFT, padx=5)
+                self.app.start_notifications()
                 
                 login_win.destroy()
                 messagebox.showinfo("¡Bienvenido!", f"Sesión iniciada como {user[1]} {user[2]}")
@@ -135,11 +140,18 @@ class Windows:
             
             password_hash = self.db.hash_password(password)
             
-            if self.db.create_user(nombre, apellido, email, password_hash, fecha_nac, ubicacion, biografia):
-                messagebox.showinfo("¡Éxito!", "Cuenta creada exitosamente. Ya puedes iniciar sesión.")
-                reg_win.destroy()
-            else:
-                messagebox.showerror("Error", "No se pudo crear la cuenta. Verifica que el email no esté en uso.")
+            def on_registered(ok):
+                register_button.config(state='normal')
+                if ok:
+                    messagebox.showinfo("¡Éxito!", "Cuenta creada exitosamente. Ya puedes iniciar sesión.")
+                    reg_win.destroy()
+                else:
+                    messagebox.showerror("Error", "No se pudo crear la cuenta. Verifica que el email no esté en uso.")
+            
+            register_button.config(state='disabled')
+            self.app.executor.submit(self.db.create_user, nombre, apellido, email, password_hash,
+                                     fecha_nac, ubicacion, biografia,
+                                     callback=on_registered, widget=reg_win)
         
         # Botón de registro
         register_button = tk.Button(main_frame, text="CREAR CUENTA", command=do_register,
@@ -166,14 +178,27 @@ class Windows:
         main_frame = tk.Frame(profile_win, bg='#1a1a2e')
         main_frame.pack(expand=True, fill='both', padx=30, pady=30)
         
+        loading_label = UIComponents.create_loading_label(main_frame)
+        user_id = self.app.current_user_id
+        
+        def on_profile_loaded(result):
+            loading_label.destroy()
+            profile_data, current_photo_path = result
+            self.build_profile_content(main_frame, profile_data, current_photo_path)
+        
+        # Cargar perfil y foto en segundo plano
+        self.app.executor.submit(self.load_profile_data, user_id,
+                                 callback=on_profile_loaded, widget=main_frame)
+    
+    def load_profile_data(self, user_id):
+        """Obtener perfil y foto del usuario (se ejecuta fuera del hilo de Tk)"""
         # Obtener datos del perfil
-        profile_data = self.db.get_user_profile(self.app.current_user_id)
+        profile_data = self.db.get_user_profile(user_id)
         
         if not profile_data:
             # Fallback a datos básicos si la vista de perfil falla
-            user_basic_data, _ = self.db.execute_query("SELECT id, nombre, apellido, email, ubicacion, biografia, fecha_registro FROM usuarios WHERE id = ?", (self.app.current_user_id,))
-            if user_basic_data:
-                user = user_basic_data[0]
+            user = self.db.get_user_basic(user_id)
+            if user:
                 # Crear un tuple de profile_data con valores por defecto para las estadísticas
                 profile_data = (
                     user[0],                                    # id
@@ -191,30 +216,34 @@ class Windows:
                     0,                                          # total_mensajes_enviados
                     0                                           # total_mensajes_recibidos
                 )
-            else:
-                # Si incluso los datos básicos fallan, mostrar el error
-                error_frame = tk.Frame(main_frame, bg='#2d2d44')
-                error_frame.pack(expand=True, fill='both', padx=20, pady=20)
-                
-                error_label = tk.Label(error_frame, text="❌ No se pudo cargar el perfil", 
-                                      font=('Segoe UI', 16, 'bold'), 
-                                      bg='#2d2d44', fg='#ff6b6b')
-                error_label.pack(pady=20)
-                
-                info_label = tk.Label(error_frame, text="El usuario no existe o hay un problema de conexión.", 
-                                     font=('Segoe UI', 12), 
-                                     bg='#2d2d44', fg='#a0a0a0', justify='left')
-                info_label.pack(pady=10)
-                return
+        
+        # Obtener foto de perfil actual
+        current_photo_path = self.db.get_user_photo(user_id) if profile_data else None
+        return profile_data, current_photo_path
+    
+    def build_profile_content(self, main_frame, profile_data, current_photo_path):
+        """Construir el contenido del perfil una vez cargados los datos"""
+        if not profile_data:
+            # Si incluso los datos básicos fallan, mostrar el error
+            error_frame = tk.Frame(main_frame, bg='#2d2d44')
+            error_frame.pack(expand=True, fill='both', padx=20, pady=20)
+            
+            error_label = tk.Label(error_frame, text="❌ No se pudo cargar el perfil", 
+                                  font=('Segoe UI', 16, 'bold'), 
+                                  bg='#2d2d44', fg='#ff6b6b')
+            error_label.pack(pady=20)
+            
+            info_label = tk.Label(error_frame, text="El usuario no existe o hay un problema de conexión.", 
+                                 font=('Segoe UI', 12), 
+                                 bg='#2d2d44', fg='#a0a0a0', justify='left')
+            info_label.pack(pady=10)
+            return
         
         # Header del perfil con foto simulada
         header_frame = tk.Frame(main_frame, bg='#2d2d44', height=200)
         header_frame.pack(fill='x', pady=(0, 20))
         header_frame.pack_propagate(False)
         
-        # Obtener foto de perfil actual
-        current_photo_path = self.db.get_user_photo(self.app.current_user_id)
-        
         # Frame para la foto de perfil
         photo_frame = tk.Frame(header_frame, bg='#a55eea', width=120, height=120)
         photo_frame.pack(side='left', padx=30, pady=40)
@@ -222,22 +251,31 @@ class Windows:
         
         # Variable para almacenar la imagen
         self.profile_photo = None
+        shown = {'path': None}  # última foto pedida: descarta resultados atrasados
         
-        # Función para cargar y mostrar imagen
+        def show_default_photo():
+            photo_label.config(image="", text="👤", font=('Segoe UI', 48))
+        
+        # Función para cargar y mostrar imagen (se decodifica fuera del hilo de Tk)
         def load_profile_image(image_path=None):
-            try:
-                if image_path and os.path.exists(image_path):
-                    # Cargar y redimensionar imagen
-                    image = Image.open(image_path)
-                    image = image.resize((120, 120), Image.Resampling.LANCZOS)
-                    self.profile_photo = ImageTk.PhotoImage(image)
+            # Versión de 120 px generada al subirla o, para fotos antiguas, el original
+            display_path = photo_path_for_size(image_path, 120) or resolve_photo_path(image_path)
+            shown['path'] = display_path
+            if not display_path or not os.path.exists(display_path):
+                show_default_photo()
+                return
+            
+            def on_loaded(photo):
+                if shown['path'] == display_path:
+                    self.profile_photo = photo
                     photo_label.config(image=self.profile_photo, text="")
-                else:
-                    # Mostrar emoji por defecto
-                    photo_label.config(image="", text="👤", font=('Segoe UI', 48))
-            except Exception as e:
-                print(f"Error cargando imagen: {e}")
-                photo_label.config(image="", text="👤", font=('Segoe UI', 48))
+            
+            def on_error(error):
+                print(f"Error cargando imagen: {error}")
+                if shown['path'] == display_path:
+                    show_default_photo()
+            
+            self.app.images.load(display_path, 120, on_loaded, errback=on_error, widget=photo_label)
         
         # Label para mostrar la foto
         photo_label = tk.Label(photo_frame, text="👤", font=('Segoe UI', 48), 
@@ -264,29 +302,24 @@ class Windows:
             )
             
             if file_path:
-                try:
-                    # Crear directorio para fotos si no existe
-                    photos_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'profile_photos')
-                    os.makedirs(photos_dir, exist_ok=True)
-                    
-                    # Generar nombre único para la imagen
-                    file_ext = os.path.splitext(file_path)[1]
-                    new_filename = f"profile_{self.app.current_user_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{file_ext}"
-                    new_path = os.path.join(photos_dir, new_filename)
-                    
-                    # Copiar imagen al directorio de la aplicación
-                    shutil.copy2(file_path, new_path)
-                    
-                    # Actualizar en la base de datos
-                    if self.db.update_user_photo(self.app.current_user_id, new_path):
-                        # Cargar y mostrar la nueva imagen
-                        load_profile_image(new_path)
+                user_id = self.app.current_user_id
+                
+                # Guardar en el almacén (y generar las versiones por tamaño) fuera del hilo de Tk
+                def upload():
+                    photo_key = ingest_photo(file_path)
+                    return photo_key if self.db.update_user_photo(user_id, photo_key) else None
+                
+                def on_uploaded(photo_key):
+                    if photo_key:
+                        load_profile_image(photo_key)
                         messagebox.showinfo("Éxito", "Foto de perfil actualizada correctamente")
                     else:
                         messagebox.showerror("Error", "No se pudo actualizar la foto en la base de datos")
-                        
-                except Exception as e:
-                    messagebox.showerror("Error", f"No se pudo cargar la imagen:\n{str(e)}")
+                
+                def on_error(error):
+                    messagebox.showerror("Error", f"No se pudo cargar la imagen:\n{str(error)}")
+                
+                self.app.executor.submit(upload, callback=on_uploaded, errback=on_error, widget=photo_label)
         
         # Función para editar email
         def edit_email():
@@ -296,12 +329,16 @@ class Windows:
                                              initialvalue=current_email)
             
             if new_email and new_email != current_email:
-                if self.db.update_user_email(self.app.current_user_id, new_email):
-                    messagebox.showinfo("Éxito", "Email actualizado correctamente")
-                    # Actualizar la etiqueta del email
-                    email_label.config(text=f"📧 {new_email}")
-                else:
-                    messagebox.showerror("Error", "No se pudo actualizar el email")
+                def on_updated(ok):
+                    if ok:
+                        messagebox.showinfo("Éxito", "Email actualizado correctamente")
+                        # Actualizar la etiqueta del email
+                        email_label.config(text=f"📧 {new_email}")
+                    else:
+                        messagebox.showerror("Error", "No se pudo actualizar el email")
+                
+                self.app.executor.submit(self.db.update_user_email, self.app.current_user_id, new_email,
+                                         callback=on_updated, widget=email_label)
         
         # Información básica
         info_frame = tk.Frame(header_frame, bg='#2d2d44')
@@ -424,13 +461,13 @@ class Windows:
         if not self.app.current_user_id:
             return
         
-        user = self.db.execute_query("SELECT id, nombre, apellido, email FROM usuarios WHERE id = ?", (self.app.current_user_id,))
+        def on_user_loaded(user_data):
+            if user_data:
+                messagebox.showinfo("Usuario encontrado", f"ID: {user_data[0]}\nNombre: {user_data[1]} {user_data[2]}\nEmail: {user_data[3]}")
+            else:
+                messagebox.showerror("Error", "Usuario no encontrado en la base de datos")
         
-        if user:
-            user_data = user[0]
-            messagebox.showinfo("Usuario encontrado", f"ID: {user_data[0]}\nNombre: {user_data[1]} {user_data[2]}\nEmail: {user_data[3]}")
-        else:
-            messagebox.showerror("Error", "Usuario no encontrado en la base de datos")
+        self.app.executor.submit(self.db.get_user_basic, self.app.current_user_id, callback=on_user_loaded)
     
     def activity_window(self):
         """Ventana de actividad reciente del usuario"""
@@ -463,12 +500,16 @@ class Windows:
             activity_tree.column('Fecha', width=150, anchor='center')
             
             # Cargar datos
-            user_posts = self.app.db.execute_query("SELECT contenido, fecha_publicacion, activa FROM publicaciones WHERE usuario_id = ? ORDER BY fecha_publicacion DESC", (self.app.current_user_id,))[0]
-            if user_posts:
-                for post in user_posts:
-                    fecha = post[1].strftime('%d/%m/%Y %H:%M') if hasattr(post[1], 'strftime') else str(post[1])
-                    estado = "Sí" if post[2] else "No"
-                    activity_tree.insert('', 'end', values=(post[0], fecha, estado))
+            def on_posts_loaded(user_posts):
+                if user_posts:
+                    for post in user_posts:
+                        fecha = post[1].strftime('%d/%m/%Y %H:%M') if hasattr(post[1], 'strftime') else str(post[1])
+                        estado = "Sí" if post[2] else "No"
+                        activity_tree.insert('', 'end', values=(post[0], fecha, estado))
+            
+            self.app.executor.submit(self.app.db.get_user_post_history,
+                                     self.app.current_user_id,
+                                     callback=on_posts_loaded, widget=activity_tree)
             
             activity_tree.pack(fill='both', expand=True, padx=10, pady=10)
 
@@ -483,14 +524,17 @@ class Windows:
             interaction_tree.column('Fecha', width=150, anchor='center')
 
             # Cargar datos usando la nueva función
-            user_interactions = self.app.db.get_user_interactions(self.app.current_user_id)
-            if user_interactions:
-                for interaction in user_interactions:
-                    # El orden es: tipo, fecha, detalle
-                    tipo, fecha, detalle = interaction
-                    fecha_str = fecha.strftime('%d/%m/%Y %H:%M') if hasattr(fecha, 'strftime') else str(fecha)
-                    # Insertar en el orden de las columnas: Tipo, Detalle, Fecha
-                    interaction_tree.insert('', 'end', values=(tipo, detalle, fecha_str))
+            def on_interactions_loaded(user_interactions):
+                if user_interactions:
+                    for interaction in user_interactions:
+                        # El orden es: tipo, fecha, detalle
+                        tipo, fecha, detalle = interaction
+                        fecha_str = fecha.strftime('%d/%m/%Y %H:%M') if hasattr(fecha, 'strftime') else str(fecha)
+                        # Insertar en el orden de las columnas: Tipo, Detalle, Fecha
+                        interaction_tree.insert('', 'end', values=(tipo, detalle, fecha_str))
+            
+            self.app.executor.submit(self.app.db.get_user_interactions, self.app.current_user_id,
+                                     callback=on_interactions_loaded, widget=interaction_tree)
             
             interaction_tree.pack(fill='both', expand=True, padx=10, pady=10)
 
@@ -0,0 +1,30 @@
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.backends import SQLiteBackend  # noqa: E402
+from modules.database import DatabaseManager  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """``DatabaseManager`` sobre un fichero SQLite nuevo"""
+    manager = DatabaseManager(backend=SQLiteBackend(str(tmp_path / 'niilo.db')), slow_query_ms=None)
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """Crear un usuario y devolver su id"""
+    def make(nombre, email=None, ubicacion='Madrid'):
+        email = email or f"{nombre.lower()}@niilo.test"
+        assert db.create_user(nombre, 'Prueba', email, db.hash_password('x'),
+                              date(1990, 1, 1), ubicacion, '')
+        results, _ = db.execute_query('get_user_by_email', (email,))
+        return results[0][0]
+    return make
@@ -0,0 +1,102 @@
+import time
+
+from modules.cache import QueryCache, cached, invalidates
+
+
+class Repository:
+    """Objeto mínimo con ``cache`` como ``DatabaseManager``"""
+
+    def __init__(self):
+        self.cache = QueryCache()
+        self.reads = 0
+        self.value = 'a'
+
+    @cached(ttl=60, tags=('friends:{user_id}', 'users'))
+    def get_friends(self, user_id):
+        self.reads += 1
+        return [self.value, user_id]
+
+    @cached(ttl=60)
+    def get_broken(self):
+        self.reads += 1
+        return None
+
+    @invalidates('friends:{receiver_id}')
+    def add_friend(self, sender_id, receiver_id, ok=True):
+        return ok
+
+
+def test_invalidate_removes_only_tagged_entries():
+    cache = QueryCache()
+    cache.set('a', 1, ttl=60, tags=('friends:1', 'users'))
+    cache.set('b', 2, ttl=60, tags=('friends:2',))
+    cache.invalidate('friends:1')
+    assert cache.get('a') == (False, None)
+    assert cache.get('b') == (True, 2)
+    assert cache.get_stats()['invalidations'] == 1
+
+
+def test_shared_tag_invalidates_every_entry():
+    cache = QueryCache()
+    cache.set('a', 1, ttl=60, tags=('users',))
+    cache.set('b', 2, ttl=60, tags=('users', 'friends:2'))
+    cache.invalidate('users')
+    assert cache.get_stats()['entries'] == 0
+    # La etiqueta restante ya no apunta a ninguna entrada
+    cache.invalidate('friends:2')
+    assert cache.get_stats()['invalidations'] == 2
+
+
+def test_expired_entry_is_a_miss():
+    cache = QueryCache()
+    cache.set('a', 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('a') == (False, None)
+    assert cache.get_stats()['expirations'] == 1
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = QueryCache(max_entries=2)
+    cache.set('a', 1, ttl=60)
+    cache.set('b', 2, ttl=60)
+    cache.get('a')
+    cache.set('c', 3, ttl=60)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1)
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_cached_method_is_invalidated_by_argument_tag():
+    repo = Repository()
+    assert repo.get_friends(7) == ['a', 7]
+    repo.value = 'b'
+    assert repo.get_friends(7) == ['a', 7]
+    assert repo.reads == 1
+
+    assert repo.add_friend(3, receiver_id=9)  # otra etiqueta: no toca la entrada de 7
+    assert repo.get_friends(7) == ['a', 7]
+    assert repo.add_friend(3, 7)
+    assert repo.get_friends(7) == ['b', 7]
+    assert repo.reads == 2
+
+
+def test_failed_write_does_not_invalidate():
+    repo = Repository()
+    repo.get_friends(7)
+    assert not repo.add_friend(3, 7, ok=False)
+    repo.get_friends(7)
+    assert repo.reads == 1
+
+
+def test_none_results_are_not_cached():
+    repo = Repository()
+    assert repo.get_broken() is None
+    assert repo.get_broken() is None
+    assert repo.reads == 2
+
+
+def test_friend_request_invalidates_pending_requests(db, make_user):
+    ana, luis = make_user('Ana'), make_user('Luis')
+    assert db.get_friend_requests(luis) == []
+    assert db.send_friend_request(ana, luis)
+    assert [row[0] for row in db.get_friend_requests(luis)] == [ana]
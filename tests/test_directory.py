@@ -0,0 +1,71 @@
+from modules.directory import UserDirectory
+
+
+def make_directory():
+    directory = UserDirectory()
+    directory.load([
+        (1, 'Ana García', 'ana@niilo.test'),
+        (2, 'Ángel Pérez', 'angel@niilo.test'),
+        (3, 'Luis Anaya', 'luis@niilo.test'),
+        (4, 'Marta Ruiz', 'marta@niilo.test'),
+    ])
+    return directory
+
+
+def ids(users):
+    return [user[0] for user in users]
+
+
+def test_prefix_matches_any_word_ignoring_accents():
+    directory = make_directory()
+    assert sorted(ids(directory.search('an'))) == [1, 2, 3]
+    assert ids(directory.search('ANGEL')) == [2]
+    assert ids(directory.search('pérez')) == [2]
+    assert ids(directory.search('marta@')) == [4]
+    assert directory.search('zz') == []
+
+
+def test_every_term_must_match():
+    directory = make_directory()
+    assert ids(directory.search('ana gar')) == [1]
+    assert ids(directory.search('an luis')) == [3]
+    assert directory.search('ana ruiz') == []
+
+
+def test_limit_and_exclude():
+    directory = make_directory()
+    assert len(directory.search('an', limit=2)) == 2
+    assert sorted(ids(directory.search('an', exclude=(1,)))) == [2, 3]
+    # Sin consulta: los primeros en orden alfabético
+    assert len(directory.search('', limit=3)) == 3
+
+
+def test_add_user_replaces_old_keys():
+    directory = make_directory()
+    directory.add_user((4, 'Marta Ruiz', 'mruiz@niilo.test'))
+    assert directory.search('marta@') == []
+    assert ids(directory.search('mruiz')) == [4]
+    assert directory.get_stats()['users'] == 4
+    # Las altas locales no mueven max_id: otras anteriores pueden faltar aún
+    directory.add_user((9, 'Nuevo Usuario', 'nuevo@niilo.test'))
+    assert directory.max_id == 4
+
+
+def test_add_users_advances_max_id():
+    directory = make_directory()
+    directory.add_users([(5, 'Pedro Sanz', 'pedro@niilo.test'), (7, 'Sara Gil', 'sara@niilo.test')])
+    assert directory.max_id == 7
+    assert sorted(ids(directory.search('sa'))) == [5, 7]
+    assert directory.get(7) == (7, 'Sara Gil', 'sara@niilo.test')
+
+
+def test_directory_sees_users_created_elsewhere(db, make_user):
+    ana = make_user('Ana')
+    assert ids(db.search_users('ana')) == [ana]
+    # Alta desde otro proceso: no pasa por create_user de este DatabaseManager
+    assert db.execute_update(
+        "INSERT INTO usuarios (nombre, apellido, email, password_hash) VALUES ('Anabel', 'Prueba', 'anabel@niilo.test', 'x')")
+    assert ids(db.search_users('anabel')) == []
+    db.USER_DIRECTORY_REFRESH = 0
+    assert len(db.search_users('anabel')) == 1
+    assert db.user_directory.max_id > ana
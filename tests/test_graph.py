@@ -0,0 +1,73 @@
+from modules.graph import FriendGraph
+
+
+def test_load_builds_undirected_adjacency():
+    graph = FriendGraph()
+    graph.load([(1, 2, 'aceptada'), (3, 1, 'aceptada'), (2, 1, 'aceptada'), (4, 5, 'pendiente')])
+    assert graph.loaded
+    assert graph.friends(1) == [2, 3]
+    assert graph.friends(2) == [1]
+    assert graph.are_friends(3, 1) and graph.are_friends(1, 3)
+    assert not graph.are_friends(2, 3)
+    # La amistad registrada en ambos sentidos cuenta una vez
+    assert graph.friend_count(1) == 2
+    assert graph.get_stats()['edges'] == 2
+
+
+def test_unknown_users_have_no_friends():
+    graph = FriendGraph()
+    graph.load([(1, 2, 'aceptada')])
+    assert graph.friends(99) == []
+    assert graph.friend_count(99) == 0
+    assert not graph.are_friends(99, 1)
+
+
+def test_status_covers_requests_in_either_direction():
+    graph = FriendGraph()
+    graph.load([(1, 2, 'aceptada'), (3, 1, 'pendiente'), (1, 4, 'rechazada')])
+    assert graph.status(2, 1) == 'aceptada'
+    assert graph.status(1, 3) == 'pendiente'
+    assert graph.status(4, 1) == 'rechazada'
+    assert graph.status(1, 5) is None
+    graph.set_request_status(5, 1, 'pendiente')
+    assert graph.status(1, 5) == 'pendiente'
+
+
+def test_add_friendship_before_and_after_compaction():
+    graph = FriendGraph(compact_threshold=3)
+    graph.load([(1, 2, 'aceptada'), (1, 3, 'pendiente')])
+    graph.add_friendship(3, 1)
+    assert graph.status(1, 3) == 'aceptada'
+    assert graph.friends(1) == [2, 3]
+    assert graph.get_stats()['pending_changes'] == 1
+    graph.add_friendship(1, 2)  # ya estaba en el CSR
+    graph.add_friendship(7, 1)  # usuario más allá del CSR cargado
+    stats = graph.get_stats()
+    assert stats['pending_changes'] == 0
+    assert stats['edges'] == 3
+    assert graph.friends(1) == [2, 3, 7]
+    assert graph.friends(7) == [1]
+    assert graph.friend_count(1) == 3
+
+
+def test_send_friend_request_rejects_reverse_duplicate(db, make_user):
+    ana, luis = make_user('Ana'), make_user('Luis')
+    assert db.send_friend_request(ana, luis)
+    # El otro usuario, desde otro cliente cuyo grafo no sabe nada de la solicitud
+    db.friend_graph.load([])
+    assert not db.send_friend_request(luis, ana)
+    assert db.get_friendship_status(luis, ana) == 'pendiente'
+    results, _ = db.execute_query('SELECT COUNT(*) FROM amistades')
+    assert results[0][0] == 1
+
+
+def test_graph_is_reloaded_when_stale(db, make_user):
+    ana, luis = make_user('Ana'), make_user('Luis')
+    assert db.get_friend_count(ana) == 0
+    # Amistad creada por otro proceso
+    assert db.execute_update("INSERT INTO amistades (usuario1_id, usuario2_id, estado) VALUES (?, ?, 'aceptada')",
+                             (ana, luis))
+    assert db.get_friend_count(ana) == 0
+    db.FRIEND_GRAPH_MAX_AGE = 0
+    assert db.get_friend_count(ana) == 1
+    assert db.are_friends(luis, ana)
@@ -0,0 +1,57 @@
+from modules.migrations import MIGRATIONS, MigrationRunner
+
+
+def index_names(db):
+    results, _ = db.execute_query("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_%'")
+    return {row[0] for row in results}
+
+
+def migration_indexes(*versions):
+    return {name for migration in MIGRATIONS if migration['version'] in versions
+            for name, _, _ in migration['indexes']}
+
+
+def test_migrate_applies_everything_once(db):
+    runner = MigrationRunner(db)
+    assert runner.migrate() == [1, 2, 3, 4]
+    assert runner.applied_versions() == {1, 2, 3, 4}
+    assert index_names(db) == migration_indexes(1, 2, 3, 4)
+    assert runner.migrate() == []
+
+
+def test_migrate_stops_at_target(db):
+    runner = MigrationRunner(db)
+    assert runner.migrate(target=2) == [1, 2]
+    assert [applied for _, _, applied in runner.status()] == [True, True, False, False]
+
+
+def test_rollback_reverts_newer_versions_and_drops_indexes(db):
+    runner = MigrationRunner(db)
+    runner.migrate()
+    assert runner.rollback(2) == [4, 3]
+    assert runner.applied_versions() == {1, 2}
+    assert index_names(db) == migration_indexes(1, 2)
+    assert runner.rollback() == [2, 1]
+    assert index_names(db) == set()
+
+
+def test_apply_restores_exactly_the_given_versions(db):
+    runner = MigrationRunner(db)
+    runner.migrate()
+    assert runner.rollback(0) == [4, 3, 2, 1]
+    # Con un hueco (1 y 3): no se aplica la 2 como haría migrate(target=3)
+    for version in (1, 3):
+        assert runner.apply(version)
+    assert runner.applied_versions() == {1, 3}
+    assert index_names(db) == migration_indexes(1, 3)
+    assert runner.apply(3)  # ya aplicada
+    assert not runner.apply(99)
+
+
+def test_failed_migration_is_rolled_back_and_stops(db):
+    broken = dict(MIGRATIONS[1], indexes=[('ix_roto', 'tabla_inexistente', 'id')])
+    runner = MigrationRunner(db, migrations=[MIGRATIONS[0], broken, MIGRATIONS[2]])
+    assert runner.migrate() is None
+    # La 1 queda aplicada; la 2 no deja registro y la 3 no llega a ejecutarse
+    assert runner.applied_versions() == {1}
+    assert index_names(db) == migration_indexes(1)
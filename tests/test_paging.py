@@ -0,0 +1,58 @@
+def page_through(fetch, limit):
+    """Recorrer todas las páginas con la clave (fecha_publicacion, id) de la última fila"""
+    seen, after = [], None
+    while True:
+        page = fetch(after, limit)
+        assert page is not None
+        seen.extend(post[0] for post in page)
+        if len(page) < limit:
+            return seen
+        after = (page[-1][4], page[-1][0])
+
+
+def test_posts_page_walks_every_post_once(db, make_user):
+    author = make_user('Ana')
+    for i in range(45):
+        assert db.create_post(author, f"publicación {i}")
+    # En SQLite muchas comparten fecha (resolución de segundos): el id desempata
+    seen = page_through(lambda after, limit: db.get_posts_page(after=after, limit=limit), 20)
+    assert len(seen) == 45
+    assert len(set(seen)) == 45
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_posts_page_skips_inactive_posts(db, make_user):
+    author = make_user('Ana')
+    for i in range(5):
+        assert db.create_post(author, f"publicación {i}")
+    assert db.execute_update("UPDATE publicaciones SET activa = 0 WHERE id <= 2")
+    seen = page_through(lambda after, limit: db.get_posts_page(after=after, limit=limit), 2)
+    assert seen == [5, 4, 3]
+
+
+def test_timeline_page_includes_friends_posts(db, make_user):
+    ana, luis = make_user('Ana'), make_user('Luis')
+    assert db.send_friend_request(ana, luis)
+    assert db.accept_friend_request(ana, luis)
+    for i in range(15):
+        assert db.create_post(ana if i % 2 else luis, f"publicación {i}")
+    seen = page_through(lambda after, limit: db.get_timeline_page(ana, after=after, limit=limit), 4)
+    assert len(seen) == 15
+    assert len(set(seen)) == 15
+
+
+def test_table_pages_release_the_connection_between_batches(db, make_user):
+    for i in range(23):
+        make_user(f"U{i}")
+    pages = db.execute_table_pages('usuarios', batch_size=10)
+    assert pages.columns[0] == 'id'
+    batches = []
+    while True:
+        assert db.get_pool_stats()['in_use'] == 0
+        rows = pages.fetch_batch()
+        if not rows:
+            break
+        batches.append([row[0] for row in rows])
+    assert [len(batch) for batch in batches] == [10, 10, 3]
+    assert sum(batches, []) == sorted(set(sum(batches, [])))
+    assert pages.closed and pages.fetch_batch() == []
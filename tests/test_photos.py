@@ -0,0 +1,83 @@
+import os
+import time
+
+from PIL import Image
+
+from modules.photos import PHOTO_EXTENSION, PHOTO_SIZES, collect_garbage, ingest_photo, resolve_photo_path
+
+OLD = time.time() - 10000
+
+
+def make_image(path, color='red', size=300):
+    Image.new('RGB', (size, size), color).save(path)
+    return str(path)
+
+
+def age(paths):
+    for path in paths:
+        os.utime(path, (OLD, OLD))
+
+
+def stored_files(photos_dir):
+    return sorted(os.path.relpath(os.path.join(root, name), photos_dir).replace(os.sep, '/')
+                  for root, _, names in os.walk(photos_dir) for name in names)
+
+
+def versions(key, photos_dir):
+    stem = key.rsplit('_', 1)[0]
+    return [resolve_photo_path(f"{stem}_{size}{PHOTO_EXTENSION}", str(photos_dir)) for size in PHOTO_SIZES]
+
+
+def test_ingest_writes_every_size_once(tmp_path):
+    photos_dir = tmp_path / 'store'
+    source = make_image(tmp_path / 'foto.png')
+    key = ingest_photo(source, str(photos_dir))
+    assert key.endswith(f"_{max(PHOTO_SIZES)}{PHOTO_EXTENSION}")
+    assert all(os.path.exists(path) for path in versions(key, photos_dir))
+    assert ingest_photo(source, str(photos_dir)) == key
+    assert len(stored_files(photos_dir)) == len(PHOTO_SIZES)
+
+
+def test_referenced_key_keeps_all_its_versions(tmp_path):
+    photos_dir = tmp_path / 'store'
+    kept = ingest_photo(make_image(tmp_path / 'a.png', 'red'), str(photos_dir))
+    dropped = ingest_photo(make_image(tmp_path / 'b.png', 'blue'), str(photos_dir))
+    age(versions(kept, photos_dir) + versions(dropped, photos_dir))
+    removed, freed = collect_garbage([kept], str(photos_dir))
+    assert removed == len(PHOTO_SIZES) and freed > 0
+    assert all(os.path.exists(path) for path in versions(kept, photos_dir))
+    assert not any(os.path.exists(path) for path in versions(dropped, photos_dir))
+    # Sus subdirectorios de reparto vacíos también desaparecen
+    assert not os.path.exists(os.path.dirname(versions(dropped, photos_dir)[0]))
+
+
+def test_grace_period_protects_recent_files(tmp_path):
+    photos_dir = tmp_path / 'store'
+    key = ingest_photo(make_image(tmp_path / 'a.png'), str(photos_dir))
+    assert collect_garbage([], str(photos_dir)) == (0, 0)
+    age(versions(key, photos_dir))
+    assert collect_garbage([], str(photos_dir), dry_run=True)[0] == len(PHOTO_SIZES)
+    assert all(os.path.exists(path) for path in versions(key, photos_dir))
+    assert collect_garbage([], str(photos_dir))[0] == len(PHOTO_SIZES)
+
+
+def test_reupload_renews_grace_period(tmp_path):
+    photos_dir = tmp_path / 'store'
+    source = make_image(tmp_path / 'a.png')
+    key = ingest_photo(source, str(photos_dir))
+    age(versions(key, photos_dir))
+    # La misma foto subida otra vez (aún sin guardar en la base de datos)
+    assert ingest_photo(source, str(photos_dir)) == key
+    assert collect_garbage([], str(photos_dir)) == (0, 0)
+
+
+def test_legacy_photos_are_matched_exactly(tmp_path):
+    photos_dir = tmp_path / 'store'
+    photos_dir.mkdir()
+    # Fotos antiguas: también terminan en _<número>.png pero no son versiones
+    kept = make_image(photos_dir / 'profile_20_20250620_132908.png', size=10)
+    other = make_image(photos_dir / 'profile_20_20250620_140000.png', size=10)
+    size_like = make_image(photos_dir / 'profile_7_64.png', size=10)
+    age([kept, other, size_like])
+    assert collect_garbage([kept], str(photos_dir))[0] == 2
+    assert stored_files(photos_dir) == ['profile_20_20250620_132908.png']
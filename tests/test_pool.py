@@ -0,0 +1,96 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from modules.pool import ConnectionPool, PoolTimeoutError
+
+
+def sqlite_factory():
+    return sqlite3.connect(':memory:', check_same_thread=False)
+
+
+class BrokenConnection:
+    """Conexión que falla en cualquier consulta (caída del servidor)"""
+
+    def cursor(self):
+        raise sqlite3.OperationalError("conexión perdida")
+
+    def close(self):
+        pass
+
+
+def test_reuses_idle_connection():
+    pool = ConnectionPool(sqlite_factory, min_size=0, max_size=2)
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    stats = pool.get_stats()
+    assert stats['creates'] == 1
+    assert stats['hits'] == 1
+
+
+def test_exhausted_pool_times_out():
+    pool = ConnectionPool(sqlite_factory, min_size=0, max_size=2)
+    pool.acquire()
+    pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.1)
+    assert time.monotonic() - started >= 0.1
+    assert pool.get_stats()['timeouts'] == 1
+
+
+def test_waiter_gets_released_connection():
+    pool = ConnectionPool(sqlite_factory, min_size=0, max_size=1)
+    held = pool.acquire()
+    threading.Timer(0.05, pool.release, (held,)).start()
+    assert pool.acquire(timeout=2) is held
+    assert pool.get_stats()['waits'] == 1
+
+
+def test_broken_release_discards_connection():
+    pool = ConnectionPool(sqlite_factory, min_size=0, max_size=1)
+    broken = pool.acquire()
+    pool.release(broken, broken=True)
+    stats = pool.get_stats()
+    assert stats['discards'] == 1
+    assert stats['in_use'] == 0 and stats['idle'] == 0
+    assert pool.acquire(timeout=0.1) is not broken
+
+
+def test_unhealthy_idle_connection_is_replaced():
+    connections = [BrokenConnection(), sqlite_factory()]
+    pool = ConnectionPool(lambda: connections.pop(0), min_size=0, max_size=1, check_interval=0)
+    pool.release(pool.acquire())
+    pooled = pool.acquire()
+    assert isinstance(pooled.raw, sqlite3.Connection)
+    stats = pool.get_stats()
+    assert stats['health_failures'] == 1
+    assert stats['size'] == 1
+
+
+def test_idle_eviction_keeps_min_size():
+    pool = ConnectionPool(sqlite_factory, min_size=1, max_size=3, idle_timeout=0)
+    held = [pool.acquire() for _ in range(3)]
+    for pooled in held:
+        pool.release(pooled)
+    time.sleep(0.01)
+    pool.release(pool.acquire())
+    stats = pool.get_stats()
+    assert stats['evictions'] == 2
+    assert stats['size'] == 1
+
+
+def test_failed_connect_frees_slot():
+    pool = ConnectionPool(lambda: None, min_size=0, max_size=1)
+    assert pool.acquire() is None
+    assert pool.get_stats()['in_use'] == 0
+
+
+def test_closed_pool_rejects_checkout():
+    pool = ConnectionPool(sqlite_factory, min_size=0, max_size=1)
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.acquire()